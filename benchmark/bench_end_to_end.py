@@ -0,0 +1,192 @@
+"""
+Offline end-to-end benchmark of retrieve_papers, extract_text_from_pdf and get_survey_table.
+
+A local fake arXiv API, PDF host and OpenAI-compatible chat server (benchmark/fake_services.py)
+stand in for the network, over a generated PDF corpus, so the numbers only depend on
+this code and the CPU. Each case runs in a fresh process, which makes its peak RSS its own.
+
+Usage: python benchmark/bench_end_to_end.py [--sizes 1,10,100,500] [--columns "Method,Dataset"]
+       [--latency 0.05] [--tokens-per-second 200] [--output bench.json] [--baseline bench.json]
+
+With --baseline, the run fails (exit code 1) when a case's throughput drops or its p99
+latency grows by more than --tolerance compared to a previous --output file.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+current_path = Path(__file__).resolve()
+parent_path = current_path.parent.parent
+sys.path.append(str(parent_path))
+sys.path.append(str(current_path.parent))
+from bench_extract_text import generate_corpus
+from fake_services import FakeServices
+
+CASES = ["extract_text_from_pdf", "get_survey_table", "retrieve_papers"]
+
+
+def peak_rss_mb():
+    import resource
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+def build_tools(config, root):
+    """ResearchTools on the fake services, with a fresh store, index and PDF cache under `root`"""
+    os.environ["OPENAI_BASE_URL"] = config["url"] + "/v1"
+    os.environ["OPENAI_API_KEY"] = "benchmark"
+    from arxiv import arxiv
+    from src.cache import PDFCache
+    from src.store import PaperStore
+    from src.search_index import BM25Index
+    from src.ratelimit import get_limiter
+    from src.kernel_pool import create_research_tools
+
+    # Per-request INFO logs of the pipeline and its clients (enabled by agents_sk on import) would dominate the timings
+    logging.getLogger().setLevel(logging.WARNING)
+    arxiv.Client.query_url_format = config["url"] + "/api/query?{}"
+    # Measure the pipeline, not the configured request rate of the real OpenAI API
+    get_limiter("openai", rate=config["llm_rate"])
+    return create_research_tools(
+        "GPT-3.5 Turbo", config["columns"], concurrent=True, delay_seconds=0, page_size=100,
+        pdf_cache=PDFCache(os.path.join(root, "papers")), store=PaperStore(os.path.join(root, "store")),
+        index=BM25Index(os.path.join(root, "index")), chunk_tokens=config["chunk_tokens"],
+    )
+
+
+async def bench_survey_table(research_tools, texts):
+    latencies = []
+
+    async def extract(text):
+        start = time.perf_counter()
+        await research_tools.get_survey_table(text)
+        latencies.append(time.perf_counter() - start)
+
+    # As many papers in flight as the retrieval pipeline's extract stage allows
+    semaphore = asyncio.Semaphore(research_tools.workers["extract"])
+
+    async def bounded(text):
+        async with semaphore:
+            await extract(text)
+
+    await asyncio.gather(*[bounded(text) for text in texts])
+    return latencies
+
+
+def run_case(case, size, config):
+    """Run one case in the current (fresh) process and return its measurements"""
+    from src.utils import extract_text_from_pdf
+    from src.telemetry import tracer
+
+    paths = [config["corpus"][index % len(config["corpus"])] for index in range(size)]
+    with tempfile.TemporaryDirectory() as root:
+        start = time.perf_counter()
+        if case == "extract_text_from_pdf":
+            latencies = []
+            for path in paths:
+                call_start = time.perf_counter()
+                extract_text_from_pdf(path)
+                latencies.append(time.perf_counter() - call_start)
+        elif case == "get_survey_table":
+            research_tools = build_tools(config, root)
+            texts = [extract_text_from_pdf(path) for path in paths]
+            start = time.perf_counter()
+            latencies = asyncio.run(bench_survey_table(research_tools, texts))
+        else:
+            research_tools = build_tools(config, root)
+            rows = asyncio.run(research_tools.retrieve_papers(num_papers=size, keywords=["graph", "neural"]))
+            assert len(rows) == size, f"{len(rows)} of {size} papers retrieved"
+            # Per-paper latency: from entering the pipeline to its finished row
+            latencies = [span.duration for span in tracer.spans if span.name == "paper"]
+        elapsed = time.perf_counter() - start
+
+    return {
+        "case": case,
+        "papers": size,
+        "seconds": round(elapsed, 3),
+        "papers_per_s": round(size / elapsed, 2),
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 1),
+        "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Messages for cases that regressed by more than `tolerance` against the baseline"""
+    previous = {(result["case"], result["papers"]): result for result in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get((result["case"], result["papers"]))
+        if old is None:
+            continue
+        if result["papers_per_s"] < old["papers_per_s"] * (1 - tolerance):
+            regressions.append(f"{result['case']} x{result['papers']}: {result['papers_per_s']} papers/s, was {old['papers_per_s']}")
+        if result["p99_ms"] > old["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{result['case']} x{result['papers']}: p99 {result['p99_ms']} ms, was {old['p99_ms']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,10,100,500", help="comma-separated paper counts")
+    parser.add_argument("--cases", default=",".join(CASES), help="comma-separated cases to run")
+    parser.add_argument("--columns", default="Method,Dataset", help="comma-separated table columns")
+    parser.add_argument("--corpus", type=int, default=20, help="distinct generated PDFs, served round-robin")
+    parser.add_argument("--pages", type=int, default=12)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake chat server time to first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--answer-tokens", type=int, default=30)
+    parser.add_argument("--chunk-tokens", type=int, default=None, help="map-reduce chunk size (default: whole text)")
+    parser.add_argument("--llm-rate", type=float, default=None, help="LLM requests per second (default: unlimited)")
+    parser.add_argument("--output", default=None, help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=None, help="JSON results of a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    cases = [case.strip() for case in args.cases.split(",")]
+    results = []
+    with tempfile.TemporaryDirectory() as corpus_root:
+        corpus = generate_corpus(corpus_root, args.corpus, args.pages)
+        with FakeServices(corpus, total_results=max(sizes) * 20, latency=args.latency,
+                          tokens_per_second=args.tokens_per_second, answer_tokens=args.answer_tokens) as services:
+            config = {
+                "url": services.url, "corpus": corpus, "columns": [column.strip() for column in args.columns.split(",")],
+                "chunk_tokens": args.chunk_tokens, "llm_rate": args.llm_rate,
+            }
+            print(f"{'case':<24}{'papers':>7}{'seconds':>9}{'papers/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'peak RSS MB':>13}")
+            for case in cases:
+                for size in sizes:
+                    # A fresh process per case, so peak RSS and the process-wide limiters are not shared
+                    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                        result = executor.submit(run_case, case, size, config).result()
+                    results.append(result)
+                    print(f"{case:<24}{size:>7}{result['seconds']:>9.2f}{result['papers_per_s']:>10.2f}"
+                          f"{result['p50_ms']:>9.1f}{result['p99_ms']:>9.1f}{result['peak_rss_mb']:>13.1f}")
+            print(f"fake service requests: {services.requests}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""
+Micro-benchmark of extract_text_from_pdf against the previous line-by-line implementation.
+
+Usage: python benchmark/bench_extract_text.py [--papers 20] [--pages 40] [--repeat 3]
+"""
+import re
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+import fitz
+
+current_path = Path(__file__).resolve()
+parent_path = current_path.parent.parent
+sys.path.append(str(parent_path))
+from src.utils import extract_text_from_pdf, references_pattern
+
+
+def legacy_extract_text_from_pdf(pdf_path):
+    """Previous implementation, kept here as the benchmark baseline"""
+    doc = fitz.open(pdf_path)
+    text = ""
+    references_pattern = re.compile(r'^\s*references\s*$', re.IGNORECASE)
+    for page in doc:
+        page_lines = page.get_text("text").splitlines()
+        for line in page_lines:
+            if references_pattern.search(line.strip()):
+                break
+            text += line + "\n"
+        else:
+            continue
+        break
+    return text
+
+
+def legacy_assemble(page_texts):
+    """Text assembly of the previous implementation, without PDF decoding"""
+    text = ""
+    references_pattern = re.compile(r'^\s*references\s*$', re.IGNORECASE)
+    for page_text in page_texts:
+        for line in page_text.splitlines():
+            if references_pattern.search(line.strip()):
+                return text
+            text += line + "\n"
+    return text
+
+
+def assemble(page_texts):
+    """Text assembly of iter_pdf_text, without PDF decoding"""
+    chunks = []
+    for page_text in page_texts:
+        match = references_pattern.search(page_text)
+        chunk = page_text[:match.start()] if match else page_text
+        chunks.append(chunk if not chunk or chunk.endswith("\n") else chunk + "\n")
+        if match:
+            break
+    return "".join(chunks)
+
+
+def generate_pdf(path, pages, lines_per_page=60, references_page=None):
+    """Write a synthetic paper with a 'References' header on `references_page`"""
+    doc = fitz.open()
+    for page_number in range(pages):
+        page = doc.new_page()
+        lines = [f"Section {page_number}.{line} lorem ipsum dolor sit amet, consectetur adipiscing elit"
+                 for line in range(lines_per_page)]
+        if page_number == references_page:
+            lines.insert(lines_per_page // 2, "References")
+        page.insert_text((36, 36), "\n".join(lines), fontsize=6)
+    doc.save(path)
+    doc.close()
+
+
+def generate_corpus(root, papers, pages):
+    paths = []
+    for index in range(papers):
+        path = str(Path(root) / f"paper_{index}.pdf")
+        generate_pdf(path, pages, references_page=pages - 2)
+        paths.append(path)
+    return paths
+
+
+def time_function(func, paths, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for path in paths:
+            func(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--papers", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        paths = generate_corpus(root, args.papers, args.pages)
+        # Both implementations must agree before their timings are compared
+        for path in paths:
+            assert extract_text_from_pdf(path) == legacy_extract_text_from_pdf(path), path
+
+        legacy = time_function(legacy_extract_text_from_pdf, paths, args.repeat)
+        current = time_function(extract_text_from_pdf, paths, args.repeat)
+        budgeted = time_function(lambda path: extract_text_from_pdf(path, max_pages=10), paths, args.repeat)
+
+        # PDF decoding dominates the totals above, so also time text assembly on its own
+        documents = []
+        for path in paths:
+            with fitz.open(path) as doc:
+                documents.append([page.get_text("text") for page in doc])
+        legacy_assembly = time_function(legacy_assemble, documents, args.repeat)
+        assembly = time_function(assemble, documents, args.repeat)
+
+    print(f"corpus: {args.papers} papers x {args.pages} pages")
+    print(f"legacy line-by-line:   {legacy * 1000:8.1f} ms")
+    print(f"streaming:             {current * 1000:8.1f} ms ({legacy / current:.2f}x)")
+    print(f"streaming, 10 pages:   {budgeted * 1000:8.1f} ms ({legacy / budgeted:.2f}x)")
+    print(f"text assembly, legacy: {legacy_assembly * 1000:8.1f} ms")
+    print(f"text assembly, new:    {assembly * 1000:8.1f} ms ({legacy_assembly / assembly:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Cold-start benchmark: import time of the agent modules and of the Streamlit page.
+
+Each case runs in a fresh interpreter, several times, and reports the median and
+minimum seconds of the import (the page case executes interface/st_interface.py in
+Streamlit's bare mode, i.e. renders it without a server). A case also lists the
+backends it loaded among those that should only be imported on first use.
+
+Usage: python benchmark/bench_import.py [--cases agents_sk,kernel_pool,interface] [--repeat 5]
+       [--output imports.json] [--baseline imports.json] [--tolerance 0.3]
+
+The run fails (exit code 1) when a case loads a deferred backend, or, with --baseline,
+when its median grows by more than --tolerance compared to a previous --output file.
+"""
+import sys
+import json
+import argparse
+import subprocess
+from pathlib import Path
+
+import numpy as np
+
+current_path = Path(__file__).resolve()
+parent_path = current_path.parent.parent
+
+# Statement timed in each case, and the backends it must not import
+CASES = {
+    "agents_sk": ("import src.agents_sk", ["scholarly", "pyzotero", "fitz", "pyarrow", "semantic_kernel.connectors.ai.open_ai", "semantic_kernel.connectors.ai.ollama"]),
+    "kernel_pool": ("import src.kernel_pool", ["scholarly", "pyzotero", "fitz", "pyarrow", "semantic_kernel.connectors.ai.open_ai", "semantic_kernel.connectors.ai.ollama"]),
+    "interface": ("runpy.run_path('interface/st_interface.py', run_name='st_interface')", ["semantic_kernel", "openai", "scholarly", "pyzotero", "fitz"]),
+}
+
+script = """
+import sys, json, time, runpy, logging
+sys.path.insert(0, {root!r})
+logging.disable(logging.WARNING)
+start = time.perf_counter()
+{statement}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "loaded": [name for name in {deferred!r} if name in sys.modules]}}))
+"""
+
+
+def measure(case, repeat=5):
+    """Median and minimum import seconds of a case over `repeat` fresh interpreters"""
+    statement, deferred = CASES[case]
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", script.format(root=str(parent_path), statement=statement, deferred=deferred)],
+            cwd=str(parent_path), capture_output=True, text=True, check=True,
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    seconds = [run["seconds"] for run in runs]
+    return {
+        "case": case,
+        "median_s": round(float(np.median(seconds)), 3),
+        "min_s": round(min(seconds), 3),
+        "loaded": sorted({name for run in runs for name in run["loaded"]}),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Messages for cases that load deferred backends or slowed down by more than `tolerance`"""
+    previous = {result["case"]: result for result in baseline or []}
+    messages = [f"{result['case']}: imports {', '.join(result['loaded'])} at startup" for result in results if result["loaded"]]
+    for result in results:
+        old = previous.get(result["case"])
+        if old is not None and result["median_s"] > old["median_s"] * (1 + tolerance):
+            messages.append(f"{result['case']}: median {result['median_s']:.3f}s vs {old['median_s']:.3f}s")
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", default=",".join(CASES), help="comma-separated cases to run")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per case")
+    parser.add_argument("--output", default=None, help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=None, help="JSON results of a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    args = parser.parse_args()
+
+    results = []
+    for case in args.cases.split(","):
+        result = measure(case, args.repeat)
+        results.append(result)
+        print(f"{case:<12} median {result['median_s']:.3f}s  min {result['min_s']:.3f}s  "
+              f"deferred backends loaded: {', '.join(result['loaded']) or 'none'}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=4)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+    regressions = compare(results, baseline, args.tolerance)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""
+Scaling benchmark of PDFParser: batch-parses a generated folder of PDFs with 1..N worker processes.
+
+Usage: python benchmark/bench_pdf_parser.py [--papers 100] [--pages 20]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+
+current_path = Path(__file__).resolve()
+parent_path = current_path.parent.parent
+sys.path.append(str(parent_path))
+sys.path.append(str(current_path.parent))
+from src.parsing import PDFParser
+from bench_extract_text import generate_corpus
+
+
+async def parse_folder(folder, workers):
+    with PDFParser(max_workers=workers) as parser:
+        # Warm the pool up so process start-up is not counted
+        await parser.parse_many([os.path.join(folder, "paper_0.pdf")] * workers)
+        start = time.perf_counter()
+        await parser.parse_folder(folder)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--papers", type=int, default=100)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        generate_corpus(folder, args.papers, args.pages)
+        workers, baseline = 1, None
+        while workers <= args.max_workers:
+            elapsed = asyncio.run(parse_folder(folder, workers))
+            baseline = baseline or elapsed
+            print(f"{workers:3d} workers: {elapsed:7.2f} s  speedup {baseline / elapsed:5.2f}x")
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main()
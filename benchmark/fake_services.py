@@ -0,0 +1,142 @@
+"""
+Local stand-ins for the network services of the pipeline, for offline benchmarks.
+
+One threaded HTTP server answers:
+- GET  /api/query             arXiv Atom feed of `total_results` synthetic papers, paged like the arXiv API
+- GET  /pdf/<n>               PDF of paper n, from a generated corpus served round-robin
+- POST /v1/chat/completions   OpenAI-compatible chat completion after `latency` seconds plus
+                              `answer_tokens / tokens_per_second` seconds of simulated generation
+"""
+import json
+import time
+import threading
+from urllib.parse import urlparse, parse_qs
+from xml.sax.saxutils import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER_WORDS = ["graph", "neural", "network", "message", "passing", "benchmark", "accuracy", "dataset"]
+
+
+def atom_entry(base_url, number, year=2023):
+    arxiv_id = f"{year % 100:02d}01.{number:05d}"
+    return f"""<entry>
+<id>http://arxiv.org/abs/{arxiv_id}v1</id>
+<updated>{year}-01-02T00:00:00Z</updated>
+<published>{year}-01-02T00:00:00Z</published>
+<title>Synthetic paper {number} on graph neural networks</title>
+<summary>{escape(f"Abstract of synthetic paper {number}: a graph neural network evaluated on benchmark {number % 17}.")}</summary>
+<author><name>Author {number % 50}</name></author>
+<author><name>Author {(number + 1) % 50}</name></author>
+<link href="http://arxiv.org/abs/{arxiv_id}v1" rel="alternate" type="text/html"/>
+<link title="pdf" href="{base_url}/pdf/{number}" rel="related" type="application/pdf"/>
+<arxiv:primary_category xmlns:arxiv="http://arxiv.org/schemas/atom" term="cs.LG" scheme="http://arxiv.org/schemas/atom"/>
+<category term="cs.LG" scheme="http://arxiv.org/schemas/atom"/>
+</entry>"""
+
+
+def atom_feed(base_url, start, max_results, total_results):
+    entries = "\n".join(atom_entry(base_url, number) for number in range(start, min(start + max_results, total_results)))
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">
+<title>ArXiv Query</title>
+<id>http://arxiv.org/api/benchmark</id>
+<updated>2024-01-01T00:00:00-05:00</updated>
+<opensearch:totalResults>{total_results}</opensearch:totalResults>
+<opensearch:startIndex>{start}</opensearch:startIndex>
+<opensearch:itemsPerPage>{max_results}</opensearch:itemsPerPage>
+{entries}
+</feed>"""
+
+
+def chat_completion(model, content, prompt_tokens):
+    completion_tokens = len(content.split())
+    return {
+        "id": "chatcmpl-benchmark",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                  "total_tokens": prompt_tokens + completion_tokens},
+    }
+
+
+class FakeServices:
+    """Fake arXiv API, PDF host and chat completion server on a local port, used as a context manager"""
+
+    def __init__(self, pdf_paths, total_results=10000, latency=0.05, tokens_per_second=200.0, answer_tokens=30, port=0):
+        self.pdfs = []
+        for path in pdf_paths:
+            with open(path, "rb") as file:
+                self.pdfs.append(file.read())
+        self.total_results = total_results
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.answer_tokens = answer_tokens
+        self.requests = {"arxiv": 0, "pdf": 0, "chat": 0}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = None
+
+    def count(self, kind):
+        with self._lock:
+            self.requests[kind] += 1
+
+    def answer(self):
+        return " ".join(ANSWER_WORDS[index % len(ANSWER_WORDS)] for index in range(self.answer_tokens))
+
+    def _handler(self):
+        services = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def send(self, status, body, content_type):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/api/query":
+                    services.count("arxiv")
+                    query = parse_qs(url.query)
+                    start, max_results = int(query.get("start", ["0"])[0]), int(query.get("max_results", ["10"])[0])
+                    feed = atom_feed(services.url, start, max_results, services.total_results)
+                    self.send(200, feed.encode("utf-8"), "application/atom+xml")
+                elif url.path.startswith("/pdf/"):
+                    services.count("pdf")
+                    number = int(url.path[len("/pdf/"):])
+                    self.send(200, services.pdfs[number % len(services.pdfs)], "application/pdf")
+                else:
+                    self.send(404, b"not found", "text/plain")
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if urlparse(self.path).path != "/v1/chat/completions":
+                    self.send(404, b"not found", "text/plain")
+                    return
+                services.count("chat")
+                request = json.loads(body)
+                prompt_tokens = sum(len(str(message.get("content", "")).split()) for message in request.get("messages", []))
+                time.sleep(services.latency + services.answer_tokens / services.tokens_per_second)
+                response = chat_completion(request.get("model", "benchmark"), services.answer(), prompt_tokens)
+                self.send(200, json.dumps(response).encode("utf-8"), "application/json")
+
+        return Handler
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="fake-services", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
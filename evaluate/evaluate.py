@@ -1,65 +1,148 @@
 """
-Get Evaluations 
+Get Evaluations
+
+Scores keywords extraction predictions against the baseline, per model and field:
+accuracy as reported in the README (any keyword word in common; exact set match for the
+other fields), micro precision/recall/F1 over the extracted items, and bootstrap
+confidence intervals. Predictions are normalized once into integer-coded (case, item)
+arrays, so every metric is a few NumPy operations over all cases.
+
+Usage: python evaluate/evaluate.py [--models mistral,gemma,llama3] [--bootstrap 1000] [--output scores.csv]
 """
-import re
+import sys
 import json
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+root_dir = str(Path(__file__).resolve().parent)
+fields = ['keywords', 'year_range', 'authors', 'institutions', 'conferences']
+# Per case and field: true positives, predicted items, gold items, correct (accuracy)
+stat_names = ['tp', 'predicted', 'gold', 'correct']
+
 
-root_dir = "./evaluate"
 def load_json(root_dir, model):
     with open(root_dir + "/" + f"outputs_{model}.json", 'r', encoding='utf-8') as file:
         data = json.load(file)
     return data[model]
 
+
+def normalize(cases, field):
+    """(case index, item) pairs of one field: words for keywords, lowercase names, years as strings"""
+    values = pd.Series([case.get(field) or [] for case in cases], dtype=object).explode().dropna().astype(str)
+    if field == 'keywords':
+        values = values.str.lower().str.findall(r'\w+').explode().dropna()
+    elif field != 'year_range':
+        values = values.str.lower()
+    values = values.str.strip()
+    values = values[values != ""]
+    return values.index.to_numpy(dtype=np.int64), values.to_numpy(dtype=object)
+
+
+def field_stats(gold, predicted, n_cases, field):
+    """Per-case statistics of one field as an (n_cases, 4) array, see `stat_names`"""
+    gold_cases, gold_items = gold
+    predicted_cases, predicted_items = predicted
+    # One code per distinct item, then one int64 key per distinct (case, item) pair
+    codes, uniques = pd.factorize(np.concatenate([gold_items, predicted_items]))
+    width = max(len(uniques), 1)
+    gold_keys = np.unique(gold_cases * width + codes[:len(gold_items)])
+    predicted_keys = np.unique(predicted_cases * width + codes[len(gold_items):])
+    matched = predicted_keys[np.isin(predicted_keys, gold_keys, assume_unique=True)]
+
+    tp = np.bincount(matched // width, minlength=n_cases)
+    n_predicted = np.bincount(predicted_keys // width, minlength=n_cases)
+    n_gold = np.bincount(gold_keys // width, minlength=n_cases)
+    if field == 'keywords':
+        correct = tp > 0
+    else:
+        correct = (tp == n_gold) & (tp == n_predicted)
+    return np.stack([tp, n_predicted, n_gold, correct], axis=1).astype(np.float64)
+
+
+def metrics(sums, n_cases):
+    """Accuracy, precision, recall and F1 from summed statistics (last axis ordered as `stat_names`)"""
+    tp, n_predicted, n_gold, correct = np.moveaxis(sums, -1, 0)
+    precision = np.divide(tp, n_predicted, out=np.zeros_like(tp), where=n_predicted > 0)
+    recall = np.divide(tp, n_gold, out=np.zeros_like(tp), where=n_gold > 0)
+    f1 = np.divide(2 * precision * recall, precision + recall, out=np.zeros_like(tp), where=precision + recall > 0)
+    return {'accuracy': correct / n_cases, 'precision': precision, 'recall': recall, 'f1': f1}
+
+
+def bootstrap_sums(stats, n_boot, seed=0, max_cells=8_000_000):
+    """Summed statistics of `n_boot` resamples of the cases, as an (n_boot, columns) array.
+
+    Resamples are drawn in batches and turned into case-count vectors, so each batch is
+    one matrix product and memory stays under `max_cells` counts whatever the number of
+    cases. Case indices plus one bincount are several times faster than multinomial draws.
+    """
+    rng = np.random.default_rng(seed)
+    n_cases = stats.shape[0]
+    batch = max(1, max_cells // max(n_cases, 1))
+    sums = []
+    for start in range(0, n_boot, batch):
+        size = min(batch, n_boot - start)
+        samples = rng.integers(0, n_cases, size=(size, n_cases))
+        samples += np.arange(size)[:, None] * n_cases
+        counts = np.bincount(samples.ravel(), minlength=size * n_cases).reshape(size, n_cases)
+        sums.append(counts.astype(np.float64) @ stats)
+    return np.concatenate(sums)
+
+
+def score(gold, predictions, n_boot=1000, confidence=0.95, seed=0):
+    """Scores of each model and field as a DataFrame, with bootstrap intervals of accuracy and F1.
+
+    `predictions` maps model names to lists of cases aligned with `gold`. All models share
+    the same resamples, so their intervals are comparable.
+    """
+    n_cases = len(gold)
+    for model, cases in predictions.items():
+        if len(cases) != n_cases:
+            raise ValueError(f"{model} has {len(cases)} predictions for {n_cases} cases")
+    gold_items = {field: normalize(gold, field) for field in fields}
+    index = [(model, field) for model in predictions for field in fields]
+    # Columns: (model, field) blocks of the four statistics
+    stats = np.concatenate([
+        field_stats(gold_items[field], normalize(cases, field), n_cases, field)
+        for model, cases in predictions.items() for field in fields
+    ], axis=1)
+
+    point = metrics(stats.sum(axis=0).reshape(len(index), len(stat_names)), n_cases)
+    table = pd.DataFrame(point, index=pd.MultiIndex.from_tuples(index, names=['model', 'field']))
+    if n_boot:
+        resampled = metrics(bootstrap_sums(stats, n_boot, seed).reshape(n_boot, len(index), len(stat_names)), n_cases)
+        tail = (1 - confidence) / 2 * 100
+        for name in ['accuracy', 'f1']:
+            table[f'{name}_low'], table[f'{name}_high'] = np.percentile(resampled[name], [tail, 100 - tail], axis=0)
+    return table
+
+
 def evaluate_accuracy(actual_list, predicted_list):
-    results = {
-        'keywords': 0,
-        'year_range': 0,
-        'authors': 0,
-        'institutions': 0,
-        'conferences': 0
-    }
-    
-    total_cases = len(actual_list)
-
-    for actual, predicted in zip(actual_list, predicted_list):
-        # Evaluate Keywords
-        actual_keywords = set(re.findall(r'\w+', ' '.join(actual['keywords']).lower()))
-        predicted_keywords = set(re.findall(r'\w+', ' '.join(predicted['keywords']).lower()))
-        if actual_keywords & predicted_keywords:
-            results['keywords'] += 1
-        
-        # Evaluate Year Range
-        if set(actual['year_range']) == set(predicted['year_range']):
-            results['year_range'] += 1
-        
-        # Evaluate Authors
-        actual_authors = set([author.lower() for author in actual['authors']])
-        predicted_authors = set([author.lower() for author in predicted['authors']])
-        if actual_authors == predicted_authors:
-            results['authors'] += 1
-        
-        # Evaluate Institutions
-        if set([inst.lower() for inst in actual['institutions']]) == set([inst.lower() for inst in predicted['institutions']]):
-            results['institutions'] += 1
-        
-        # Evaluate Conferences
-        if set([conf.lower() for conf in actual['conferences']]) == set([conf.lower() for conf in predicted['conferences']]):
-            results['conferences'] += 1
-
-    # Calculate accuracy for each key
-    for key in results:
-        results[key] = results[key] / total_cases
-
-    return results
-
-
-baseline = load_json(root_dir, "baseline")
-
-
-evaluation_results = {}
-for model in [ "mistral", "gemma", "llama3"]:
-    prediction = load_json(root_dir, model)
-    
-    evaluation_results[model] = evaluate_accuracy(baseline, prediction)
-    
-print(evaluation_results)
\ No newline at end of file
+    """Accuracy of each field for one model, as reported in the README"""
+    accuracy = score(actual_list, {'model': predicted_list}, n_boot=0)['accuracy']['model']
+    return {field: float(accuracy[field]) for field in fields}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", default="mistral,gemma,llama3")
+    parser.add_argument("--baseline", default="baseline")
+    parser.add_argument("--root", default=root_dir, help="folder of the outputs_{model}.json files")
+    parser.add_argument("--bootstrap", type=int, default=1000, help="resamples for the confidence intervals (0 to skip)")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--output", default=None, help="also write the scores to this CSV file")
+    args = parser.parse_args(argv)
+
+    baseline = load_json(args.root, args.baseline)
+    predictions = {model: load_json(args.root, model) for model in args.models.split(",")}
+    table = score(baseline, predictions, args.bootstrap, args.confidence)
+    with pd.option_context("display.width", 200, "display.max_rows", None, "display.max_columns", None, "display.float_format", "{:.3f}".format):
+        print(table)
+    if args.output:
+        table.to_csv(args.output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+Learn the model cascade's routing table from the evaluation results.
+
+Usage: python -m evaluate.learn_routes [--models baseline,llama3,mistral,gemma] [--min-quality 0.8]
+       [--checkpoint evaluate/predictions.jsonl] [--latency gemma=1.5,mistral=2.0] [--output evaluate/routing.json]
+(run from the repository root, as a module, so it can import evaluate.evaluate)
+
+Quality is the F1 of each model per keywords field against the baseline (which scores 1
+by definition), from the outputs_{model}.json files; latency is the median seconds per
+prediction recorded by predict.py (run it with --no-cache), or given with --latency.
+Each task's route lists the models reaching --min-quality, fastest first. The app and
+src/cli.py --cascade send prompts down that route and end with the selected model.
+"""
+import sys
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+current_path = Path(__file__).resolve()
+parent_path = current_path.parent.parent
+sys.path.append(str(parent_path))
+from evaluate.evaluate import load_json, score, root_dir
+from evaluate.predict import PredictionLog, model_names
+from src.cascade import RoutingTable
+
+
+def learn_routes(models, baseline="baseline", root=root_dir, latencies=None, min_quality=0.8, max_steps=2):
+    """RoutingTable of the app models from the outputs in `root` and {output model: [seconds]} latencies"""
+    gold = load_json(root, baseline)
+    predictions = {model: load_json(root, model) for model in models if model != baseline}
+    f1 = score(gold, predictions, n_boot=0)['f1'] if predictions else None
+    quality = {}
+    for model in models:
+        name = model_names.get(model, model)
+        if model == baseline:
+            quality[name] = {field: 1.0 for field in f1.index.get_level_values('field').unique()} if f1 is not None else {}
+        else:
+            quality[name] = {field: float(value) for field, value in f1[model].items()}
+    latency = {model_names.get(model, model): float(np.median(seconds)) for model, seconds in (latencies or {}).items() if seconds}
+    return RoutingTable.learn(quality, latency, min_quality, max_steps)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", default="baseline,llama3,mistral,gemma")
+    parser.add_argument("--baseline", default="baseline")
+    parser.add_argument("--root", default=root_dir)
+    parser.add_argument("--checkpoint", default=str(current_path.parent / "predictions.jsonl"))
+    parser.add_argument("--latency", default="", help="median seconds per model, overriding the checkpoint (model=seconds,...)")
+    parser.add_argument("--min-quality", type=float, default=0.8, help="F1 a model needs on a task to serve it")
+    parser.add_argument("--max-steps", type=int, default=2, help="models asked per prompt, the selected one included")
+    parser.add_argument("--output", default=str(current_path.parent / "routing.json"))
+    args = parser.parse_args(argv)
+
+    latencies = PredictionLog(args.checkpoint).latencies()
+    for item in filter(None, args.latency.split(",")):
+        model, seconds = item.split("=")
+        latencies[model.strip()] = [float(seconds)]
+    models = [model.strip() for model in args.models.split(",") if model.strip()]
+    missing = [model for model in models if model not in latencies]
+    if missing:
+        print(f"No latency measured for {', '.join(missing)}; they are only used as the selected model")
+
+    table = learn_routes(models, args.baseline, args.root, latencies, args.min_quality, args.max_steps)
+    table.save(args.output)
+    for task, route in table.routes.items():
+        print(f"{task:<20} {' -> '.join(route) or '(selected model only)'}")
+    print(f"Routing table written to {args.output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,100 +1,159 @@
+"""
+Get keywords extraction predictions of several models over the evaluation queries.
+
+Usage: python evaluate/predict.py [--models baseline,llama3,mistral,gemma]
+       [--queries evaluate/keywords_extraction_query.txt] [--checkpoint evaluate/predictions.jsonl]
+       [--concurrency ollama=2,openai=8] [--api-key KEY] [--no-cache]
+
+All models and queries run at once, capped per backend (the Ollama models share one
+server). Every prediction is appended to a JSONL checkpoint as soon as it is known, so a
+re-run after a crash only asks for the missing ones, and prompts answered before are
+served from the response cache (--no-cache measures every call, e.g. for the latencies
+that learn_routes.py reads from the checkpoint). outputs_{model}.json, read by
+evaluate.py, is written for each model that has answered every query.
+"""
+import os
+import sys
+import json
+import time
 import asyncio
-import semantic_kernel as sk
-import asyncio
-from semantic_kernel import Kernel
-from semantic_kernel.connectors.ai.open_ai import OpenAIChatCompletion, AzureChatCompletion
-from semantic_kernel.prompt_template import PromptTemplateConfig
-from semantic_kernel.connectors.ai.ollama.services.ollama_chat_completion import OllamaChatCompletion
-from openai import AsyncOpenAI
-from semantic_kernel.connectors.ai.open_ai.services.open_ai_chat_completion import OpenAIChatCompletion
-from semantic_kernel.connectors.ai.ollama.services.ollama_chat_completion import OllamaChatCompletion
-from prompt import PromptStore
-from utils import extract_parameters
+import logging
+import argparse
+from pathlib import Path
 
+current_path = Path(__file__).resolve()
+parent_path = current_path.parent.parent
+sys.path.append(str(parent_path))
+from src.utils import extract_parameters
 
+logger = logging.getLogger(__name__)
 
-"""
+# Model names of the evaluation outputs and the app models serving them
+model_names = {"baseline": "GPT-3.5 Turbo", "llama3": "LLaMA-3", "mistral": "Mistral", "gemma": "Gemma"}
 
-Set LLMs with Prompts
 
-"""
+def load_queries(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        return [line.strip() for line in file if line.strip()]
 
-# set LLMs
-models = {}
-promptstore = PromptStore()
-keywords_extraction_prompt = promptstore.get_prompt("keywords_extraction_prompt")
-for model in ["llama3", "mistral", "gemma"]:
-    kernel = Kernel()
-    kernel.add_service(OllamaChatCompletion(ai_model_id=model))
-    kernel.add_function(
-        plugin_name="KeywordsChatBot",
-        function_name="KeywordsExtraction",
-        prompt=keywords_extraction_prompt,
-        template_format="semantic-kernel")
-    models[model] = kernel
-
-# set chatgpt as Baseline
-kernel = Kernel()
-api_key = ""
-service_id = "local-gpt"
-openAIClient = AsyncOpenAI(api_key=api_key)
-kernel.add_service(OpenAIChatCompletion(service_id=service_id, ai_model_id="gpt-3.5-turbo", async_client=openAIClient))
-settings = kernel.get_prompt_execution_settings_from_service_id(service_id)
-settings.max_tokens = 2000
-settings.temperature = 0.7
-settings.top_p = 0.8
-kernel.add_function(
-    plugin_name="KeywordsChatBot",
-    function_name="KeywordsExtraction",
-    prompt=keywords_extraction_prompt,
-    template_format="semantic-kernel",
-    prompt_template_settings=settings)
-
-models["baseline"] = kernel
-async def get_keywords(query, model_name):
-    kernel = models[model_name]
-    result = await kernel.invoke(
-        plugin_name="KeywordsChatBot",
-        function_name="KeywordsExtraction",
-        query=query
-    )
-    return result
 
-"""
+class PredictionLog:
+    """Append-only JSONL of predictions, one line per (model, query); the last line of a pair wins"""
 
-Get Predictions
+    def __init__(self, path):
+        self.path = str(path)
 
-"""
+    def load(self):
+        predictions = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash can leave the last line half written
+                        continue
+                    predictions[(entry['model'], entry['query'])] = entry['params']
+        return predictions
 
+    def latencies(self):
+        """Seconds each model took per prediction, as {model: [seconds, ...]}"""
+        latencies = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if entry.get('seconds') is not None:
+                        latencies.setdefault(entry['model'], []).append(entry['seconds'])
+        return latencies
 
-# evaluate key words extraction
-loop = asyncio.get_event_loop() 
-results = {}
-file_path = './evaluate/keywords_extraction_query.txt'
-for model_name in [ "gemma",]: # "baseline", ,, "mistral", "gemma", "llama3"
-    results[model_name] = []
-    with open(file_path, 'r') as file:
-        for idx, line in enumerate(file):
-            query = line.strip()
-            result = loop.run_until_complete(get_keywords(query, model_name))
-            params = extract_parameters(str(result.value[0]))
-            results[model_name].append(params)
-            print(params)
-            # params = extract_parameters(str(asyncio.run(get_keywords(query, model_name)).value[0]))
-            # results[model_name].append(params)
-    import json
-    # Define the path where you want to save the file
-    file_path = f'./evaluate/outputs_{model_name}.json'
-    # Open the file in write mode and save the dictionary as JSON
-    with open(file_path, 'w') as json_file:
-        json.dump(results, json_file, indent=4)
+    def append(self, model, query, params, seconds=None):
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps({'model': model, 'query': query, 'params': params, 'seconds': seconds}) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
 
-import json
-# Define the path where you want to save the file
-file_path = './evaluate/final_outputs.json'
-# Open the file in write mode and save the dictionary as JSON
-with open(file_path, 'w') as json_file:
-    json.dump(results, json_file, indent=4)
-    
-    
-    
\ No newline at end of file
+
+async def run_predictions(queries, models, get_tools, log, concurrency):
+    """Predict the parameters of every (model, query) pair missing from the log; return (predictions, failed count)"""
+    from src.agents_sk import get_service_type
+
+    predictions = log.load()
+    pending = {}
+    # Model-major order, so an Ollama server mostly answers one model at a time instead of swapping models
+    for model in models:
+        backend = get_service_type(model_names.get(model, model))
+        pending.setdefault(backend, []).extend((model, query) for query in queries if (model, query) not in predictions)
+    logger.info(f"{sum(len(items) for items in pending.values())} predictions to run")
+    failed = []
+
+    async def worker(items):
+        for model, query in items:
+            start = time.perf_counter()
+            try:
+                answer = await get_tools(model).get_keywords(query)
+            except Exception as e:
+                logger.warning(f"{model} failed on {query!r}: {e!r}")
+                failed.append((model, query))
+                continue
+            params = extract_parameters(str(answer))
+            predictions[(model, query)] = params
+            await asyncio.to_thread(log.append, model, query, params, round(time.perf_counter() - start, 3))
+
+    # Workers of a backend share one iterator, so each pair is taken exactly once
+    workers = []
+    for backend, items in pending.items():
+        items = iter(items)
+        workers.extend(worker(items) for _ in range(concurrency.get(backend, 1)))
+    await asyncio.gather(*workers)
+    return predictions, len(failed)
+
+
+def write_outputs(queries, models, predictions, output_dir):
+    """Write outputs_{model}.json for the models with a prediction for every query"""
+    written = []
+    for model in models:
+        if all((model, query) in predictions for query in queries):
+            with open(os.path.join(output_dir, f"outputs_{model}.json"), 'w', encoding='utf-8') as json_file:
+                json.dump({model: [predictions[(model, query)] for query in queries]}, json_file, indent=4)
+            written.append(model)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", default="baseline,llama3,mistral,gemma")
+    parser.add_argument("--queries", default=str(current_path.parent / "keywords_extraction_query.txt"))
+    parser.add_argument("--checkpoint", default=str(current_path.parent / "predictions.jsonl"))
+    parser.add_argument("--output-dir", default=str(current_path.parent))
+    parser.add_argument("--concurrency", default="ollama=2,openai=8", help="requests in flight per backend")
+    parser.add_argument("--api-key", default=os.environ.get("OPENAI_API_KEY"))
+    parser.add_argument("--no-cache", action="store_true", help="call the models even for prompts answered before")
+    args = parser.parse_args(argv)
+
+    from src.cache import ResponseCache
+    from src.kernel_pool import KernelPool, create_research_tools
+
+    models = [model.strip() for model in args.models.split(",") if model.strip()]
+    concurrency = {backend: int(limit) for backend, limit in (item.split("=") for item in args.concurrency.split(","))}
+    queries = load_queries(args.queries)
+
+    # Kernels are built on first use, so only the models being run need their backend
+    response_cache = None if args.no_cache else ResponseCache()
+    pool = KernelPool(lambda model, table_columns, api_key: create_research_tools(
+        model, table_columns, api_key, response_cache=response_cache, concurrency_limits=concurrency,
+    ), max_size=len(models))
+    predictions, failed = asyncio.run(run_predictions(
+        queries, models, lambda model: pool.get(model_names.get(model, model), (), args.api_key),
+        PredictionLog(args.checkpoint), concurrency,
+    ))
+    written = write_outputs(queries, models, predictions, args.output_dir)
+    print(f"{len(predictions)} predictions, {failed} failed; wrote outputs of {', '.join(written) or 'no model'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,8 +2,6 @@ import sys
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-import asyncio
-import semantic_kernel as sk
 from pathlib import Path
 
 # Ensure the necessary local directories are accessible
@@ -12,7 +10,12 @@ parent_path = current_path.parent.parent
 sys.path.append(str(parent_path))
 
 from src.utils import extract_parameters
-from src.agents_sk import ResearchTools
+from src.cache import ResponseCache
+from src.parsing import PDFParser
+from src.search_index import BM25Index
+from src.rerank import Reranker
+from src.telemetry import tracer
+from src.cascade import RoutingTable
 
 
 def save_email(email):
@@ -30,6 +33,78 @@ def get_available_models():
     return ["LLaMA-3", "LLaMA-2", "Mistral", "Gemma", "GPT-4", "GPT-3.5 Turbo"]
 
 
+@st.cache_resource
+def get_pdf_parser():
+    # One process pool for PDF parsing, shared by every session of the app
+    return PDFParser()
+
+
+@st.cache_resource
+def setup_telemetry():
+    # Spans and metrics of every search go to local files, readable without any service
+    tracer.configure(
+        jsonl_path="./results/telemetry/spans.jsonl",
+        prometheus_path="./results/telemetry/metrics.prom",
+    )
+    return tracer
+
+
+@st.cache_resource
+def get_paper_store():
+    # The paper store, search index and vector cache are shared so writers never race
+    from src.store import PaperStore
+
+    return PaperStore()
+
+
+@st.cache_resource
+def get_search_index():
+    return BM25Index()
+
+
+@st.cache_resource
+def get_reranker():
+    return Reranker()
+
+
+@st.cache_resource
+def get_routing_table():
+    # Routes learned by evaluate/learn_routes.py; without them every prompt goes to the chosen model
+    path = Path("./evaluate/routing.json")
+    return RoutingTable.load(path) if path.exists() else None
+
+
+def build_research_tools(model, table_columns, api_key):
+    from src.kernel_pool import create_research_tools
+
+    return create_research_tools(
+        model,
+        table_columns,
+        api_key,
+        concurrent=True,
+        response_cache=ResponseCache(),
+        pdf_parser=get_pdf_parser(),
+        chunk_tokens=1500,
+        store=get_paper_store(),
+        index=get_search_index(),
+        reranker=get_reranker(),
+        # One JSON answer per paper saves requests on metered OpenAI models
+        fused=model in ["GPT-4", "GPT-3.5 Turbo"],
+        cascade=get_routing_table(),
+    )
+
+
+@st.cache_resource
+def get_kernel_pool():
+    # Warmed kernels shared across reruns and sessions, keyed by model, columns and API key.
+    # Semantic Kernel and the model backends are imported here, on the first search, so the
+    # page renders without waiting for them
+    from src.kernel_pool import KernelPool
+
+    setup_telemetry()
+    return KernelPool(build_research_tools)
+
+
 def upload_to_zotero(user_id, api_key, papers):
     # Placeholder for Zotero upload functionality
     # Replace with actual implementation and return True if successful, False otherwise
@@ -193,44 +268,76 @@ with col1:
     if st.button("Search", key="search_button"):
         if "keywords" in st.session_state and st.session_state.keywords:
 
-            async def retrieve_paper():
-                kernel = sk.Kernel()
-                table_column = st.session_state.keywords
-
-                research_tools = ResearchTools(
-                    kernel=kernel, model=st.session_state.selected_model
-                )
-                kernel.add_plugin(research_tools, plugin_name="research_tools")
-
-                if "api_key" not in st.session_state:
-                    api_key = None
-                else:
-                    api_key = st.session_state.api_key
-                research_tools.setup_llm(api_key=api_key)
-                research_tools.setup_info_extractor(table_column)
+            if "api_key" not in st.session_state:
+                api_key = None
+            else:
+                api_key = st.session_state.api_key
+            research_tools = get_kernel_pool().get(
+                st.session_state.selected_model, st.session_state.keywords, api_key
+            )
+            kernel = research_tools.kernel
 
+            async def get_keywords():
                 keywords = await kernel.invoke(
                     function_name="get_keywords",
                     plugin_name="research_tools",
                     kernel=kernel,
                     query=query,
                 )
-                results = str(keywords.value[0])
-
-                print(results)
-                params = extract_parameters(results)
+                return str(keywords)
+
+            keywords = get_kernel_pool().run(get_keywords())
+            print(keywords)
+            params = extract_parameters(keywords)
+
+            # Rows are rendered as soon as they are ready instead of after the whole batch
+            status = st.empty()
+            progress_bar = st.progress(0.0)
+            table = st.empty()
+            rows, progress, trace_id = {}, {}, None
+            for event in get_kernel_pool().iterate(
+                research_tools.stream_papers(num_papers=num_papers, **params)
+            ):
+                if event["type"] == "search":
+                    trace_id = event["trace_id"]
+                    continue
+                if event["type"] == "progress":
+                    progress[event["stage"]] = event["done"]
+                    status.caption(
+                        " · ".join(
+                            f"{stage}: {progress.get(stage, 0)}/{num_papers}"
+                            for stage in ["download", "parse", "extract"]
+                        )
+                    )
+                    progress_bar.progress(
+                        min(progress.get("extract", 0) / num_papers, 1.0)
+                    )
+                    continue
+                if event["type"] == "error":
+                    # The paper and any cells it already streamed are left out of the table;
+                    # the rest of the search goes on
+                    st.warning(f"Skipped '{event['title']}' ({event['stage']} failed)")
+                    rows.pop(event["index"], None)
+                elif event["type"] == "cell":
+                    row = rows.setdefault(event["index"], {"title": event["title"]})
+                    row[event["column"]] = event["value"]
+                else:
+                    rows[event["index"]] = event["row"]
+                table.dataframe(pd.DataFrame([rows[index] for index in sorted(rows)]))
+            progress_bar.empty()
+            status.empty()
+            results = [rows[index] for index in sorted(rows)]
+            df = pd.DataFrame(results)
 
-                papers = await kernel.invoke(
-                    function_name="retrieve_papers",
-                    plugin_name="research_tools",
-                    num_papers=num_papers,
-                    **params,
+            with st.expander("⏱️ Where the time went"):
+                st.dataframe(pd.DataFrame(setup_telemetry().summary(trace_id)))
+                st.caption("Totals since the app started")
+                st.dataframe(
+                    pd.DataFrame(
+                        list(setup_telemetry().counters().items()),
+                        columns=["metric", "value"],
+                    )
                 )
-                return papers
-
-            results = asyncio.run(retrieve_paper()).value
-            df = pd.DataFrame(results)
-            st.dataframe(df)
 
             for i, paper in enumerate(results):
                 with st.expander(f"Details for **{paper['title']}**"):
@@ -309,12 +416,11 @@ with col2:
                         row.to_dict() for index, row in last_search_results.iterrows()
                     ]
 
+                # The Zotero export needs no LLM service, so it shares one model-less kernel
+                research_tools = get_kernel_pool().get(None)
+                kernel = research_tools.kernel
+
                 async def add_to_zotero():
-                    kernel = sk.Kernel()
-                    research_tools = ResearchTools(
-                        kernel=kernel, model=st.session_state.selected_model
-                    )
-                    kernel.add_plugin(research_tools, plugin_name="research_tools")
                     success = await kernel.invoke(
                         function_name="save_to_zotero",
                         plugin_name="research_tools",
@@ -325,7 +431,7 @@ with col2:
                     )
                     return success
 
-                results = asyncio.run(add_to_zotero()).value
+                results = get_kernel_pool().run(add_to_zotero()).value
 
                 if results:
                     st.success("Papers successfully uploaded to Zotero!")
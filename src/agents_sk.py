@@ -1,18 +1,13 @@
 import os
+import json
+import asyncio
+import hashlib
 import logging
 import sys
-import datetime
 from pathlib import Path
-import pandas as pd
 
 from dotenv import load_dotenv
-from pyzotero import zotero
-from openai import AsyncOpenAI
-from semantic_kernel.connectors.ai.open_ai.services.open_ai_chat_completion import OpenAIChatCompletion
-from semantic_kernel.connectors.ai.ollama.services.ollama_chat_completion import OllamaChatCompletion
-from semantic_kernel.functions import kernel_function
-from scholarly import scholarly
-from arxiv import arxiv
+from semantic_kernel.functions import kernel_function, KernelArguments
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -22,8 +17,16 @@ logger = logging.getLogger(__name__)
 current_path = Path(__file__).resolve()
 parent_path = current_path.parent.parent
 sys.path.append(str(parent_path))
-from src.prompt import PromptStore
-from src.utils import extract_text_from_pdf
+from src.prompt import PromptStore, render_prompt
+from src.utils import extract_text_from_pdf, parse_json_fields
+from src.pipeline import Pipeline, Stage
+from src.cache import PDFCache
+from src.chunking import chunk_text, route_chunks, estimate_tokens
+from src.arxiv_search import build_query, iter_arxiv_results, stored_result
+from src.search_index import BM25Index
+from src.telemetry import tracer
+from src.ratelimit import backend_limits, call_with_retries, get_limiter
+from src.cascade import KEYWORDS_TASK, DEFAULT_TASK, validate_cell, validate_keywords
 
 # Dictionary to map model names to their service IDs
 model_dict = dict(zip(
@@ -31,12 +34,88 @@ model_dict = dict(zip(
     ["llama3", "llama2", "mistral", "gemma", "gpt-4", "gpt-3.5-turbo"]
 ))
 
+# Default number of column prompts in flight at once for each backend
+service_concurrency = {"ollama": 2, "openai": 8}
+
+# Default number of workers for each stage of the retrieval pipeline
+pipeline_workers = {"download": 4, "parse": 2, "extract": 2}
+
+def get_service_type(model):
+    """Return the backend ("openai" or "ollama") serving a model name"""
+    return "openai" if model in ["GPT-4", "GPT-3.5 Turbo"] else "ollama"
+
+def get_connector(model):
+    """Chat completion service and execution settings classes of a model's backend.
+
+    The connectors (and the openai client behind the OpenAI one) are imported on first
+    use, so importing this module does not load backends that are never called.
+    """
+    if get_service_type(model) == "openai":
+        from semantic_kernel.connectors.ai.open_ai.services.open_ai_chat_completion import OpenAIChatCompletion
+        from semantic_kernel.connectors.ai.open_ai.prompt_execution_settings.open_ai_prompt_execution_settings import OpenAIChatPromptExecutionSettings
+        return OpenAIChatCompletion, OpenAIChatPromptExecutionSettings
+    from semantic_kernel.connectors.ai.ollama.services.ollama_chat_completion import OllamaChatCompletion
+    from semantic_kernel.connectors.ai.ollama.ollama_prompt_execution_settings import OllamaChatPromptExecutionSettings
+    return OllamaChatCompletion, OllamaChatPromptExecutionSettings
+
+def dump_settings(settings):
+    """Generation parameters of execution settings, without the service they are sent to"""
+    return settings.model_dump(exclude_none=True, exclude={"service_id", "extension_data"})
+
 class ResearchTools:
 
-    def __init__(self, kernel, num_keywords=5, model=None):
+    def __init__(self, kernel, num_keywords=5, model=None, concurrent=False, concurrency_limits=None, column_timeout=None, workers=None, pdf_cache=None, response_cache=None, pdf_parser=None, chunk_tokens=None, max_chunks=3, fused=False, page_size=25, delay_seconds=3.0, store=None, index=None, reranker=None, candidate_factor=3, llm_timeout=None, llm_deadline=None, retries=4, keyword_max_tokens=128, cascade=None):
         self.num_keywords = num_keywords
         self.model = model
         self.kernel = kernel
+        # Concurrent column extraction settings
+        self.concurrent = concurrent
+        self.concurrency_limits = {**service_concurrency, **(concurrency_limits or {})}
+        # Seconds allowed to each LLM call of a column, not counting the wait for a free slot
+        self.column_timeout = column_timeout
+        # LLM calls share a per-backend adaptive limiter; each attempt is bounded by llm_timeout
+        # seconds, all retries of a call by llm_deadline seconds (both default to the backend's limits)
+        self.limiter = get_limiter(get_service_type(model), max_concurrency=self.get_concurrency_limit())
+        self.llm_timeout = llm_timeout if llm_timeout is not None else backend_limits[get_service_type(model)]["timeout"]
+        self.llm_deadline = llm_deadline if llm_deadline is not None else backend_limits[get_service_type(model)]["deadline"]
+        self.retries = retries
+        # Worker count of each retrieval pipeline stage
+        self.workers = {**pipeline_workers, **(workers or {})}
+        # PDFs are shared across searches through a persistent cache
+        self.pdf_cache = pdf_cache or PDFCache()
+        # Optional ResponseCache answering repeated prompts without calling the model
+        self.response_cache = response_cache
+        # Optional PDFParser running PyMuPDF in worker processes; parsing runs in a thread otherwise
+        self.pdf_parser = pdf_parser
+        # Token budget per chunk for map-reduce extraction over long papers (None sends the whole text)
+        self.chunk_tokens = chunk_tokens
+        self.max_chunks = max_chunks
+        # Ask for every column in one JSON answer per paper, falling back to per-column prompts
+        self.fused = fused
+        # arXiv result paging: entries per page and polite delay between page requests
+        self.page_size = page_size
+        self.delay_seconds = delay_seconds
+        # Retrieved papers, extracted cells and texts persist in a local store across searches
+        if store is None:
+            # Arrow is only loaded by tools that keep their own store
+            from src.store import PaperStore
+            store = PaperStore()
+        self.store = store
+        # Full-text index over stored papers, searched before arXiv
+        self.index = index or BM25Index()
+        # Optional embedding reranker; candidate_factor x num_papers arXiv results are ranked
+        self.reranker = reranker
+        self.candidate_factor = candidate_factor
+        # Output token cap of the keywords prompt, whose JSON answer normally takes a few dozen
+        self.keyword_max_tokens = keyword_max_tokens
+        # Optional RoutingTable: prompts go to faster models first and escalate to `model` when
+        # their answer fails validation; service_ids maps each usable model to its kernel service
+        self.cascade = cascade
+        self.service_ids = {}
+        self.model_id = model_dict.get(model, model)
+        self.settings = None
+        self.prompts = {}
+        self.table_columns = []
 
     def setup_llm(self, api_key = None):
         """Set Up LLMs for ResearchTools"""
@@ -45,17 +124,59 @@ class ResearchTools:
 
         settings = None
         if self.model in ["GPT-4", "GPT-3.5 Turbo"]:
+            from openai import AsyncOpenAI
+            OpenAIChatCompletion, _ = get_connector(self.model)
             service_id = "local-gpt"
             openAIClient = AsyncOpenAI(api_key=api_key)
-            self.kernel.add_service(OpenAIChatCompletion(service_id=service_id, ai_model_id="gpt-3.5-turbo", async_client=openAIClient))
+            self.model_id = "gpt-3.5-turbo"
+            self.kernel.add_service(OpenAIChatCompletion(service_id=service_id, ai_model_id=self.model_id, async_client=openAIClient))
             settings = self.kernel.get_prompt_execution_settings_from_service_id(service_id)
             settings.max_tokens = 2000
             settings.temperature = 0.7
             settings.top_p = 0.8
         elif self.model in ["LLaMA-3", "LLaMA-2", "Mistral", "Gemma"]:
+            OllamaChatCompletion, _ = get_connector(self.model)
             self.kernel.add_service(OllamaChatCompletion(ai_model_id=model_dict[self.model]))
 
         self.settings = settings
+        if self.cascade is not None:
+            self.setup_cascade(api_key)
+
+    def setup_cascade(self, api_key=None):
+        """Register a service for every model of the routing table besides the selected one"""
+        self.service_ids = {self.model: "local-gpt" if get_service_type(self.model) == "openai" else model_dict.get(self.model)}
+        for model in self.cascade.models():
+            if model in self.service_ids or model not in model_dict:
+                continue
+            try:
+                service, _ = get_connector(model)
+                if get_service_type(model) == "openai":
+                    from openai import AsyncOpenAI
+                    self.kernel.add_service(service(
+                        service_id=model_dict[model], ai_model_id=model_dict[model], async_client=AsyncOpenAI(api_key=api_key),
+                    ))
+                else:
+                    self.kernel.add_service(service(ai_model_id=model_dict[model]))
+            except Exception as e:
+                # e.g. an OpenAI model without an API key
+                logger.warning(f"Leaving {model} out of the cascade: {e!r}")
+                continue
+            self.service_ids[model] = model_dict[model]
+
+    def get_routes(self, task):
+        """Models to ask in turn for a task: the cascade's faster models, then the selected one"""
+        if self.cascade is None:
+            return [self.model]
+        return [model for model in self.cascade.route(task, self.model) if model == self.model or model in self.service_ids]
+
+    def get_call_settings(self, model, plugin_name):
+        """Execution settings sending a prompt to `model`'s service when several are registered"""
+        if plugin_name == "KeywordsChatBot":
+            return self.get_keywords_settings(model)
+        _, settings = get_connector(model)
+        if get_service_type(model) == "openai":
+            return settings(service_id=self.service_ids.get(model, "local-gpt"), max_tokens=2000, temperature=0.7, top_p=0.8)
+        return settings(service_id=self.service_ids.get(model))
         
 
     def setup_info_extractor(self, table_columns):
@@ -63,12 +184,13 @@ class ResearchTools:
         # keywords extractor
         promptstore = PromptStore()
         keywords_extraction_prompt = promptstore.get_prompt("keywords_extraction_prompt")
+        self.prompts[("KeywordsChatBot", "KeywordsExtraction")] = keywords_extraction_prompt
         self.kernel.add_function(
             plugin_name="KeywordsChatBot",
             function_name="KeywordsExtraction",
             prompt=keywords_extraction_prompt,
             template_format="semantic-kernel",
-            prompt_template_settings=self.settings,
+            prompt_execution_settings=self.get_keywords_settings(),
         )
 
         # Add custom tasks for each column in the table
@@ -76,6 +198,7 @@ class ResearchTools:
         for column in table_columns:
             promptstore.add_prompt(column)
             info_extraction_prompt = promptstore.get_prompt(column)
+            self.prompts[(column.replace(" ", "") + "ChatBot", column.replace(" ", ""))] = info_extraction_prompt
             self.kernel.add_function(
                 plugin_name=column.replace(" ", "") + "ChatBot",
                 function_name=column.replace(" ", ""),
@@ -83,25 +206,264 @@ class ResearchTools:
                 template_format="semantic-kernel",
                 prompt_template_settings=self.settings,
             )
+            if self.chunk_tokens is not None:
+                # Merges the answers extracted from each chunk of a long paper
+                promptstore.add_reduce_prompt(column)
+                reduce_prompt = promptstore.get_prompt(column + " reduce")
+                self.prompts[(column.replace(" ", "") + "ChatBot", column.replace(" ", "") + "Reduce")] = reduce_prompt
+                self.kernel.add_function(
+                    plugin_name=column.replace(" ", "") + "ChatBot",
+                    function_name=column.replace(" ", "") + "Reduce",
+                    prompt=reduce_prompt,
+                    template_format="semantic-kernel",
+                    prompt_template_settings=self.settings,
+                )
 
-    async def get_survey_table(self, paper_text):
-        """Run LLMs for each keywords prompt"""
-        table_info = {}
-        for column in self.table_columns:
-            column_info = await self.kernel.invoke(
-                plugin_name=column.replace(" ", "") + "ChatBot",
-                function_name=column.replace(" ", ""),
-                paper_text=paper_text
+        if self.fused:
+            # One structured prompt covering all columns, plus its reduce step for chunked papers
+            promptstore.add_fused_prompt()
+            for function_name, key in [("FusedExtraction", "fused_extraction_prompt"), ("FusedReduce", "fused_reduce_prompt")]:
+                self.prompts[("SurveyChatBot", function_name)] = promptstore.get_prompt(key)
+                self.kernel.add_function(
+                    plugin_name="SurveyChatBot",
+                    function_name=function_name,
+                    prompt=promptstore.get_prompt(key),
+                    template_format="semantic-kernel",
+                    prompt_template_settings=self.settings,
+                )
+
+    def get_keywords_settings(self, model=None):
+        """Settings of the keywords prompt: a JSON answer whose generation stops when the object closes"""
+        model = model or self.model
+        # The closing brace is the stop sequence, so nothing is generated after the last field;
+        # extract_parameters reads the object without it
+        _, settings = get_connector(model)
+        if get_service_type(model) == "openai":
+            return settings(
+                service_id=self.service_ids.get(model, "local-gpt"), max_tokens=self.keyword_max_tokens, temperature=0,
+                response_format={"type": "json_object"}, stop=["}"],
             )
-            table_info[column] = str(column_info.value[0])
+        return settings(
+            service_id=self.service_ids.get(model), format="json",
+            options={"num_predict": self.keyword_max_tokens, "temperature": 0, "stop": ["}"]},
+        )
+
+    def get_concurrency_limit(self):
+        """Maximum number of column prompts in flight for the current model"""
+        return max(1, self.concurrency_limits[get_service_type(self.model)])
+
+    def get_prompt_hash(self, column):
+        """Hash of the prompts and settings that, together with the model, determine a column's value"""
+        plugin_name, function_name = column.replace(" ", "") + "ChatBot", column.replace(" ", "")
+        parts = [
+            self.prompts.get((plugin_name, function_name)),
+            self.prompts.get((plugin_name, function_name + "Reduce")),
+            self.chunk_tokens,
+            self.max_chunks,
+            self.get_settings_dict(),
+        ]
+        if self.cascade is not None:
+            # Cells of a cascade are kept apart from the cells of the selected model alone
+            parts.append(self.get_routes(column))
+        if self.fused:
+            # Fused answers come from another prompt shape, so they are not reused as per-column cells or vice versa
+            parts.append([self.prompts.get(("SurveyChatBot", "FusedExtraction")), self.prompts.get(("SurveyChatBot", "FusedReduce"))])
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def get_settings_dict(self):
+        """Execution settings of the registered column prompts, as part of the prompt hash of stored cells"""
+        if self.settings is None:
+            return None
+        return {name: getattr(self.settings, name, None) for name in ["max_tokens", "temperature", "top_p"]}
+
+    async def invoke_prompt_function(self, plugin_name, function_name, model=None, **arguments):
+        """Invoke a registered prompt function, serving repeated inputs from the response cache.
+
+        `model` sends the prompt to another model of the cascade than the selected one.
+        """
+        model = model or self.model
+        model_id = self.model_id if model == self.model else model_dict.get(model, model)
+        limiter = self.limiter if model == self.model else get_limiter(
+            get_service_type(model), max_concurrency=max(1, self.concurrency_limits[get_service_type(model)])
+        )
+        call_settings = self.get_call_settings(model, plugin_name) if self.service_ids or self.response_cache is not None else None
+        invoke_arguments = arguments
+        if self.service_ids:
+            # Several services are registered, so the call names the one of its model
+            invoke_arguments = {'arguments': KernelArguments(settings=call_settings, **arguments)}
+        with tracer.span("llm", function=function_name, model=model_id) as span:
+            key = None
+            prompt = self.prompts.get((plugin_name, function_name))
+            rendered = render_prompt(prompt, arguments) if prompt is not None else None
+            if rendered is not None:
+                span.set(prompt_tokens=estimate_tokens(rendered))
+            if self.response_cache is not None and rendered is not None:
+                # Keyed on the settings this call runs with, e.g. the keywords prompt's own token cap
+                key = self.response_cache.key(model_id, rendered, dump_settings(call_settings))
+                cached = self.response_cache.get(key)
+                tracer.metrics.inc("cache_requests_total", cache="response", hit=cached is not None)
+                if cached is not None:
+                    span.set(cache_hit=True)
+                    return cached
+
+            result = await call_with_retries(
+                lambda: self.kernel.invoke(plugin_name=plugin_name, function_name=function_name, **invoke_arguments),
+                limiter, self.retries, self.llm_timeout, self.llm_deadline,
+            )
+            value = str(result.value[0])
+            span.set(cache_hit=False, completion_tokens=estimate_tokens(value))
+            tracer.metrics.inc("llm_tokens_total", span.attributes.get("prompt_tokens", 0), direction="prompt", model=model_id)
+            tracer.metrics.inc("llm_tokens_total", span.attributes["completion_tokens"], direction="completion", model=model_id)
+            if key is not None:
+                self.response_cache.put(key, value)
+            return value
+
+    async def extract_column(self, column, paper_text, chunks=None, semaphore=None):
+        """Run the LLM prompt of a single table column, as map-over-chunks then reduce for chunked papers"""
+        plugin_name = column.replace(" ", "") + "ChatBot"
+
+        def invoke(function_name, model, **arguments):
+            # column_timeout bounds each call once it runs, so waiting for the semaphore
+            # or for a faster model of the cascade does not eat into its budget
+            coroutine = self.invoke_prompt_function(plugin_name, function_name, model=model, **arguments)
+            return asyncio.wait_for(coroutine, timeout=self.column_timeout) if self.column_timeout is not None else coroutine
+
+        async def call(function_name, model, **arguments):
+            if semaphore is None:
+                return await invoke(function_name, model, **arguments)
+            async with semaphore:
+                return await invoke(function_name, model, **arguments)
+
+        async def run(model=None):
+            routed = route_chunks(column, chunks, self.max_chunks) if chunks else []
+            if len(routed) <= 1:
+                return await call(column.replace(" ", ""), model, paper_text=routed[0].text if routed else paper_text)
+            if semaphore is None:
+                partials = [await call(column.replace(" ", ""), model, paper_text=chunk.text) for chunk in routed]
+            else:
+                partials = await asyncio.gather(*[call(column.replace(" ", ""), model, paper_text=chunk.text) for chunk in routed])
+            partial_results = "\n\n".join(f"Part {index + 1}: {partial}" for index, partial in enumerate(partials))
+            return await call(column.replace(" ", "") + "Reduce", model, partial_results=partial_results)
+
+        if self.cascade is not None:
+            return await self.run_cascade(column, run, validate_cell)
+        return await run()
+
+    async def run_cascade(self, task, run, validate):
+        """Await `run(model)` for the models of a task's route until an answer passes `validate`.
+
+        Failed calls escalate like invalid answers; the last model's answer or error is final.
+        """
+        models = self.get_routes(task)
+        for step, model in enumerate(models):
+            last = step == len(models) - 1
+            try:
+                value = await run(model)
+            except Exception as e:
+                if last:
+                    raise
+                logger.info(f"Escalating {task} from {model} after {e!r}")
+                continue
+            if last or validate(value):
+                tracer.metrics.inc("cascade_answers_total", model=model_dict.get(model, model), step=step)
+                return value
+            logger.info(f"Escalating {task} from {model}: answer failed validation")
+
+    def get_chunks(self, paper_text):
+        """Token-budgeted chunks of a paper, or None when chunking is disabled"""
+        return chunk_text(paper_text, self.chunk_tokens) if self.chunk_tokens is not None else None
+
+    async def get_survey_table(self, paper_text, columns=None, on_cell=None):
+        """Run LLMs for each keywords prompt, or only for the given columns.
+
+        `on_cell(column, value)` is called as soon as each cell is known.
+        """
+        columns = self.table_columns if columns is None else columns
+        chunks = self.get_chunks(paper_text)
+        table_info = {}
+        # A single missing column is cheaper to extract on its own than with the fused prompt
+        if self.fused and len(columns) > 1:
+            # With a cascade the fused prompt goes to the fastest model; invalid fields are extracted again below
+            model = self.get_routes(DEFAULT_TASK)[0] if self.cascade is not None else None
+            table_info = {
+                column: value for column, value in (await self.extract_fused(paper_text, chunks, model, columns)).items()
+                if model is None or validate_cell(value)
+            }
+            if on_cell is not None:
+                for column, value in table_info.items():
+                    on_cell(column, value)
+        # Columns missing from the fused answer are extracted one by one
+        missing = [column for column in columns if column not in table_info]
+        if missing:
+            table_info.update(await self.extract_columns(missing, paper_text, chunks, on_cell))
+        return {column: table_info[column] for column in columns}
+
+    async def extract_columns(self, columns, paper_text, chunks=None, on_cell=None):
+        """Run the prompts of several columns, one after another or concurrently"""
+        if not self.concurrent:
+            table_info = {}
+            for column in columns:
+                table_info[column] = await self.extract_column(column, paper_text, chunks)
+                if on_cell is not None:
+                    on_cell(column, table_info[column])
+            return table_info
+
+        semaphore = asyncio.Semaphore(self.get_concurrency_limit())
+
+        async def run_column(column):
+            try:
+                value = await self.extract_column(column, paper_text, chunks, semaphore)
+            except Exception as e:
+                # Contain the failure so the other columns of the row survive
+                logger.warning(f"Failed to extract column '{column}': {e!r}")
+                value = "N/A"
+            if on_cell is not None:
+                on_cell(column, value)
+            return value
+
+        values = await asyncio.gather(*[run_column(column) for column in columns])
+        # gather preserves the input order, so the dict follows the columns
+        return dict(zip(columns, values))
+
+    async def extract_fused(self, paper_text, chunks=None, model=None, columns=None):
+        """Extract the columns (default: all) with one JSON answer per paper (or per chunk, then reduced)"""
+        columns = self.table_columns if columns is None else columns
+        fields = json.dumps(list(columns))
+        try:
+            routed = route_chunks(" ".join(columns), chunks, self.max_chunks) if chunks else []
+            if len(routed) <= 1:
+                output = await self.invoke_prompt_function(
+                    "SurveyChatBot", "FusedExtraction", model=model, fields=fields, paper_text=routed[0].text if routed else paper_text
+                )
+            else:
+                semaphore = asyncio.Semaphore(self.get_concurrency_limit() if self.concurrent else 1)
+
+                async def extract_chunk(chunk):
+                    async with semaphore:
+                        return await self.invoke_prompt_function("SurveyChatBot", "FusedExtraction", model=model, fields=fields, paper_text=chunk.text)
+
+                partials = await asyncio.gather(*[extract_chunk(chunk) for chunk in routed])
+                partial_results = "\n\n".join(f"Part {index + 1}: {partial}" for index, partial in enumerate(partials))
+                output = await self.invoke_prompt_function("SurveyChatBot", "FusedReduce", model=model, fields=fields, partial_results=partial_results)
+        except Exception as e:
+            logger.warning(f"Fused extraction failed, falling back to per-column prompts: {e!r}")
+            return {}
+        table_info = parse_json_fields(output, columns)
+        if len(table_info) < len(columns):
+            logger.info(f"Fused answer covered {len(table_info)}/{len(columns)} columns")
         return table_info
 
     @kernel_function(
         description="Extract keywords from user query using LLM",
         name="get_keywords"
     )
-    def get_keywords(self, query: str) -> str:
-        keywords = self.kernel.invoke(
+    async def get_keywords(self, query: str) -> str:
+        if self.cascade is not None:
+            return await self.run_cascade(KEYWORDS_TASK, lambda model: self.invoke_prompt_function(
+                plugin_name="KeywordsChatBot", function_name="KeywordsExtraction", model=model, query=query,
+            ), validate_keywords)
+        keywords = await self.invoke_prompt_function(
             plugin_name="KeywordsChatBot",
             function_name="KeywordsExtraction",
             query=query
@@ -113,76 +475,310 @@ class ResearchTools:
         name="retrieve_papers"
     )
     async def retrieve_papers(self, num_papers, keywords=None, year_range=None, authors=None, institutions=None, conferences=None) -> list:
-        time = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M')
-        paper_path = f"./results/papers/{time}"
-        os.makedirs(paper_path, exist_ok=True)
+        rows = {}
+        async for event in self.stream_papers(num_papers, keywords, year_range, authors, institutions, conferences):
+            if event['type'] == 'row':
+                rows[event['index']] = event['row']
+        return [rows[index] for index in sorted(rows)]
+
+    async def stream_papers(self, num_papers, keywords=None, year_range=None, authors=None, institutions=None, conferences=None):
+        """Yield the events of a search as soon as they happen.
 
+        Events are dicts with a 'type': 'search' (first, with the `trace_id` of the
+        search's spans), 'progress' (a paper left `stage`, `done` papers so far), 'cell'
+        (one extracted table cell of the paper at `index`), 'row' (the finished
+        table row of the paper at `index`, its position in the ranking) and 'error'
+        (the paper at `index` failed in `stage` and is left out; the others go on).
+        """
         year_range = [int(year) for year in year_range] if year_range else None
-        query_parts = []
-        if keywords:
-            query_parts.extend(keywords)
-        if authors:
-            query_parts.extend([f"au:{author}" for author in authors])
-        if institutions:
-            query_parts.extend([f"inst:{institution}" for institution in institutions])
-        if conferences:
-            query_parts.extend([f"co:{conference}" for conference in conferences])
-
-        query = ' AND '.join(query_parts)
-
-        search = arxiv.Search(
-            query=query,
-            max_results=num_papers,
-            sort_by=arxiv.SortCriterion.Relevance,
-            sort_order=arxiv.SortOrder.Descending
+        query = build_query(keywords, authors, institutions, conferences, year_range)
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+
+        def emit(event):
+            # Blocking stages run in worker threads, so events are handed over to the loop
+            loop.call_soon_threadsafe(events.put_nowait, event)
+
+        search_span = tracer.start("search", query=query, num_papers=num_papers)
+
+        # Institutions and conferences are not stored locally, so only arXiv can filter on them
+        local_papers = []
+        if keywords and not institutions and not conferences:
+            with tracer.span("local_search", parent=search_span) as span:
+                local_papers = await asyncio.to_thread(self.search_local, num_papers, keywords, year_range, authors)
+                span.set(papers=len(local_papers))
+        local_ids = {PDFCache.key(paper.entry_id) for paper in local_papers}
+
+        async def ranked_batches():
+            # Papers come in batches (the local hits, the reranked pool, an arXiv page), each looked up in the store at once
+            if self.reranker is not None:
+                # Rank a larger candidate pool and only pass the top survivors on to download
+                candidates = list(local_papers)
+                async for paper in iter_arxiv_results(query, num_papers * self.candidate_factor, year_range, page_size=self.page_size, delay_seconds=self.delay_seconds, retries=self.retries):
+                    if PDFCache.key(paper.entry_id) not in local_ids:
+                        candidates.append(paper)
+                with tracer.span("rerank", candidates=len(candidates)):
+                    ranked = await asyncio.to_thread(self.rerank_papers, candidates, keywords, num_papers)
+                yield ranked
+                return
+            if local_papers:
+                yield local_papers
+            remaining = num_papers - len(local_papers)
+            if remaining <= 0:
+                return
+            # Result pages are fetched lazily while earlier pages move through the pipeline
+            batch, scanned = [], 0
+            async for paper in iter_arxiv_results(query, num_papers, year_range, page_size=self.page_size, delay_seconds=self.delay_seconds, retries=self.retries):
+                scanned += 1
+                if PDFCache.key(paper.entry_id) not in local_ids:
+                    batch.append(paper)
+                    remaining -= 1
+                if batch and (remaining == 0 or scanned % self.page_size == 0):
+                    yield batch
+                    batch = []
+                if remaining == 0:
+                    return
+            if batch:
+                yield batch
+
+        async def matching_papers():
+            index = 0
+            async for batch in ranked_batches():
+                stored = await asyncio.to_thread(self.get_stored, [PDFCache.key(paper.entry_id) for paper in batch])
+                for paper in batch:
+                    arxiv_id = PDFCache.key(paper.entry_id)
+                    span = tracer.start("paper", parent=search_span, paper=arxiv_id, rank=index)
+                    yield {'paper': paper, 'keywords': keywords, 'index': index, 'emit': emit, 'span': span, 'stored': stored[arxiv_id]}
+                    index += 1
+
+        progress = {}
+
+        def tracked(name, func, blocking):
+            def report(job):
+                progress[name] = progress.get(name, 0) + 1
+                emit({'type': 'progress', 'stage': name, 'done': progress[name]})
+                return job
+
+            # Each stage of a paper is a span under the paper's span
+            if blocking:
+                def run_blocking(job):
+                    with tracer.span(name, parent=job['span']):
+                        job = func(job)
+                    return report(job)
+                return run_blocking
+
+            async def run(job):
+                with tracer.span(name, parent=job['span']):
+                    job = await func(job)
+                return report(job)
+            return run
+
+        def failed(stage, index, job, error):
+            job['span'].set(error=repr(error))
+            job['span'].end()
+            emit({'type': 'error', 'index': index, 'title': job['paper'].title, 'stage': stage, 'error': repr(error)})
+
+        # Downloads, PDF parsing and LLM extraction overlap across papers
+        pipeline = Pipeline([
+            Stage(name, tracked(name, func, blocking), workers=workers, blocking=blocking)
+            for name, func, workers, blocking in [
+                ("lookup", self.lookup_paper, 1, True),
+                ("download", self.download_paper, self.workers["download"], False),
+                ("parse", self.parse_paper, self.workers["parse"], False),
+                ("extract", self.extract_paper, self.workers["extract"], False),
+            ]
+        ], on_error=failed)
+        end = object()
+        jobs = []
+
+        async def produce():
+            try:
+                # Tasks started here inherit the search span, e.g. for arXiv page requests
+                with tracer.use(search_span):
+                    async for index, job in pipeline.stream(matching_papers()):
+                        job['span'].end()
+                        jobs.append(job)
+                        emit({'type': 'row', 'index': index, 'row': job['result']})
+            finally:
+                emit(end)
+
+        task = asyncio.ensure_future(produce())
+        try:
+            yield {'type': 'search', 'trace_id': search_span.trace_id}
+            while True:
+                event = await events.get()
+                if event is end:
+                    break
+                yield event
+            await task
+        finally:
+            if not task.done():
+                task.cancel()
+            # Papers finished before an error or an early stop are kept as well
+            with tracer.use(search_span):
+                await asyncio.to_thread(self.save_to_store, jobs)
+            search_span.set(papers=len(jobs))
+            search_span.end()
+            await asyncio.to_thread(tracer.flush)
+
+    def rerank_papers(self, papers, keywords, num_papers):
+        """Top papers by title and abstract similarity to the keywords, without near-duplicates"""
+        kept = self.reranker.rerank(
+            " ".join(keywords or []),
+            [PDFCache.key(paper.entry_id) for paper in papers],
+            [f"{paper.title}\n{paper.summary}" for paper in papers],
+            num_papers,
         )
+        logger.info(f"Reranking kept {len(kept)} of {len(papers)} candidates")
+        return [papers[index] for index in kept]
 
-        min_year, max_year = (int(min(year_range)), int(max(year_range))) if year_range else (None, None)
-        client = arxiv.Client()
-        results = []
-
-        for paper in client.results(search):
-            paper_year = paper.published.year
-            if (min_year is None or paper_year >= min_year) and (max_year is None or paper_year <= max_year):
-                result = {
-                    'title': paper.title,
-                    'year': paper.published.year,
-                    'author': ', '.join([author.name for author in paper.authors]),
-                    'url': paper.pdf_url,
-                    'abstract': paper.summary,
-                    'keywords': ', '.join(keywords) if keywords else 'N/A'
-                }
-
-                paper.download_pdf(dirpath=paper_path, filename=f"{paper.title.replace(' ', '_')}.pdf")
-                file_path = paper_path + "/" + f"{paper.title.replace(' ', '_')}.pdf"
-
-                if os.path.exists(file_path):
-                    paper_text = extract_text_from_pdf(file_path)
-                    table_info = await self.get_survey_table(paper_text=paper_text)
-                    result.update(table_info)
-                results.append(result)
-        df = pd.DataFrame(results)
-        df.to_csv(f"./results/info/{time}.csv", index=False, encoding='utf-8-sig')
-        return results
+    def search_local(self, num_papers, keywords, year_range=None, authors=None):
+        """Papers of the local index containing every keyword, filtered by year and authors in the store"""
+        hits = self.index.search(" ".join(keywords), k=num_papers * 5)
+        if not hits:
+            return []
+        rows = {paper['arxiv_id']: paper for paper in self.store.query(year_range, authors, [doc_id for doc_id, _ in hits])}
+        papers = [stored_result(rows[doc_id]) for doc_id, _ in hits if doc_id in rows][:num_papers]
+        logger.info(f"Local index answered {len(papers)}/{num_papers} papers")
+        return papers
+
+    def get_stored(self, arxiv_ids):
+        """Stored cells and texts of a batch of papers, with one store query for each: {arxiv_id: {'cells', 'text'}}"""
+        stored = {arxiv_id: {'cells': {}, 'text': None} for arxiv_id in arxiv_ids}
+        if self.table_columns:
+            # Cells are reused per (paper, column prompt hash, model), so only new or changed columns are extracted
+            keys = {column: (column, self.get_prompt_hash(column)) for column in self.table_columns}
+            for arxiv_id, cells in self.store.get_cells(arxiv_ids, self.model_id).items():
+                stored[arxiv_id]['cells'] = {column: cells[key] for column, key in keys.items() if key in cells}
+        # Texts are only read for papers with columns left to extract
+        missing = [arxiv_id for arxiv_id in arxiv_ids if not self.table_columns or len(stored[arxiv_id]['cells']) < len(self.table_columns)]
+        if missing:
+            for arxiv_id, text in self.store.get_texts(missing).items():
+                stored[arxiv_id]['text'] = text
+        return stored
+
+    def lookup_paper(self, job):
+        """Pipeline stage: serve stored table cells and paper texts from disk"""
+        job['arxiv_id'] = PDFCache.key(job['paper'].entry_id)
+        job['table_info'] = None
+        job['paper_text'] = None
+        # stream_papers looks up each batch of papers at once; a job on its own is looked up here
+        stored = job.get('stored') or self.get_stored([job['arxiv_id']])[job['arxiv_id']]
+        job['stored_cells'] = dict(stored['cells'])
+        if self.table_columns:
+            tracer.annotate(cells_hit=len(job['stored_cells']))
+            if len(job['stored_cells']) == len(self.table_columns):
+                job['table_info'] = dict(job['stored_cells'])
+                return job
+        # A stored text makes downloading and parsing the PDF again unnecessary
+        job['paper_text'] = stored['text']
+        job['stored_text'] = job['paper_text'] is not None
+        tracer.annotate(text_hit=job['stored_text'])
+        return job
+
+    async def download_paper(self, job):
+        """Pipeline stage: fetch the PDF of an arXiv result, from the cache when possible"""
+        paper = job['paper']
+        job['file_path'] = None
+        if job['table_info'] is not None or job['paper_text'] is not None:
+            return job
+        try:
+            job['file_path'] = self.pdf_cache.get(paper.entry_id)
+            cache_hit = job['file_path'] is not None
+            if not cache_hit:
+                # Downloads take the arXiv limiter like page requests; every attempt and all retries are bounded
+                limits = backend_limits["arxiv"]
+                job['file_path'] = await call_with_retries(
+                    lambda: asyncio.to_thread(self.pdf_cache.fetch, paper, limits["timeout"]),
+                    get_limiter("arxiv", rate=1 / self.delay_seconds if self.delay_seconds else None),
+                    self.retries, timeout=limits["timeout"], deadline=limits["deadline"],
+                )
+            size = os.path.getsize(job['file_path'])
+            tracer.annotate(cache_hit=cache_hit, bytes=size)
+            tracer.metrics.inc("cache_requests_total", cache="pdf", hit=cache_hit)
+            if not cache_hit:
+                tracer.metrics.inc("downloaded_bytes_total", size)
+        except Exception as e:
+            logger.warning(f"Failed to download '{paper.title}': {e!r}")
+        return job
+
+    async def parse_paper(self, job):
+        """Pipeline stage: extract the text of a downloaded PDF"""
+        if job['file_path'] and os.path.exists(job['file_path']):
+            if self.pdf_parser is not None:
+                job['paper_text'] = await self.pdf_parser.parse(job['file_path'])
+            else:
+                job['paper_text'] = await asyncio.to_thread(extract_text_from_pdf, job['file_path'])
+            tracer.annotate(bytes=os.path.getsize(job['file_path']), chars=len(job['paper_text'] or ""))
+        return job
+
+    async def extract_paper(self, job):
+        """Pipeline stage: build the survey table row of a paper"""
+        paper, keywords = job['paper'], job['keywords']
+        result = {
+            'title': paper.title,
+            'year': paper.published.year,
+            'author': ', '.join([author.name for author in paper.authors]),
+            'url': paper.pdf_url,
+            'abstract': paper.summary,
+            'keywords': ', '.join(keywords) if keywords else 'N/A'
+        }
+        job['cells'] = []
+        if job['table_info'] is not None:
+            result.update(job['table_info'])
+        elif job['paper_text'] is not None:
+            missing = [column for column in self.table_columns if column not in job['stored_cells']]
+            table_info = await self.get_survey_table(paper_text=job['paper_text'], columns=missing, on_cell=self.cell_reporter(job)) if missing else {}
+            merged = dict(job['stored_cells'], **table_info)
+            result.update({column: merged[column] for column in self.table_columns if column in merged})
+            job['cells'] = [
+                {'arxiv_id': job['arxiv_id'], 'column': column, 'model': self.model_id,
+                 'prompt_hash': self.get_prompt_hash(column), 'value': value}
+                for column, value in table_info.items() if column in self.table_columns and value != "N/A"
+            ]
+        job['result'] = result
+        return job
+
+    def cell_reporter(self, job):
+        """Callback emitting the cells of a job's paper as events"""
+        def on_cell(column, value):
+            job['emit']({'type': 'cell', 'index': job['index'], 'title': job['paper'].title, 'column': column, 'value': value})
+        return on_cell
+
+    def save_to_store(self, jobs):
+        """Persist the papers, new table cells and texts of a search, and index new texts and abstracts"""
+        with tracer.span("persist", papers=len(jobs)):
+            self._save_to_store(jobs)
+
+    def _save_to_store(self, jobs):
+        self.store.upsert_papers([dict(job['result'], arxiv_id=job['arxiv_id']) for job in jobs])
+        self.store.write_cells([cell for job in jobs for cell in job['cells']])
+        new_texts = {job['arxiv_id']: job['paper_text'] for job in jobs if job['paper_text'] and not job.get('stored_text')}
+        self.store.write_texts(new_texts)
+        # Every search adds segments, and every lookup opens all of them
+        self.store.compact_if_needed()
+
+        indexed = self.index.doc_ids()
+        self.index.add_documents({
+            job['arxiv_id']: "\n".join([job['result']['title'], job['result']['abstract'] or "", new_texts.get(job['arxiv_id'], "")])
+            for job in jobs if job['arxiv_id'] in new_texts or job['arxiv_id'] not in indexed
+        })
 
     @kernel_function(
         description="Save paper metadata to Zotero.",
         name="save_to_zotero"
     )
     def save_to_zotero(self, papers, USER_ID, LIBRARY_TYPE, API_KEY) -> bool:
-        zot = zotero.Zotero(USER_ID, LIBRARY_TYPE, API_KEY)
-
-        for paper in papers:
-            paper_item = {
-                'itemType': 'journalArticle',
-                'title': paper['title'],
-                'date': paper['year'],
-                'url': paper['url']
-            }
-            response = zot.create_items([paper_item])
-            if 'successful' in response and response['successful']:
-                print("Paper added successfully!")
-                return True
+        from src.zotero_sync import ZoteroSync
+        sync = ZoteroSync(USER_ID, LIBRARY_TYPE, API_KEY, pdf_cache=self.pdf_cache)
+        with tracer.span("zotero", papers=len(papers)) as span:
+            report = sync.upload(papers)
+            span.set(**{status: sum(entry['status'] == status for entry in report) for status in ['created', 'duplicate', 'failed']})
+        tracer.flush()
+
+        for entry in report:
+            if entry['status'] == 'failed':
+                logger.warning(f"Failed to add paper '{entry['title']}': {entry.get('error')}")
             else:
-                print("Failed to add paper:", response)
-                return False
\ No newline at end of file
+                logger.info(f"Paper '{entry['title']}' {entry['status']} (attachment: {entry.get('attachment', 'none')})")
+        return all(entry['status'] != 'failed' for entry in report)
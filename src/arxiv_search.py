@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import datetime
+
+from arxiv import arxiv
+
+from src.ratelimit import backend_limits, call_with_retries, get_limiter
+from src.telemetry import tracer
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+
+def build_query(keywords=None, authors=None, institutions=None, conferences=None, year_range=None):
+    """Build an arXiv query, pushing the year range down as a submittedDate constraint"""
+    query_parts = []
+    if keywords:
+        query_parts.extend(keywords)
+    if authors:
+        query_parts.extend([f"au:{author}" for author in authors])
+    if institutions:
+        query_parts.extend([f"inst:{institution}" for institution in institutions])
+    if conferences:
+        query_parts.extend([f"co:{conference}" for conference in conferences])
+    if year_range:
+        min_year, max_year = int(min(year_range)), int(max(year_range))
+        query_parts.append(f"submittedDate:[{min_year}01010000 TO {max_year}12312359]")
+    return ' AND '.join(query_parts)
+
+
+def in_year_range(paper, year_range):
+    """Check a result's publication year against the (unordered) year range"""
+    if not year_range:
+        return True
+    return int(min(year_range)) <= paper.published.year <= int(max(year_range))
+
+
+def stored_result(paper):
+    """Rebuild an arXiv result from a paper row of the local store"""
+    return arxiv.Result(
+        entry_id=f"http://arxiv.org/abs/{paper['arxiv_id']}",
+        published=datetime.datetime(int(paper['year']), 1, 1),
+        title=paper['title'],
+        authors=[arxiv.Result.Author(name) for name in str(paper['author'] or "").split(', ') if name],
+        summary=paper['abstract'] or "",
+        links=[arxiv.Result.Link(str(paper['url']), title="pdf")],
+    )
+
+
+async def iter_arxiv_results(query, num_papers, year_range=None, page_size=25, delay_seconds=3.0, max_results=None, client=None, limiter=None, retries=4):
+    """Yield arXiv results matching the year range until `num_papers` have been found.
+
+    Result pages of `page_size` entries are requested lazily, at most one every
+    `delay_seconds` as the arXiv API asks, so downstream stages can start on the
+    first results while later pages are still being fetched. At most `max_results`
+    results (default 20 x num_papers) are scanned.
+
+    Page requests of every search in the process share the arXiv limiter; failed
+    pages (HTTP 503, empty pages, timeouts) are retried with backoff from the
+    offset reached so far.
+    """
+    search = arxiv.Search(
+        query=query,
+        max_results=max_results or num_papers * 20,
+        sort_by=arxiv.SortCriterion.Relevance,
+        sort_order=arxiv.SortOrder.Descending
+    )
+    client = client or arxiv.Client(page_size=page_size, delay_seconds=delay_seconds)
+    limiter = limiter or get_limiter("arxiv", rate=1 / delay_seconds if delay_seconds else None)
+    state = {'results': iter(client.results(search))}
+
+    async def next_result():
+        try:
+            # Fetching a page blocks on the network and the polite delay, so it runs in a thread
+            return await asyncio.to_thread(next, state['results'], _END)
+        except BaseException:
+            # A failed or abandoned generator is unusable, so resume with a new one at the current offset
+            state['results'] = iter(client.results(search, offset=scanned))
+            raise
+
+    found = scanned = 0
+    while found < num_papers:
+        # Only every page_size-th result triggers a request, the others come from the fetched page
+        new_page = scanned % page_size == 0
+        if new_page:
+            with tracer.span("arxiv_page", offset=scanned):
+                paper = await call_with_retries(
+                    next_result, limiter, retries, timeout=backend_limits["arxiv"]["timeout"], deadline=backend_limits["arxiv"]["deadline"],
+                )
+        else:
+            paper = await call_with_retries(next_result, None, retries)
+        if paper is _END:
+            logger.info(f"arXiv results exhausted after {scanned} results, {found}/{num_papers} found")
+            return
+        scanned += 1
+        # The submittedDate constraint already filters server-side; this guards against edge cases
+        if in_year_range(paper, year_range):
+            found += 1
+            yield paper
@@ -0,0 +1,187 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import shutil
+import sqlite3
+import tempfile
+import threading
+from urllib.request import urlopen
+
+logger = logging.getLogger(__name__)
+
+
+class PDFCache:
+    """Persistent cache of arXiv PDFs keyed by entry id and version, with LRU eviction.
+
+    A versioned arXiv id (e.g. 2301.00001v2) always refers to the same file, so it
+    is used directly as the cache key. Files are downloaded to a temporary name and
+    renamed into place, so readers never see a partially written PDF. The least
+    recently used files are evicted once the cache grows beyond `max_bytes`.
+    """
+
+    def __init__(self, root="./results/papers/cache", max_bytes=2 * 1024 ** 3):
+        self.root = str(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(entry_id):
+        """Turn an arXiv entry id (http://arxiv.org/abs/2301.00001v2) or PDF url into a file-safe key"""
+        short_id = re.split(r"/(?:abs|pdf)/", str(entry_id))[-1]
+        short_id = re.sub(r"\.pdf$", "", short_id)
+        return re.sub(r"[^A-Za-z0-9._-]", "_", short_id)
+
+    def path(self, entry_id):
+        return os.path.join(self.root, self.key(entry_id) + ".pdf")
+
+    def get(self, entry_id):
+        """Return the cached PDF path of an entry, or None on a cache miss"""
+        path = self.path(entry_id)
+        try:
+            # Refresh the access time used by the LRU policy
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def fetch(self, paper, timeout=60):
+        """Return the local path of an arXiv result's PDF, downloading it only on a cache miss.
+
+        Connecting and every read are bounded by `timeout` seconds, which arxiv's own
+        `download_pdf` (urlretrieve without a socket timeout) is not.
+        """
+        path = self.get(paper.entry_id)
+        if path is not None:
+            logger.info(f"PDF cache hit for {self.key(paper.entry_id)}")
+            return path
+
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".part")
+        os.close(fd)
+        try:
+            with urlopen(paper.pdf_url, timeout=timeout) as response, open(tmp_path, "wb") as file:
+                shutil.copyfileobj(response, file)
+            # Atomic on POSIX and Windows: concurrent readers see either nothing or the full file
+            os.replace(tmp_path, self.path(paper.entry_id))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.evict(keep=self.path(paper.entry_id))
+        return self.path(paper.entry_id)
+
+    def evict(self, keep=None):
+        """Delete least recently used PDFs until the cache fits in max_bytes"""
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.root):
+                if entry.name.endswith(".pdf") and entry.is_file():
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+
+
+class ResponseCache:
+    """SQLite-backed cache of LLM responses with TTL and max-size eviction.
+
+    Entries are keyed by a hash of the model id, the rendered prompt and the
+    execution settings, so identical requests are answered without calling the
+    model. Hits and misses are counted for monitoring. Once the cache holds more than
+    `max_entries`, the least recently used entries are evicted down to
+    `evict_fraction` of it in one go, so the eviction query runs once every many puts
+    instead of on every put.
+    """
+
+    def __init__(self, path="./results/cache/responses.sqlite", ttl=30 * 24 * 3600, max_entries=100000, evict_fraction=0.9):
+        self.path = str(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.evict_fraction = evict_fraction
+        # Row count, counted on connect and kept up to date by this instance (replacements overcount it)
+        self._entries = 0
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model_id, prompt, settings=None):
+        """Hash the inputs that determine an LLM response"""
+        payload = json.dumps([model_id, prompt, settings], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _connect(self):
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+            self._entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return self._conn
+
+    def get(self, key):
+        """Return the cached response for a key, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                conn.commit()
+                self._entries -= 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, value):
+        """Store a response and evict the least recently used entries beyond max_entries"""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._entries += 1
+            if self._entries > self.max_entries:
+                conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (max(1, int(self.max_entries * self.evict_fraction)),),
+                )
+                # Recounting also takes in entries written by other processes sharing the file
+                self._entries = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            conn.commit()
+
+    def stats(self):
+        """Hit/miss counters of this cache instance"""
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
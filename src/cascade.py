@@ -0,0 +1,90 @@
+import re
+import json
+import logging
+
+from src.chunking import estimate_tokens
+from src.utils import extract_parameters
+
+logger = logging.getLogger(__name__)
+
+# Task of the keywords prompt; survey columns without a route of their own use "default"
+KEYWORDS_TASK = "KeywordsExtraction"
+DEFAULT_TASK = "default"
+
+# Answers that decline, or report the information as missing, instead of extracting it
+refusal_pattern = re.compile(
+    r"\b(i'?m sorry|i cannot|i can'?t|i am unable|unable to (?:extract|find|determine)|as an ai|"
+    r"no (?:relevant )?information|not (?:explicitly )?(?:provided|mentioned|specified|stated|available)|"
+    r"does not (?:mention|provide|specify|contain))\b",
+    re.IGNORECASE,
+)
+
+
+def validate_cell(value, max_tokens=400):
+    """Whether a column answer looks usable: not empty, not a refusal and not a rambling reply"""
+    text = str(value or "").strip()
+    if not text or text.strip(".").upper() in ("N/A", "NA", "NONE", "UNKNOWN"):
+        return False
+    if refusal_pattern.search(text[:300]):
+        return False
+    return estimate_tokens(text) <= max_tokens
+
+
+def validate_keywords(answer):
+    """Whether a keywords answer parses into at least one search parameter"""
+    return any(extract_parameters(str(answer or "")).values())
+
+
+class RoutingTable:
+    """Models to try for each task, fastest first, learned from evaluation quality and latency.
+
+    A route holds the models whose quality on the task reaches `min_quality`, ordered by
+    median latency. `route(task, target)` keeps up to `max_steps - 1` of those faster than
+    `target` and ends with `target`, the model chosen by the user, which is only asked
+    when the faster ones fail validation.
+    """
+
+    def __init__(self, routes=None, latency=None, quality=None, min_quality=0.8, max_steps=2):
+        self.routes = routes or {}
+        self.latency = latency or {}
+        self.quality = quality or {}
+        self.min_quality = min_quality
+        self.max_steps = max_steps
+
+    @classmethod
+    def learn(cls, quality, latency, min_quality=0.8, max_steps=2):
+        """Build routes from {model: {task: score}} and {model: seconds}; the default task uses mean scores"""
+        tasks = sorted({task for scores in quality.values() for task in scores})
+        quality = {model: dict(scores) for model, scores in quality.items()}
+        for model, scores in quality.items():
+            if scores:
+                scores.setdefault(KEYWORDS_TASK, sum(scores.get(task, 0) for task in tasks) / len(tasks))
+                scores.setdefault(DEFAULT_TASK, scores[KEYWORDS_TASK])
+        routes = {}
+        for task in tasks + [KEYWORDS_TASK, DEFAULT_TASK]:
+            qualified = [model for model, scores in quality.items() if scores.get(task, 0) >= min_quality]
+            routes[task] = sorted(qualified, key=lambda model: (latency.get(model, float("inf")), -quality[model][task]))
+        return cls(routes, latency, quality, min_quality, max_steps)
+
+    def route(self, task, target):
+        """Models to ask in turn for a task, ending with the target model"""
+        candidates = self.routes.get(task, self.routes.get(DEFAULT_TASK, []))
+        limit = self.latency.get(target, float("inf"))
+        faster = [model for model in candidates if model != target and self.latency.get(model, float("inf")) < limit]
+        return faster[:max(0, self.max_steps - 1)] + [target]
+
+    def models(self):
+        return sorted({model for route in self.routes.values() for model in route})
+
+    def to_dict(self):
+        return {"routes": self.routes, "latency": self.latency, "quality": self.quality,
+                "min_quality": self.min_quality, "max_steps": self.max_steps}
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file, indent=4)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as file:
+            return cls(**json.load(file))
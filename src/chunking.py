@@ -0,0 +1,117 @@
+import re
+from collections import namedtuple
+
+# A piece of paper text and the titles of the sections it covers
+Chunk = namedtuple("Chunk", ["sections", "text"])
+
+# Numbered headings ("3 Method", "4.2. Results", "IV. EXPERIMENTS") or well-known unnumbered ones
+heading_pattern = re.compile(
+    r"^[^\S\n]*(?:(?:\d+(?:\.\d+)*\.?|[IVX]+\.)[^\S\n]+[A-Z][^\n.]{1,60}"
+    r"|abstract|introduction|related work|background|preliminaries|methods?|methodology|approach"
+    r"|experiments?|experimental setup|results|evaluation|discussion|conclusions?|limitations)[^\S\n]*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# Section words that hint a chunk is relevant to a column about a given topic
+section_hints = {
+    "method": ["method", "approach", "model", "architecture", "framework", "algorithm"],
+    "experiment": ["experiment", "result", "evaluation", "ablation", "benchmark", "setup"],
+    "finding": ["result", "experiment", "evaluation", "discussion", "conclusion"],
+    "result": ["result", "experiment", "evaluation", "discussion"],
+    "dataset": ["dataset", "data", "experiment", "setup", "benchmark"],
+    "metric": ["metric", "evaluation", "experiment", "result"],
+    "limitation": ["limitation", "discussion", "conclusion", "future"],
+    "contribution": ["abstract", "introduction", "conclusion"],
+    "problem": ["abstract", "introduction", "background"],
+    "motivation": ["abstract", "introduction", "background"],
+    "related": ["related", "background"],
+}
+
+# Column words too common to say anything about relevance
+stopwords = {"a", "an", "and", "for", "in", "key", "main", "of", "on", "the", "to", "used", "with"}
+
+
+def estimate_tokens(text):
+    """Cheap token count estimate (about four characters per token for English text)"""
+    return len(text) // 4 + 1
+
+
+def split_sections(text):
+    """Split paper text into (title, text) sections at detected headings"""
+    sections = []
+    title, start = "", 0
+    for match in heading_pattern.finditer(text):
+        if match.start() > start:
+            sections.append((title, text[start:match.start()]))
+        title, start = match.group().strip(), match.start()
+    if start < len(text):
+        sections.append((title, text[start:]))
+    return sections
+
+
+def _split_oversized(text, max_tokens):
+    """Split a section larger than the budget at line boundaries"""
+    max_chars = max_tokens * 4
+    pieces, current = [], ""
+    for line in text.splitlines(keepends=True):
+        while len(line) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(line[:max_chars])
+            line = line[max_chars:]
+        if current and len(current) + len(line) > max_chars:
+            pieces.append(current)
+            current = ""
+        current += line
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_text(text, max_tokens=1500):
+    """Split paper text into section-aware chunks of at most `max_tokens` estimated tokens.
+
+    Consecutive small sections are packed together; sections larger than the budget
+    are split at line boundaries.
+    """
+    chunks, sections, parts = [], [], []
+    size = 0
+
+    for title, section_text in split_sections(text):
+        for piece in _split_oversized(section_text, max_tokens):
+            if parts and (size + len(piece)) // 4 + 1 > max_tokens:
+                chunks.append(Chunk(sections=sections, text="".join(parts)))
+                sections, parts, size = [], [], 0
+            if title not in sections:
+                sections.append(title)
+            parts.append(piece)
+            size += len(piece)
+    if parts:
+        chunks.append(Chunk(sections=sections, text="".join(parts)))
+    return chunks
+
+
+def score_chunk(column, chunk):
+    """Relevance of a chunk for a column: hint words in section titles weigh more than in the text"""
+    words = re.findall(r"[a-z]+", column.lower())
+    hints = set(words)
+    for word in words:
+        for topic, topic_hints in section_hints.items():
+            if word.startswith(topic):
+                hints.update(topic_hints)
+    titles = " ".join(chunk.sections).lower()
+    text = chunk.text.lower()
+    return sum(3 * (hint in titles) + min(text.count(hint), 5) for hint in hints if hint not in stopwords)
+
+
+def route_chunks(column, chunks, max_chunks=3):
+    """Keep the chunks most relevant to a column, in document order"""
+    if len(chunks) <= max_chunks:
+        return list(chunks)
+    scores = [score_chunk(column, chunk) for chunk in chunks]
+    ranked = sorted(range(len(chunks)), key=lambda index: -scores[index])[:max_chunks]
+    if not any(scores[index] for index in ranked):
+        # Nothing matched: fall back to the beginning of the paper (abstract and introduction)
+        ranked = range(max_chunks)
+    return [chunks[index] for index in sorted(ranked)]
@@ -0,0 +1,229 @@
+"""
+Headless batch runner: build survey tables for a file of queries without the Streamlit app.
+
+Usage: python src/cli.py queries.jsonl --output results/batch.jsonl [--columns "Method,Dataset"]
+       [--model LLaMA-3] [--num-papers 10] [--concurrency 4]
+
+Each line of the queries file is either a plain-text query, which uses the
+command-line defaults, or a JSON object overriding them:
+{"id": "gnn", "query": "graph neural networks 2023", "columns": ["Method"], "num_papers": 20, "model": "GPT-4"}
+
+Rows are written as each query finishes, to JSONL or, for a .parquet output, to one
+Parquet file per query in an output directory. Finished queries are recorded in a
+checkpoint file next to the output; re-running the same command after a crash skips
+them and retries failed ones.
+"""
+import os
+import sys
+import json
+import asyncio
+import hashlib
+import logging
+import argparse
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+current_path = Path(__file__).resolve()
+parent_path = current_path.parent.parent
+sys.path.append(str(parent_path))
+from src.utils import extract_parameters
+
+logger = logging.getLogger(__name__)
+
+
+def query_id(spec):
+    """Stable id of a query spec, so edits elsewhere in the queries file keep checkpoints valid"""
+    payload = json.dumps([spec['query'], list(spec['columns']), spec['num_papers'], spec['model']])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def load_queries(path, defaults):
+    """Read query specs from a file of plain-text or JSON lines, dropping repeated ids"""
+    queries = {}
+    with open(path, 'r', encoding='utf-8') as file:
+        for line in file:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            spec = dict(defaults, **(json.loads(line) if line.startswith("{") else {'query': line}))
+            spec['columns'] = list(spec['columns'])
+            spec['id'] = str(spec.get('id') or query_id(spec))
+            queries.setdefault(spec['id'], spec)
+    return list(queries.values())
+
+
+class Checkpoint:
+    """Append-only log of finished queries: one JSON line per attempt, the last one wins"""
+
+    def __init__(self, path):
+        self.path = str(path)
+
+    def load(self):
+        status = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash can leave the last line half written
+                        continue
+                    status[entry['id']] = entry['status']
+        return status
+
+    def record(self, query_id, status, error=None):
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps({'id': query_id, 'status': status, 'error': error}) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+
+class JSONLWriter:
+    """Rows of each query appended to one JSONL file in a single write"""
+
+    def __init__(self, path):
+        self.path = str(path)
+
+    def recover(self, done):
+        """Drop rows of queries that were not checkpointed, e.g. written just before a crash"""
+        if not os.path.exists(self.path):
+            return
+        kept, dropped = [], 0
+        with open(self.path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    dropped += 1
+                    continue
+                if row.get('query_id') in done:
+                    kept.append(line if line.endswith("\n") else line + "\n")
+                else:
+                    dropped += 1
+        if dropped:
+            logger.info(f"Dropping {dropped} rows of unfinished queries from {self.path}")
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                file.writelines(kept)
+            os.replace(tmp_path, self.path)
+
+    def write(self, query_id, rows):
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write("".join(json.dumps(row, default=str) + "\n" for row in rows))
+            file.flush()
+            os.fsync(file.fileno())
+
+
+class ParquetWriter:
+    """Rows of each query written as one Parquet file in the output directory"""
+
+    def __init__(self, path):
+        self.path = str(path)
+
+    def part_path(self, query_id):
+        return os.path.join(self.path, f"part-{query_id}.parquet")
+
+    def recover(self, done):
+        if not os.path.isdir(self.path):
+            return
+        for entry in os.scandir(self.path):
+            if entry.name.startswith("part-") and entry.name[len("part-"):-len(".parquet")] not in done:
+                os.remove(entry.path)
+
+    def write(self, query_id, rows):
+        os.makedirs(self.path, exist_ok=True)
+        # Cells are stored as strings so the parts of queries with different columns stay readable together
+        table = pa.Table.from_pylist([{key: value if key == 'year' or value is None else str(value) for key, value in row.items()} for row in rows])
+        tmp_path = os.path.join(self.path, f".part-{query_id}.parquet")
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, self.part_path(query_id))
+
+
+async def run_query(research_tools, spec):
+    """Turn one query into survey table rows, as the Search button does"""
+    keywords = await research_tools.get_keywords(spec['query'])
+    params = extract_parameters(str(keywords))
+    return await research_tools.retrieve_papers(num_papers=spec['num_papers'], **params)
+
+
+async def run_batch(queries, get_tools, writer, checkpoint, concurrency=4):
+    """Run the queries not yet finished, at most `concurrency` at a time, and return (done, failed) counts"""
+    status = checkpoint.load()
+    done = {query_id for query_id, state in status.items() if state == 'done'}
+    writer.recover(done)
+    pending = iter([spec for spec in queries if spec['id'] not in done])
+    logger.info(f"{len(done)} queries already done, {len(queries) - len(done)} to run")
+    counts = {'done': 0, 'failed': 0}
+
+    async def worker():
+        for spec in pending:
+            try:
+                rows = await run_query(get_tools(spec['model'], spec['columns']), spec)
+                rows = [dict(row, query_id=spec['id'], query=spec['query']) for row in rows]
+                await asyncio.to_thread(writer.write, spec['id'], rows)
+            except Exception as e:
+                logger.warning(f"Query {spec['id']} ({spec['query']!r}) failed: {e!r}")
+                await asyncio.to_thread(checkpoint.record, spec['id'], 'failed', repr(e))
+                counts['failed'] += 1
+                continue
+            await asyncio.to_thread(checkpoint.record, spec['id'], 'done')
+            counts['done'] += 1
+            logger.info(f"Query {spec['id']} done with {len(rows)} papers")
+
+    # Workers share one iterator, so each query is taken exactly once
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return counts['done'], counts['failed']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("queries", help="file with one query per line (plain text or JSON)")
+    parser.add_argument("--output", default="./results/batch.jsonl", help="output .jsonl file or .parquet directory")
+    parser.add_argument("--checkpoint", default=None, help="checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--columns", default="", help="comma-separated default table columns")
+    parser.add_argument("--model", default="LLaMA-3")
+    parser.add_argument("--num-papers", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4, help="queries processed at the same time")
+    parser.add_argument("--api-key", default=os.environ.get("OPENAI_API_KEY"))
+    parser.add_argument("--cascade", default=None, help="routing table from evaluate/learn_routes.py; faster models answer first")
+    args = parser.parse_args(argv)
+
+    from src.cache import ResponseCache
+    from src.cascade import RoutingTable
+    from src.parsing import PDFParser
+    from src.store import PaperStore
+    from src.search_index import BM25Index
+    from src.kernel_pool import KernelPool, create_research_tools
+    from src.telemetry import tracer
+
+    defaults = {
+        'columns': [column.strip() for column in args.columns.split(",") if column.strip()],
+        'num_papers': args.num_papers,
+        'model': args.model,
+    }
+    queries = load_queries(args.queries, defaults)
+    writer = ParquetWriter(args.output) if args.output.endswith(".parquet") else JSONLWriter(args.output)
+    checkpoint = Checkpoint(args.checkpoint or args.output.rstrip("/") + ".checkpoint")
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    output_root = os.path.splitext(args.output.rstrip("/"))[0]
+    tracer.configure(jsonl_path=output_root + ".spans.jsonl", prometheus_path=output_root + ".metrics.prom")
+
+    # Caches, store and index are shared by the kernels of every model and column set
+    response_cache, store, index = ResponseCache(), PaperStore(), BM25Index()
+    cascade = RoutingTable.load(args.cascade) if args.cascade else None
+    with PDFParser() as pdf_parser:
+        pool = KernelPool(lambda model, table_columns, api_key: create_research_tools(
+            model, table_columns, api_key, concurrent=True, response_cache=response_cache, pdf_parser=pdf_parser,
+            chunk_tokens=1500, store=store, index=index, fused=model in ["GPT-4", "GPT-3.5 Turbo"], cascade=cascade,
+        ))
+        done, failed = asyncio.run(run_batch(
+            queries, lambda model, columns: pool.get(model, columns, args.api_key), writer, checkpoint, args.concurrency,
+        ))
+    print(f"{done} queries done, {failed} failed; results in {args.output}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import concurrent.futures
+from collections import OrderedDict
+
+import semantic_kernel as sk
+
+from src.agents_sk import ResearchTools
+
+logger = logging.getLogger(__name__)
+
+
+def create_research_tools(model, table_columns=(), api_key=None, **options):
+    """Build a kernel with its LLM service and prompt functions registered, wrapped in ResearchTools"""
+    kernel = sk.Kernel()
+    research_tools = ResearchTools(kernel=kernel, model=model, **options)
+    kernel.add_plugin(research_tools, plugin_name="research_tools")
+    research_tools.setup_llm(api_key=api_key)
+    research_tools.setup_info_extractor(list(table_columns))
+    return research_tools
+
+
+class KernelPool:
+    """Process-wide, thread-safe pool of warmed-up ResearchTools.
+
+    Entries are keyed by (model, table columns, API key hash) and built once by
+    `factory`; the least recently used ones are dropped beyond `max_size`. Coroutines
+    passed to `run` execute on one long-lived event loop, so the HTTP connection
+    pools of the OpenAI and Ollama clients are reused between calls instead of being
+    tied to a loop that `asyncio.run` closes after every request.
+    """
+
+    def __init__(self, factory=create_research_tools, max_size=8):
+        self.factory = factory
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+
+    @staticmethod
+    def key(model, table_columns=(), api_key=None):
+        api_key_hash = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16] if api_key else None
+        return (model, tuple(table_columns), api_key_hash)
+
+    def get(self, model, table_columns=(), api_key=None):
+        """Return the ResearchTools of a configuration, building it on first use"""
+        key = self.key(model, table_columns, api_key)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            logger.info(f"Building kernel for {key[0]} with columns {list(key[1])}")
+            research_tools = self.factory(model, tuple(table_columns), api_key)
+            self._entries[key] = research_tools
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            return research_tools
+
+    def _get_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="kernel-pool-loop", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def run(self, coroutine, timeout=None):
+        """Run a coroutine on the pool's event loop from synchronous code and return its result"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._get_loop()).result(timeout)
+
+    def iterate(self, iterator, timeout=None):
+        """Consume an async iterator on the pool's event loop, yielding its items to synchronous code.
+
+        When the consumer stops early (a Streamlit rerun or stop, an exception while
+        rendering) or an item times out, the iterator is closed on the loop right away,
+        so a search stops its pipeline instead of running until garbage collection.
+        """
+        loop = self._get_loop()
+        try:
+            while True:
+                future = asyncio.run_coroutine_threadsafe(iterator.__anext__(), loop)
+                try:
+                    item = future.result(timeout)
+                except StopAsyncIteration:
+                    return
+                except concurrent.futures.TimeoutError:
+                    future.cancel()
+                    raise
+                yield item
+        finally:
+            if hasattr(iterator, "aclose"):
+                try:
+                    asyncio.run_coroutine_threadsafe(iterator.aclose(), loop).result(timeout)
+                except Exception as e:
+                    logger.warning(f"Closing the iterator failed: {e!r}")
+
+    def close(self):
+        with self._lock:
+            self._entries.clear()
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join()
+                self._loop.close()
+                self._loop, self._thread = None, None
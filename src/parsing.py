@@ -0,0 +1,103 @@
+import os
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from src.utils import extract_text_from_pdf
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_file(pdf_path, max_pages, max_chars):
+    """Worker: extract the text of a PDF file"""
+    return extract_text_from_pdf(pdf_path, max_pages=max_pages, max_chars=max_chars)
+
+
+def _parse_shared(name, size, max_pages, max_chars):
+    """Worker: extract the text of a PDF held in a shared memory block"""
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        data = bytes(block.buf[:size])
+    finally:
+        block.close()
+    return extract_text_from_pdf(data, max_pages=max_pages, max_chars=max_chars)
+
+
+class PDFParser:
+    """Parses PDFs in a pool of worker processes, keeping PyMuPDF off the event loop.
+
+    `parse` accepts a file path or the raw bytes of a PDF, which are handed to the
+    worker through shared memory instead of being pickled. The pool is replaced after
+    `max_tasks_per_worker` documents per worker, so memory leaked by the PDF library
+    is given back to the OS.
+    """
+
+    def __init__(self, max_workers=None, max_tasks_per_worker=100, max_pages=None, max_chars=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        self._executor = None
+        self._submitted = 0
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is not None and self._submitted >= self.max_workers * self.max_tasks_per_worker:
+                # Retire the old pool once its queued documents are done
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                self._submitted = 0
+            self._submitted += 1
+            return self._executor
+
+    def parse(self, source):
+        """Schedule a PDF (path or bytes) for parsing and return an awaitable of its text"""
+        loop = asyncio.get_running_loop()
+        if not isinstance(source, (bytes, bytearray, memoryview)):
+            return loop.run_in_executor(
+                self._get_executor(), _parse_file, str(source), self.max_pages, self.max_chars
+            )
+
+        size = len(source)
+        block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        block.buf[:size] = source
+        future = loop.run_in_executor(
+            self._get_executor(), _parse_shared, block.name, size, self.max_pages, self.max_chars
+        )
+
+        def release(_):
+            block.close()
+            block.unlink()
+
+        future.add_done_callback(release)
+        return future
+
+    async def parse_many(self, sources):
+        """Parse several PDFs concurrently and return their texts in input order"""
+        return await asyncio.gather(*[self.parse(source) for source in sources])
+
+    async def parse_folder(self, folder):
+        """Parse every PDF of a folder, returning a dict of path to text"""
+        paths = sorted(entry.path for entry in os.scandir(folder) if entry.name.lower().endswith(".pdf"))
+        return dict(zip(paths, await self.parse_many(paths)))
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
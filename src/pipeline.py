@@ -0,0 +1,138 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Returned by a stage function to drop the item from the rest of the pipeline
+DROP = object()
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+class _Failure:
+    """Wraps an exception raised inside the pipeline so the consumer can re-raise it"""
+
+    def __init__(self, error):
+        self.error = error
+
+
+class Stage:
+    """A pipeline stage applying `func` to each item with its own pool of workers.
+
+    `func` is either a coroutine function, or a blocking function when `blocking`
+    is set, in which case it runs in a worker thread. The input queue of the stage
+    holds at most `queue_size` items, so a slow stage applies backpressure to the
+    stages before it.
+    """
+
+    def __init__(self, name, func, workers=1, queue_size=None, blocking=False):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.queue_size = queue_size or self.workers
+        self.blocking = blocking
+
+    async def apply(self, item):
+        if self.blocking:
+            return await asyncio.to_thread(self.func, item)
+        return await self.func(item)
+
+
+async def _iterate(items):
+    """Iterate over an async or blocking iterable without stalling the event loop"""
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+        return
+    iterator = iter(items)
+    while True:
+        # Blocking iterators (e.g. arXiv result pages) are advanced in a thread
+        item = await asyncio.to_thread(next, iterator, _DONE)
+        if item is _DONE:
+            return
+        yield item
+
+
+class Pipeline:
+    """Chain of stages connected by bounded queues, so that different items overlap across stages.
+
+    An exception raised by a stage for one item only drops that item: it is logged and
+    passed to `on_error(stage_name, index, item, error)`, and the other items go on.
+    Failures of the input iterable still end the stream and are re-raised to the consumer.
+    """
+
+    def __init__(self, stages, on_error=None):
+        self.stages = list(stages)
+        self.on_error = on_error
+
+    async def stream(self, items):
+        """Yield (index, result) pairs as soon as each item leaves the last stage"""
+        queues = [asyncio.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        output = asyncio.Queue(maxsize=self.stages[-1].workers)
+
+        async def feed():
+            index = 0
+            async for item in _iterate(items):
+                await queues[0].put((index, item))
+                index += 1
+            for _ in range(self.stages[0].workers):
+                await queues[0].put(_DONE)
+
+        async def work(position):
+            stage = self.stages[position]
+            inbox = queues[position]
+            outbox = queues[position + 1] if position + 1 < len(self.stages) else output
+            while True:
+                entry = await inbox.get()
+                if entry is _DONE:
+                    return
+                index, item = entry
+                try:
+                    result = await stage.apply(item)
+                except Exception as e:
+                    logger.warning(f"Stage {stage.name} failed on item {index}, dropping it: {e!r}")
+                    if self.on_error is not None:
+                        self.on_error(stage.name, index, item, e)
+                    continue
+                if result is not DROP:
+                    await outbox.put((index, result))
+
+        async def run_stage(position):
+            await asyncio.gather(*[work(position) for _ in range(self.stages[position].workers)])
+            # Every worker has drained its input: tell the next stage to finish
+            if position + 1 < len(self.stages):
+                for _ in range(self.stages[position + 1].workers):
+                    await queues[position + 1].put(_DONE)
+            else:
+                await output.put(_DONE)
+
+        tasks = [asyncio.ensure_future(feed())]
+        tasks += [asyncio.ensure_future(run_stage(position)) for position in range(len(self.stages))]
+
+        async def supervise():
+            try:
+                await asyncio.gather(*tasks)
+            except Exception as e:
+                for task in tasks:
+                    task.cancel()
+                await output.put(_Failure(e))
+
+        supervisor = asyncio.ensure_future(supervise())
+        try:
+            while True:
+                entry = await output.get()
+                if entry is _DONE:
+                    break
+                if isinstance(entry, _Failure):
+                    raise entry.error
+                yield entry
+        finally:
+            for task in tasks + [supervisor]:
+                task.cancel()
+            await asyncio.gather(*tasks, supervisor, return_exceptions=True)
+
+    async def run(self, items):
+        """Run every item through the pipeline and return the results in input order"""
+        results = [entry async for entry in self.stream(items)]
+        return [result for _, result in sorted(results, key=lambda entry: entry[0])]
@@ -1,40 +1,26 @@
+import re
+
 class PromptStore:
     def __init__(self):
         keywords_extraction_prompt = """
         system:
-        Extract key search parameters into well-organized categories based on researcher's query. If the query includes abstract date information, calculate time starting from the current year, which is 2024. Please present the extracted search parameters strictly in the following format: 
+        Extract key search parameters into well-organized categories based on researcher's query. If the query includes abstract date information, calculate time starting from the current year, which is 2024. Answer only with one JSON object on a single line, with exactly these keys in this order: "keywords", "year_range", "authors", "institutions", "conferences". Every value is a list of strings, empty when the query does not mention it.
 
         Example1:
         User Query: "I need papers from author Michael Smith on machine learning published between 2019 and 2021."
-        Keywords: ['machine learning']
-        Year Range: [2021, 2020, 2019]
-        Authors: ['Michael Smith']
-        Institutions: []
-        Conferences: []
+        {"keywords": ["machine learning"], "year_range": ["2021", "2020", "2019"], "authors": ["Michael Smith"], "institutions": [], "conferences": []}
 
         Example2:
         User Query: "Find publications related to neural networks in CVPR or ICCV conferences."
-        Keywords: ['neural networks']
-        Year Range: []
-        Authors: []
-        Institutions: []
-        Conferences: ['CVPR', 'ICCV']
+        {"keywords": ["neural networks"], "year_range": [], "authors": [], "institutions": [], "conferences": ["CVPR", "ICCV"]}
 
         Example3:
         User Query: "I want studies by Alice Johnson and Bob Lee from Stanford University from the last five years."
-        Keywords: []
-        Year Range: [2024, 2023, 2022, 2021, 2020]
-        Authors: ['Alice Johnson', 'Bob Lee']
-        Institutions: ['Stanford University']
-        Conferences: []
+        {"keywords": [], "year_range": ["2024", "2023", "2022", "2021", "2020"], "authors": ["Alice Johnson", "Bob Lee"], "institutions": ["Stanford University"], "conferences": []}
 
         Example4:
         User Query: "Search for papers on quantum computing by authors from MIT and Caltech presented at QIP from 2018 to 2020."
-        Keywords: ['quantum computing']
-        Year Range: [2020, 2019, 2018]
-        Authors: []
-        Institutions: ['MIT', 'Caltech']
-        Conferences: ['QIP']
+        {"keywords": ["quantum computing"], "year_range": ["2020", "2019", "2018"], "authors": [], "institutions": ["MIT", "Caltech"], "conferences": ["QIP"]}
 
         New Task:
         User Query: {{$query}}
@@ -44,6 +30,18 @@ class PromptStore:
     def add_prompt(self, column):
         self.prompts[column] = f"Extract and provide a precise and concise {column}" +  "of the core aspects from the provided academic paper for inclusion in a research survey table. Here is the paper content{{$paper_text}}"
     
+    def add_reduce_prompt(self, column):
+        self.prompts[column + " reduce"] = f"Combine the following partial extractions of the {column} " + "taken from different parts of the same academic paper into one precise and concise answer for a research survey table. Ignore parts that report the information is missing. Partial extractions:{{$partial_results}}"
+
+    def add_fused_prompt(self):
+        # The fields are a prompt variable (a JSON list), so one function serves any subset of the columns
+        self.prompts["fused_extraction_prompt"] = "Extract and provide a precise and concise description of each of the following fields {{$fields}} from the provided academic paper for inclusion in a research survey table. Answer only with a JSON object whose keys are exactly these fields and whose values are strings. Here is the paper content{{$paper_text}}"
+        self.prompts["fused_reduce_prompt"] = "Combine the following partial JSON extractions of the fields {{$fields}}, taken from different parts of the same academic paper, into one precise and concise answer per field. Ignore parts that report a field is missing. Answer only with a JSON object whose keys are exactly these fields and whose values are strings. Partial extractions:{{$partial_results}}"
+
     def get_prompt(self, key):
         return self.prompts[key]
-        
\ No newline at end of file
+        
+
+def render_prompt(template, arguments):
+    """Fill the {{$name}} variables of a semantic-kernel prompt template"""
+    return re.sub(r"\{\{\s*\$(\w+)\s*\}\}", lambda match: str(arguments.get(match.group(1), "")), template)
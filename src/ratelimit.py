@@ -0,0 +1,202 @@
+import time
+import random
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Defaults of each backend: request rate (per second, None for unlimited), burst,
+# concurrency ceiling, latency above which the backend counts as saturated, and the
+# seconds one attempt of a call ("timeout") and all its retries together ("deadline") may take
+backend_limits = {
+    "arxiv": {"rate": 1 / 3, "burst": 1, "max_concurrency": 1, "latency_target": None, "timeout": 60, "deadline": 240},
+    "ollama": {"rate": None, "burst": 1, "max_concurrency": 2, "latency_target": 60, "timeout": 300, "deadline": 600},
+    "openai": {"rate": 8, "burst": 8, "max_concurrency": 8, "latency_target": 20, "timeout": 60, "deadline": 180},
+}
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(backend, **options):
+    """Process-wide limiter of a backend, created with `options` on first use"""
+    with _limiters_lock:
+        if backend not in _limiters:
+            settings = {**backend_limits.get(backend, {}), **options}
+            settings.pop("timeout", None)
+            settings.pop("deadline", None)
+            _limiters[backend] = AdaptiveLimiter(backend, **settings)
+        return _limiters[backend]
+
+
+def get_status(error):
+    """HTTP status of an error from openai, httpx, semantic kernel or arxiv, following wrapped causes"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        for status in [getattr(error, "status_code", None), getattr(error, "status", None),
+                       getattr(getattr(error, "response", None), "status_code", None)]:
+            if isinstance(status, int):
+                return status
+        error = error.__cause__ or error.__context__
+    return None
+
+
+def classify(error):
+    """(retryable, overloaded): rate limits, server errors and timeouts are worth retrying"""
+    status = get_status(error)
+    if status is not None:
+        overloaded = status == 429 or status >= 500
+        return overloaded or status == 408, overloaded
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)) or "Timeout" in type(error).__name__ \
+                or type(error).__name__ in ("UnexpectedEmptyPageError", "APIConnectionError", "ConnectError", "URLError"):
+            return True, True
+        error = error.__cause__ or error.__context__
+    return False, False
+
+
+def get_retry_after(error):
+    """Seconds asked for by a Retry-After header, if any"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, base_delay=0.5, max_delay=30.0):
+    """Exponential backoff with full jitter, so clients that failed together do not retry together"""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+class AdaptiveLimiter:
+    """Token bucket plus AIMD concurrency limit for one backend.
+
+    Calls take a token (refilled at `rate` per second, up to `burst`) and a slot
+    among `limit` concurrent calls. The limit grows by one per `limit` successful
+    calls and is halved on a 429, 5xx or timeout, or cut by 10% when latency exceeds
+    `latency_target`; decreases are applied at most once per `cooldown` seconds so
+    one burst of errors does not collapse it. The limiter is thread-safe and can be
+    shared by several event loops.
+    """
+
+    def __init__(self, name, rate=None, burst=1, max_concurrency=8, min_concurrency=1, latency_target=None, cooldown=1.0):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.latency_target = latency_target
+        self.cooldown = cooldown
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.tokens = float(burst)
+        self._refilled = time.monotonic()
+        self._decreased = 0.0
+        self._waiters = []
+        self._lock = threading.Lock()
+
+    def _take_token(self):
+        """Consume a token and return 0, or return the seconds until one is available"""
+        if self.rate is None:
+            return 0
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                waiter = wait = None
+                if self.in_flight < int(self.limit):
+                    wait = self._take_token()
+                    if wait == 0:
+                        self.in_flight += 1
+                        return
+                else:
+                    waiter = loop.create_future()
+                    self._waiters.append(waiter)
+            if waiter is not None:
+                await waiter
+            else:
+                await asyncio.sleep(wait)
+
+    def release(self, latency=None, overloaded=False, adapt=True):
+        """Free a slot and adapt the limit to the outcome of the call"""
+        with self._lock:
+            self.in_flight -= 1
+            slow = self.latency_target is not None and latency is not None and latency > self.latency_target
+            now = time.monotonic()
+            if adapt and (overloaded or slow):
+                if now - self._decreased >= self.cooldown:
+                    self.limit = max(self.min_concurrency, self.limit * (0.5 if overloaded else 0.9))
+                    self._decreased = now
+                    logger.info(f"{self.name} limiter down to {self.limit:.1f} concurrent calls")
+            elif adapt:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            waiters, self._waiters = self._waiters, []
+        # Woken waiters re-check the limit; futures may belong to other loops
+        for waiter in waiters:
+            waiter.get_loop().call_soon_threadsafe(lambda waiter=waiter: waiter.done() or waiter.set_result(None))
+
+
+async def call_with_retries(func, limiter=None, retries=4, timeout=None, deadline=None, base_delay=0.5, max_delay=30.0):
+    """Await `func()` under a limiter, retrying rate limits, server errors and timeouts.
+
+    Every attempt is bounded by `timeout` seconds and all attempts together by
+    `deadline` seconds; retries wait a jittered exponential backoff, or the
+    server's Retry-After when given.
+    """
+    expires = time.monotonic() + deadline if deadline is not None else None
+    attempt = 0
+    while True:
+        limits = [limit for limit in [timeout, expires - time.monotonic() if expires is not None else None] if limit is not None]
+        attempt_timeout = min(limits) if limits else None
+        if limiter is not None:
+            await limiter.acquire()
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(func(), attempt_timeout) if attempt_timeout is not None else await func()
+        except asyncio.CancelledError:
+            if limiter is not None:
+                limiter.release(adapt=False)
+            raise
+        except Exception as e:
+            retryable, overloaded = classify(e)
+            if limiter is not None:
+                limiter.release(time.monotonic() - start, overloaded)
+            delay = get_retry_after(e) or backoff_delay(attempt, base_delay, max_delay)
+            if not retryable or attempt >= retries or (expires is not None and time.monotonic() + delay >= expires):
+                raise
+            logger.info(f"Retrying after {e!r} in {delay:.1f}s (attempt {attempt + 1}/{retries})")
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        if limiter is not None:
+            limiter.release(time.monotonic() - start)
+        return result
+
+
+def retry_blocking(func, retries=4, base_delay=0.5, max_delay=30.0):
+    """Call a blocking `func()` with jittered exponential retries of transient errors"""
+    attempt = 0
+    while True:
+        try:
+            return func()
+        except Exception as e:
+            retryable, _ = classify(e)
+            if not retryable or attempt >= retries:
+                raise
+            delay = get_retry_after(e) or backoff_delay(attempt, base_delay, max_delay)
+            logger.info(f"Retrying after {e!r} in {delay:.1f}s (attempt {attempt + 1}/{retries})")
+            time.sleep(delay)
+            attempt += 1
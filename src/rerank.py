@@ -0,0 +1,164 @@
+import os
+import json
+import zlib
+import logging
+import threading
+
+import numpy as np
+
+from src.search_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+class HashingEmbedder:
+    """Dependency-free local embedder: hashed unigrams and bigrams with sublinear weights.
+
+    Any object with a `name`, a `dim` and an `embed(texts) -> (len(texts), dim) array`
+    method can be used instead, e.g. `SentenceTransformerEmbedder`.
+    """
+
+    def __init__(self, dim=512):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _feature(self, feature):
+        # crc32 is stable across processes, unlike hash(), so cached vectors stay valid
+        code = zlib.crc32(feature.encode("utf-8"))
+        return code % self.dim, 1.0 if code & 0x80000000 else -1.0
+
+    def embed(self, texts):
+        rows, columns, signs = [], [], []
+        for row, text in enumerate(texts):
+            terms = tokenize(text)
+            for feature in terms + [f"{first} {second}" for first, second in zip(terms, terms[1:])]:
+                column, sign = self._feature(feature)
+                rows.append(row)
+                columns.append(column)
+                signs.append(sign)
+        counts = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(counts, (np.array(rows, dtype=np.int64), np.array(columns, dtype=np.int64)), np.array(signs, dtype=np.float32))
+        vectors = np.sign(counts) * np.log1p(np.abs(counts))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+
+class SentenceTransformerEmbedder:
+    """Local sentence-transformers model (requires the sentence-transformers package)"""
+
+    def __init__(self, model_name="all-MiniLM-L6-v2"):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = model_name.replace("/", "_")
+
+    def embed(self, texts):
+        return self.model.encode(list(texts), normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+
+class VectorCache:
+    """Paper embeddings of one embedder in a memory-mapped float32 matrix on disk.
+
+    Rows are appended and the file grows by doubling; the id -> row map is saved
+    after the rows are flushed, so it never points at unwritten rows.
+    """
+
+    def __init__(self, root="./results/vectors", name="hashing-512", dim=512):
+        self.root = str(root)
+        self.dim = dim
+        self.matrix_path = os.path.join(self.root, f"{name}.f32")
+        self.ids_path = os.path.join(self.root, f"{name}.json")
+        self._lock = threading.Lock()
+        self._rows = None
+        self._matrix = None
+
+    def _load(self):
+        if self._rows is None:
+            self._rows = {}
+            if os.path.exists(self.ids_path):
+                with open(self.ids_path, "r", encoding="utf-8") as file:
+                    self._rows = {doc_id: row for row, doc_id in enumerate(json.load(file))}
+            if os.path.exists(self.matrix_path):
+                self._open(os.path.getsize(self.matrix_path) // (4 * self.dim))
+
+    def _open(self, capacity):
+        self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def get(self, ids):
+        """Cached vectors of the ids, as a matrix and a mask of the ids found"""
+        with self._lock:
+            self._load()
+            found = np.array([doc_id in self._rows for doc_id in ids], dtype=bool)
+            vectors = np.zeros((len(ids), self.dim), dtype=np.float32)
+            if found.any():
+                vectors[found] = self._matrix[[self._rows[doc_id] for doc_id, hit in zip(ids, found) if hit]]
+            return vectors, found
+
+    def put(self, ids, vectors):
+        """Append the vectors of new ids"""
+        with self._lock:
+            self._load()
+            new = [(doc_id, vector) for doc_id, vector in zip(ids, vectors) if doc_id not in self._rows]
+            if not new:
+                return
+            start = len(self._rows)
+            capacity = 0 if self._matrix is None else self._matrix.shape[0]
+            if start + len(new) > capacity:
+                os.makedirs(self.root, exist_ok=True)
+                capacity = max(64, 2 * capacity, start + len(new))
+                self._matrix = None
+                with open(self.matrix_path, "ab") as file:
+                    file.truncate(capacity * self.dim * 4)
+                self._open(capacity)
+            self._matrix[start:start + len(new)] = np.stack([vector for _, vector in new])
+            self._matrix.flush()
+            for offset, (doc_id, _) in enumerate(new):
+                self._rows[doc_id] = start + offset
+            tmp_path = self.ids_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(sorted(self._rows, key=self._rows.get), file)
+            os.replace(tmp_path, self.ids_path)
+
+
+class Reranker:
+    """Rerank candidate papers by embedding similarity to the query and drop near-duplicates.
+
+    Title + abstract embeddings are computed in batches of `batch_size` and cached by
+    paper id. A candidate whose cosine similarity to an already kept paper reaches
+    `dedup_threshold` (e.g. a workshop and a journal version) is dropped.
+    """
+
+    def __init__(self, embedder=None, cache=None, dedup_threshold=0.9, batch_size=64):
+        self.embedder = embedder or HashingEmbedder()
+        self.cache = cache or VectorCache(name=self.embedder.name, dim=self.embedder.dim)
+        self.dedup_threshold = dedup_threshold
+        self.batch_size = batch_size
+
+    def embed_papers(self, ids, texts):
+        vectors, found = self.cache.get(ids)
+        missing = np.flatnonzero(~found)
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            vectors[batch] = self.embedder.embed([texts[i] for i in batch])
+        if len(missing):
+            self.cache.put([ids[i] for i in missing], vectors[missing])
+        return vectors
+
+    def rerank(self, query, ids, texts, k):
+        """Indices of the top-k candidates, most similar to the query first, without near-duplicates"""
+        if not ids:
+            return []
+        vectors = self.embed_papers(list(ids), list(texts))
+        scores = vectors @ self.embedder.embed([query])[0] if query else np.zeros(len(ids))
+        # Stable sort keeps arXiv's order among equally similar candidates
+        order = np.argsort(-scores, kind="stable")
+        similarities = vectors @ vectors.T
+        kept = []
+        for index in order.tolist():
+            if kept and similarities[index, kept].max() >= self.dedup_threshold:
+                logger.info(f"Dropping near-duplicate candidate {ids[index]}")
+                continue
+            kept.append(index)
+            if len(kept) == k:
+                break
+        return kept
@@ -0,0 +1,229 @@
+import os
+import re
+import json
+import math
+import time
+import uuid
+import shutil
+import logging
+import threading
+from collections import Counter
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+token_pattern = re.compile(r"[a-z0-9]+")
+
+# Longer "terms" are almost always extraction noise (hashes, URLs, glued words)
+MAX_TERM_LENGTH = 32
+
+# Function words that match nearly every paper
+stopwords = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of",
+    "on", "or", "that", "the", "this", "to", "we", "with",
+}
+
+
+def tokenize(text):
+    """Lowercase alphanumeric terms without stopwords, with plurals folded to the singular"""
+    terms = []
+    for term in token_pattern.findall(text.lower()):
+        if term in stopwords or len(term) > MAX_TERM_LENGTH:
+            continue
+        if len(term) > 3 and term.endswith("s") and not term.endswith("ss"):
+            term = term[:-1]
+        terms.append(term)
+    return terms
+
+
+class _Segment:
+    """Read-only view of one index segment, with its arrays memory-mapped"""
+
+    def __init__(self, path):
+        self.name = os.path.basename(path)
+        self.terms = np.load(os.path.join(path, "terms.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+        self.postings = np.load(os.path.join(path, "postings.npy"), mmap_mode="r")
+        self.lengths = np.load(os.path.join(path, "lengths.npy"))
+        self.versions = np.load(os.path.join(path, "versions.npy"))
+        with open(os.path.join(path, "ids.json"), "r", encoding="utf-8") as file:
+            self.ids = json.load(file)
+
+    def postings_of(self, term):
+        """(document index, term frequency) rows of a term, found by binary search over the sorted terms"""
+        index = int(np.searchsorted(self.terms, term))
+        if index < len(self.terms) and self.terms[index] == term:
+            return self.postings[self.offsets[index]:self.offsets[index + 1]]
+        return self.postings[:0]
+
+
+class BM25Index:
+    """On-disk BM25 full-text index over paper texts and abstracts.
+
+    Each `add_documents` call writes an immutable segment: sorted terms, posting
+    offsets and (document, frequency) postings stored as .npy arrays that searches
+    memory-map instead of loading. Documents carry an increasing version, so
+    re-adding a paper supersedes its older copy. Once more than `merge_factor`
+    segments exist, the smallest ones are merged into one, dropping superseded
+    documents. The manifest listing the live segments is replaced atomically, so
+    readers never see a half-written segment.
+    """
+
+    def __init__(self, root="./results/index", merge_factor=8, k1=1.2, b=0.75):
+        self.root = str(root)
+        self.merge_factor = merge_factor
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._segments = {}
+        self._snapshot = None
+        self._manifest = None
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.root, "manifest.json")
+
+    def _load_manifest(self):
+        if self._manifest is None:
+            self._manifest = {"segments": [], "next_version": 0}
+            if os.path.exists(self.manifest_path):
+                with open(self.manifest_path, "r", encoding="utf-8") as file:
+                    self._manifest = json.load(file)
+        return self._manifest
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self._manifest, file)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _write_segment(self, docs):
+        """Write (doc_id, version, term counts) documents as a new segment and return its name"""
+        postings = {}
+        for index, (_, _, counts) in enumerate(docs):
+            for term, frequency in counts.items():
+                postings.setdefault(term, []).append((index, frequency))
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(postings[term]) for term in terms])
+        flat = np.array([row for term in terms for row in postings[term]], dtype=np.int32).reshape(-1, 2)
+
+        name = f"seg-{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+        # Written under a hidden name and renamed, so a crash never leaves a partial segment
+        tmp_path = os.path.join(self.root, "." + name)
+        os.makedirs(tmp_path)
+        np.save(os.path.join(tmp_path, "terms.npy"), np.array(terms, dtype=f"<U{MAX_TERM_LENGTH}"))
+        np.save(os.path.join(tmp_path, "offsets.npy"), offsets)
+        np.save(os.path.join(tmp_path, "postings.npy"), flat)
+        np.save(os.path.join(tmp_path, "lengths.npy"), np.array([sum(counts.values()) for _, _, counts in docs], dtype=np.int32))
+        np.save(os.path.join(tmp_path, "versions.npy"), np.array([version for _, version, _ in docs], dtype=np.int64))
+        with open(os.path.join(tmp_path, "ids.json"), "w", encoding="utf-8") as file:
+            json.dump([doc_id for doc_id, _, _ in docs], file)
+        os.replace(tmp_path, os.path.join(self.root, name))
+        return name
+
+    def _open(self, name):
+        if name not in self._segments:
+            self._segments[name] = _Segment(os.path.join(self.root, name))
+        return self._segments[name]
+
+    def _get_snapshot(self):
+        """Live segments with, for each, a mask of the documents not superseded by a newer version"""
+        with self._lock:
+            names = tuple(self._load_manifest()["segments"])
+            if self._snapshot is not None and self._snapshot[0] == names:
+                return self._snapshot[1]
+            segments = [self._open(name) for name in names]
+            latest = {}
+            for segment in segments:
+                for doc_id, version in zip(segment.ids, segment.versions.tolist()):
+                    latest[doc_id] = max(version, latest.get(doc_id, -1))
+            snapshot = [
+                (segment, np.array([latest[doc_id] == version for doc_id, version in zip(segment.ids, segment.versions.tolist())], dtype=bool))
+                for segment in segments
+            ]
+            self._snapshot = (names, snapshot)
+            return snapshot
+
+    def doc_ids(self):
+        """Ids of all indexed documents"""
+        return {doc_id for segment, live in self._get_snapshot() for doc_id, alive in zip(segment.ids, live) if alive}
+
+    def add_documents(self, documents):
+        """Index {doc_id: text} as a new segment, superseding earlier copies of the same documents"""
+        with self._lock:
+            manifest = self._load_manifest()
+            docs = []
+            for doc_id, text in documents.items():
+                counts = Counter(tokenize(text or ""))
+                if counts:
+                    docs.append((str(doc_id), manifest["next_version"], counts))
+                    manifest["next_version"] += 1
+            if not docs:
+                return
+            os.makedirs(self.root, exist_ok=True)
+            manifest["segments"].append(self._write_segment(docs))
+            self._save_manifest()
+        if len(manifest["segments"]) > self.merge_factor:
+            self.merge()
+
+    def merge(self, count=None):
+        """Merge the `count` smallest segments (default merge_factor) into one"""
+        snapshot = self._get_snapshot()
+        count = count or self.merge_factor
+        if len(snapshot) < 2:
+            return
+        selected = sorted(snapshot, key=lambda item: len(item[0].ids))[:count]
+
+        docs = {}
+        for segment, live in selected:
+            term_of_posting = np.repeat(np.arange(len(segment.terms)), np.diff(segment.offsets))
+            for term_index, (doc_index, frequency) in zip(term_of_posting.tolist(), segment.postings.tolist()):
+                if live[doc_index]:
+                    key = (segment.ids[doc_index], int(segment.versions[doc_index]))
+                    docs.setdefault(key, Counter())[str(segment.terms[term_index])] = frequency
+
+        with self._lock:
+            manifest = self._load_manifest()
+            merged_names = {segment.name for segment, _ in selected}
+            if not merged_names <= set(manifest["segments"]):
+                # Another merge got there first
+                return
+            name = self._write_segment([(doc_id, version, counts) for (doc_id, version), counts in sorted(docs.items(), key=lambda item: item[0][1])]) if docs else None
+            manifest["segments"] = [segment for segment in manifest["segments"] if segment not in merged_names] + ([name] if name else [])
+            self._save_manifest()
+            for segment_name in merged_names:
+                self._segments.pop(segment_name, None)
+                shutil.rmtree(os.path.join(self.root, segment_name), ignore_errors=True)
+        logger.info(f"Merged {len(merged_names)} index segments ({len(docs)} live documents)")
+
+    def search(self, query, k=10, require_all=True):
+        """Top-k (doc_id, score) BM25 matches; with `require_all` a document must contain every query term"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        snapshot = self._get_snapshot()
+        n_docs = int(sum(live.sum() for _, live in snapshot))
+        if not terms or n_docs == 0:
+            return []
+        avgdl = sum(float(segment.lengths[live].sum()) for segment, live in snapshot) / n_docs
+
+        matches = []
+        for segment, live in snapshot:
+            rows = [np.asarray(segment.postings_of(term)) for term in terms]
+            matches.append([row[live[row[:, 0]]] for row in rows])
+        frequencies = [sum(len(segment_rows[i]) for segment_rows in matches) for i in range(len(terms))]
+        idf = [math.log(1 + (n_docs - df + 0.5) / (df + 0.5)) for df in frequencies]
+
+        results = []
+        for (segment, _), segment_rows in zip(snapshot, matches):
+            scores = np.zeros(len(segment.ids))
+            hits = np.zeros(len(segment.ids), dtype=np.int32)
+            for term_idf, rows in zip(idf, segment_rows):
+                doc_index, frequency = rows[:, 0], rows[:, 1].astype(np.float64)
+                norm = self.k1 * (1 - self.b + self.b * segment.lengths[doc_index] / avgdl)
+                scores[doc_index] += term_idf * frequency * (self.k1 + 1) / (frequency + norm)
+                hits[doc_index] += 1
+            matched = np.flatnonzero(hits == len(terms) if require_all else hits > 0)
+            results.extend((float(scores[index]), segment.ids[index]) for index in matched)
+        results.sort(key=lambda item: (-item[0], item[1]))
+        return [(doc_id, score) for score, doc_id in results[:k]]
@@ -0,0 +1,239 @@
+import os
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+cells_schema = pa.schema([
+    ("arxiv_id", pa.string()),
+    ("column", pa.string()),
+    ("model", pa.string()),
+    ("prompt_hash", pa.string()),
+    ("value", pa.string()),
+    ("written", pa.float64()),
+])
+
+texts_schema = pa.schema([
+    ("arxiv_id", pa.string()),
+    ("text", pa.string()),
+    ("written", pa.float64()),
+])
+
+
+class PaperStore:
+    """Persistent local store of retrieved papers.
+
+    Paper metadata lives in SQLite, indexed by year and author so filtered queries
+    never scan the whole history. Extracted table cells and paper texts are bulky and
+    append-only, so they are written as Parquet segments (one per write batch) and
+    read back with Arrow filters; `compact_if_needed` merges small segments of similar
+    size once a kind has more than `max_segments`, since every read opens all of them,
+    and leaves large compacted segments alone. Papers are upserted by arXiv id, so a
+    paper seen in several searches is stored once.
+    """
+
+    def __init__(self, root="./results/store", max_segments=32, merge_width=4, tier_ratio=4.0, max_merge_bytes=256 * 1024 ** 2):
+        self.root = str(root)
+        self.max_segments = max_segments
+        self.merge_width = merge_width
+        self.tier_ratio = tier_ratio
+        self.max_merge_bytes = max_merge_bytes
+        self._conn = None
+        self._lock = threading.Lock()
+        # Readers hold it while they list and open segments, so compaction never removes one under them
+        self._segments_lock = threading.RLock()
+        # Compactions run one at a time, and only take the segments lock to delete merged files
+        self._compact_lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(self.root, exist_ok=True)
+            self._conn = sqlite3.connect(os.path.join(self.root, "papers.sqlite"), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS papers ("
+                "arxiv_id TEXT PRIMARY KEY, title TEXT, year INTEGER, author TEXT, url TEXT,"
+                "abstract TEXT, keywords TEXT, updated REAL);"
+                "CREATE INDEX IF NOT EXISTS papers_year ON papers (year);"
+                "CREATE TABLE IF NOT EXISTS paper_authors (arxiv_id TEXT, author TEXT COLLATE NOCASE);"
+                "CREATE INDEX IF NOT EXISTS paper_authors_author ON paper_authors (author);"
+                "CREATE INDEX IF NOT EXISTS paper_authors_paper ON paper_authors (arxiv_id);"
+            )
+        return self._conn
+
+    def upsert_papers(self, papers):
+        """Insert or update paper metadata rows (dicts with arxiv_id, title, year, author, url, abstract)"""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            for paper in papers:
+                conn.execute(
+                    "INSERT INTO papers (arxiv_id, title, year, author, url, abstract, keywords, updated) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(arxiv_id) DO UPDATE SET "
+                    "title=excluded.title, year=excluded.year, author=excluded.author, url=excluded.url, "
+                    "abstract=excluded.abstract, keywords=excluded.keywords, updated=excluded.updated",
+                    (paper['arxiv_id'], paper['title'], int(paper['year']), paper['author'], paper['url'],
+                     paper.get('abstract'), paper.get('keywords'), now),
+                )
+                conn.execute("DELETE FROM paper_authors WHERE arxiv_id = ?", (paper['arxiv_id'],))
+                conn.executemany(
+                    "INSERT INTO paper_authors (arxiv_id, author) VALUES (?, ?)",
+                    [(paper['arxiv_id'], author) for author in paper['author'].split(', ') if author],
+                )
+            conn.commit()
+
+    def query(self, year_range=None, authors=None, arxiv_ids=None, limit=None):
+        """Return paper metadata matching the filters, evaluated by SQLite indexes"""
+        clauses, params = [], []
+        if year_range:
+            clauses.append("year BETWEEN ? AND ?")
+            params += [int(min(year_range)), int(max(year_range))]
+        if authors:
+            clauses.append(
+                "arxiv_id IN (SELECT arxiv_id FROM paper_authors WHERE author IN (%s))" % ", ".join("?" * len(authors))
+            )
+            params += list(authors)
+        if arxiv_ids is not None:
+            clauses.append("arxiv_id IN (%s)" % ", ".join("?" * len(arxiv_ids)))
+            params += list(arxiv_ids)
+        sql = "SELECT arxiv_id, title, year, author, url, abstract, keywords FROM papers"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY year DESC, arxiv_id"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = self._connect().execute(sql, params).fetchall()
+        keys = ["arxiv_id", "title", "year", "author", "url", "abstract", "keywords"]
+        return [dict(zip(keys, row)) for row in rows]
+
+    def _write_segment(self, kind, table):
+        directory = os.path.join(self.root, kind)
+        os.makedirs(directory, exist_ok=True)
+        name = f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+        # Write under a temporary name so readers never pick up a partial segment
+        tmp_path = os.path.join(directory, "." + name)
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, os.path.join(directory, name))
+
+    def _read(self, kind, schema, filter_expression):
+        directory = os.path.join(self.root, kind)
+        if not os.path.isdir(directory):
+            return schema.empty_table()
+        with self._segments_lock:
+            # Parquet statistics let Arrow skip row groups that cannot match the filter
+            dataset = ds.dataset(directory, format="parquet", schema=schema, exclude_invalid_files=False,
+                                 ignore_prefixes=["."])
+            return dataset.to_table(filter=filter_expression)
+
+    def segment_count(self, kind):
+        directory = os.path.join(self.root, kind)
+        if not os.path.isdir(directory):
+            return 0
+        return sum(1 for entry in os.scandir(directory) if not entry.name.startswith("."))
+
+    def write_cells(self, cells):
+        """Append extracted table cells (dicts with arxiv_id, column, model, prompt_hash, value)"""
+        if not cells:
+            return
+        now = time.time()
+        columns = {name: [str(cell[name]) for cell in cells] for name in ["arxiv_id", "column", "model", "prompt_hash", "value"]}
+        columns["written"] = [now] * len(cells)
+        self._write_segment("cells", pa.table(columns, schema=cells_schema))
+
+    def get_cells(self, arxiv_ids, model=None):
+        """Latest cell values per paper: {arxiv_id: {(column, prompt_hash): value}}"""
+        expression = ds.field("arxiv_id").isin(list(arxiv_ids))
+        if model is not None:
+            expression = expression & (ds.field("model") == model)
+        table = self._read("cells", cells_schema, expression).sort_by([("written", "ascending")])
+        cells = {}
+        for row in table.to_pylist():
+            # Later segments override earlier values of the same cell
+            cells.setdefault(row["arxiv_id"], {})[(row["column"], row["prompt_hash"])] = row["value"]
+        return cells
+
+    def write_texts(self, texts):
+        """Append extracted paper texts ({arxiv_id: text})"""
+        if not texts:
+            return
+        now = time.time()
+        table = pa.table({"arxiv_id": list(texts), "text": list(texts.values()), "written": [now] * len(texts)},
+                         schema=texts_schema)
+        self._write_segment("texts", table)
+
+    def get_texts(self, arxiv_ids):
+        """Latest stored text of each paper: {arxiv_id: text}"""
+        table = self._read("texts", texts_schema, ds.field("arxiv_id").isin(list(arxiv_ids)))
+        table = table.sort_by([("written", "ascending")])
+        return {row["arxiv_id"]: row["text"] for row in table.to_pylist()}
+
+    def compact_if_needed(self):
+        """Compact once a kind has more than `max_segments` segments; return whether it did"""
+        if all(self.segment_count(kind) <= self.max_segments for kind in ["cells", "texts"]):
+            return False
+        self.compact()
+        return True
+
+    def compact(self):
+        """Merge tiers of small Parquet segments of similar size, keeping the latest rows.
+
+        Segments are bucketed by size, each bucket spanning a factor of `tier_ratio`, and a
+        bucket is merged once it holds `merge_width` segments; segments of `max_merge_bytes`
+        or more are never rewritten. If a kind still has more than `max_segments`, its
+        smallest segments are merged as well.
+        """
+        with self._compact_lock:
+            for kind, schema, keys in [("cells", cells_schema, ["arxiv_id", "column", "model", "prompt_hash"]),
+                                       ("texts", texts_schema, ["arxiv_id"])]:
+                directory = os.path.join(self.root, kind)
+                if not os.path.isdir(directory):
+                    continue
+                files = [entry.path for entry in os.scandir(directory) if not entry.name.startswith(".")]
+                for group in self._plan(files):
+                    self._merge(kind, schema, keys, group)
+
+    def _plan(self, files):
+        """Groups of segment paths to merge, see `compact`"""
+        small = sorted(item for item in ((os.path.getsize(path), path) for path in files) if item[0] < self.max_merge_bytes)
+        buckets = []
+        for size, path in small:
+            if not buckets or size > buckets[-1][0][0] * self.tier_ratio:
+                buckets.append([])
+            buckets[-1].append((size, path))
+        groups = [[path for _, path in bucket] for bucket in buckets if len(bucket) >= self.merge_width]
+        excess = len(files) - sum(len(group) - 1 for group in groups) - self.max_segments
+        if excess > 0:
+            grouped = {path for group in groups for path in group}
+            smallest = [path for _, path in small if path not in grouped][:excess + 1]
+            if len(smallest) > 1:
+                groups.append(smallest)
+        return groups
+
+    def _merge(self, kind, schema, keys, paths):
+        """Replace segments with one holding the latest row of each key among them"""
+        table = ds.dataset(paths, format="parquet", schema=schema).to_table()
+        table = table.append_column("row", pa.array(range(len(table)), pa.int64()))
+        # Rows keep their write time, so readers still order this segment against the others by `written`
+        latest = table.select(keys + ["written", "row"]).sort_by([("written", "ascending"), ("row", "ascending")]) \
+            .group_by(keys, use_threads=False).aggregate([("row", "last")])
+        # Sorting by id clusters each paper's rows, which makes the isin filters selective
+        merged = table.take(latest["row_last"]).drop_columns(["row"]).sort_by([("arxiv_id", "ascending")])
+        self._write_segment(kind, merged)
+        # The merged segment duplicates rows of the old ones until they are gone, which reads tolerate
+        with self._segments_lock:
+            for path in paths:
+                os.remove(path)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,231 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets
+latency_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed operation, with attributes such as byte and token counts or cache hits"""
+
+    def __init__(self, tracer, name, parent=None, attributes=None):
+        self.tracer = tracer
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else self.span_id
+        self.attributes = dict(attributes or {})
+        self.start_time = time.time()
+        self.duration = None
+        self._start = time.perf_counter()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def end(self):
+        if self.duration is None:
+            self.duration = time.perf_counter() - self._start
+            self.tracer._finish(self)
+
+    def to_dict(self):
+        return {
+            "name": self.name, "trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+            "start": self.start_time, "duration": self.duration, "attributes": self.attributes,
+        }
+
+
+class Metrics:
+    """Counters and latency histograms with labels, exported in the Prometheus text format"""
+
+    def __init__(self, prefix="scioptimizer"):
+        self.prefix = prefix
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            key = self._key(name, labels)
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        with self._lock:
+            key = self._key(name, labels)
+            if key not in self.histograms:
+                self.histograms[key] = {"buckets": [0] * len(latency_buckets), "count": 0, "sum": 0.0}
+            histogram = self.histograms[key]
+            for index, bound in enumerate(latency_buckets):
+                if value <= bound:
+                    histogram["buckets"][index] += 1
+            histogram["count"] += 1
+            histogram["sum"] += value
+
+    def to_prometheus(self):
+        def format_labels(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}" if pairs else ""
+
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE {self.prefix}_{name} counter")
+                for (counter, labels), value in sorted(self.counters.items()):
+                    if counter == name:
+                        lines.append(f"{self.prefix}_{name}{format_labels(labels)} {value}")
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f"# TYPE {self.prefix}_{name} histogram")
+                for (histogram_name, labels), histogram in sorted(self.histograms.items()):
+                    if histogram_name != name:
+                        continue
+                    for bound, count in zip(latency_buckets, histogram["buckets"]):
+                        lines.append(f"{self.prefix}_{name}_bucket{format_labels(labels, [('le', bound)])} {count}")
+                    lines.append(f"{self.prefix}_{name}_bucket{format_labels(labels, [('le', '+Inf')])} {histogram['count']}")
+                    lines.append(f"{self.prefix}_{name}_sum{format_labels(labels)} {histogram['sum']}")
+                    lines.append(f"{self.prefix}_{name}_count{format_labels(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+
+class Tracer:
+    """Records spans per search, paper and stage, and the metrics derived from them.
+
+    Finished spans are kept in memory (the last `max_spans`) for `summary`, and
+    buffered for a JSONL file when `jsonl_path` is set; `flush` appends the buffered
+    spans in one write (so does the span that fills `max_pending`) and writes the
+    metrics in the Prometheus text format to `prometheus_path`, where a node exporter
+    textfile collector or a person can read them. The current span follows asyncio
+    tasks and `asyncio.to_thread` calls through a context variable.
+    """
+
+    def __init__(self, jsonl_path=None, prometheus_path=None, max_spans=10000, max_pending=1000):
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self.metrics = Metrics()
+        self.spans = deque(maxlen=max_spans)
+        self.max_pending = max_pending
+        self._pending = []
+        self._lock = threading.Lock()
+        # Keeps batches in order when several threads write spans
+        self._write_lock = threading.Lock()
+
+    def configure(self, jsonl_path=None, prometheus_path=None):
+        # Spans buffered so far belong to the previous file
+        self._write_spans()
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+
+    def current(self):
+        return _current_span.get()
+
+    def start(self, name, parent=None, **attributes):
+        """Start a span that the caller ends; its parent defaults to the current span"""
+        return Span(self, name, parent if parent is not None else _current_span.get(), attributes)
+
+    @contextmanager
+    def span(self, name, parent=None, **attributes):
+        """Time the enclosed block as a span, made the current span inside it"""
+        span = self.start(name, parent, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set(error=repr(e))
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    @contextmanager
+    def use(self, span):
+        """Make a span started elsewhere the current span inside the block, without ending it"""
+        token = _current_span.set(span)
+        try:
+            yield span
+        finally:
+            _current_span.reset(token)
+
+    def annotate(self, **attributes):
+        """Set attributes on the current span, if any"""
+        span = _current_span.get()
+        if span is not None:
+            span.set(**attributes)
+
+    def _finish(self, span):
+        self.metrics.observe("span_duration_seconds", span.duration, span=span.name)
+        with self._lock:
+            self.spans.append(span)
+            if self.jsonl_path:
+                self._pending.append(span)
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self._write_spans()
+
+    def _write_spans(self):
+        """Append the buffered spans to the JSONL file"""
+        with self._write_lock:
+            with self._lock:
+                spans, self._pending = self._pending, []
+                path = self.jsonl_path
+            if not spans or not path:
+                return
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                with open(path, "a", encoding="utf-8") as file:
+                    file.write("".join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans))
+            except OSError as e:
+                logger.warning(f"Failed to write {len(spans)} spans to {path}: {e!r}")
+
+    def flush(self):
+        """Append the buffered spans to the JSONL file and write the current metrics to the Prometheus text file"""
+        self._write_spans()
+        if not self.prometheus_path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.prometheus_path)), exist_ok=True)
+        tmp_path = self.prometheus_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            file.write(self.metrics.to_prometheus())
+        os.replace(tmp_path, self.prometheus_path)
+
+    def summary(self, trace_id=None):
+        """Per span name: count, total and p50/p95/max latency of the recorded spans"""
+        with self._lock:
+            spans = [span for span in self.spans if trace_id is None or span.trace_id == trace_id]
+        rows = []
+        for name in sorted({span.name for span in spans}):
+            durations = np.array([span.duration for span in spans if span.name == name])
+            rows.append({
+                "span": name,
+                "count": len(durations),
+                "total_s": round(float(durations.sum()), 3),
+                "p50_ms": round(float(np.percentile(durations, 50)) * 1000, 1),
+                "p95_ms": round(float(np.percentile(durations, 95)) * 1000, 1),
+                "max_ms": round(float(durations.max()) * 1000, 1),
+            })
+        return rows
+
+    def counters(self):
+        """Counter values as {"name{label=value,...}": value}"""
+        with self.metrics._lock:
+            items = list(self.metrics.counters.items())
+        return {name + ("{" + ",".join(f"{key}={value}" for key, value in labels) + "}" if labels else ""): value
+                for (name, labels), value in sorted(items)}
+
+
+# Process-wide tracer used by the pipeline; spans stay in memory until `configure` sets sinks
+tracer = Tracer()
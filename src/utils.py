@@ -1,72 +1,107 @@
-import fitz  # PyMuPDF for handling PDF files
 import re  # Regular expression library
+import json
+
+# Keys of the search parameters, in the order the keywords prompt asks for them
+search_parameter_keys = ['keywords', 'year_range', 'authors', 'institutions', 'conferences']
+
+# A parameter name (JSON key, "Year Range:" or markdown "**Authors:**") followed by its list,
+# whose closing bracket may be cut off by a stop sequence or the token limit
+parameter_pattern = re.compile(r'\b(keywords|year[ _]?range|authors|institutions|conferences)\b["\'*:\s]*\[([^\[\]]*)\]?', re.IGNORECASE)
+# A list item: double-quoted JSON string, single-quoted string, string cut off before its
+# closing quote (dropped) or bare value
+item_pattern = re.compile(r'"((?:[^"\\]|\\.)*)"|\'([^\']*)\'|(["\'].*)|([^,\s][^,]*)')
 
 def extract_parameters(output):
-    """Extract search parameters from text based on predefined keys."""
-    
-    # example output = """
-    # * *keywords ['graph neural networks']
-    # * **Year Range:** [2022]
-    # * **Authors []
-    # * **Institutions:** []
-    # * **Conferences:** []
-    # """
+    """Extract search parameters from a model answer in one pass.
+
+    Reads the JSON object asked for by the keywords prompt, also when its end was cut
+    off by a stop sequence or the token limit, as well as the earlier free-text format
+    ("Year Range: [2022]"); a parameter given several times keeps its last value.
+    """
+    params = {key: [] for key in search_parameter_keys}
+    for match in parameter_pattern.finditer(output):
+        key = re.sub(r'[ _]', '', match.group(1).lower())
+        key = 'year_range' if key == 'yearrange' else key
+        values = []
+        for item in item_pattern.finditer(match.group(2)):
+            double_quoted, single_quoted, truncated, bare = item.groups()
+            if truncated is not None:
+                continue
+            if double_quoted is not None:
+                try:
+                    value = json.loads('"' + double_quoted + '"')
+                except json.JSONDecodeError:
+                    value = double_quoted
+            else:
+                value = single_quoted if single_quoted is not None else bare
+            value = value.strip()
+            if value:
+                values.append(value)
+        params[key] = values
+    return params
+
+def parse_json_fields(output, keys):
+    """Parse the fields of a JSON object answer (possibly wrapped in prose or code fences)."""
     
-    # Define a dictionary to store the extracted parameters
-    params = {
-        'keywords': [],
-        'year_range': [],
-        'authors': [],
-        'institutions': [],
-        'conferences': []
-    }
+    # Keep the outermost {...} so surrounding text and ```json fences are ignored
+    start, end = output.find('{'), output.rfind('}') + 1
+    if start == -1 or end <= start:
+        return {}
+    try:
+        data = json.loads(output[start:end])
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+
+    # Match keys case-insensitively, only returning the requested ones
+    lookup = {str(key).strip().lower(): value for key, value in data.items()}
+    fields = {}
+    for key in keys:
+        value = lookup.get(key.strip().lower())
+        if value is None:
+            continue
+        fields[key] = ', '.join(str(item) for item in value) if isinstance(value, list) else str(value)
+    return fields
+
+# Matches a line holding only the 'References' header, ignoring surrounding blanks
+references_pattern = re.compile(r'^[^\S\n]*references[^\S\n]*$', re.IGNORECASE | re.MULTILINE)
 
-    # List of keys we're interested in extracting, aligned with params keys
-    possible_keys = ['keywords', 'year range', 'authors', 'institutions', 'conferences']
-    lines = output.split('\n')  # Split the output text into lines
+def iter_pdf_text(pdf_path, max_pages=None, max_chars=None):
     
-    for line in lines:
-        line = line.lower()  # Normalize the line for case insensitivity
-        key_found = None
-        # Determine if the line contains any of the possible keys
-        for key in possible_keys:
-            if key in line:
-                key_found = key
-                break
-        if key_found:
-            normalized_key = key_found.replace(' ', '_')  # Normalize the key to match params dictionary keys
-            # Extract values enclosed in brackets
-            start_index, end_index = line.find('['), line.rfind(']') + 1
-            if start_index != -1 and end_index != -1:
-                value_str = line[start_index:end_index].strip()
-                # Safely parse and clean the list items
-                cleaned_values = [item.strip().strip("'\"") for item in value_str.strip('[]').split(',')]
-                params[normalized_key] = cleaned_values if cleaned_values != [''] else []
+    """Yield the text of a PDF (file path or bytes) page by page, up to a section labeled 'References'.
 
-    return params
+    Each chunk is newline-terminated. Reading stops after `max_pages` pages or once
+    `max_chars` characters have been produced, so very long documents are never
+    fully loaded into memory.
+    """
+    
+    import fitz  # PyMuPDF for handling PDF files, loaded with the first PDF
+    remaining = max_chars
+    if isinstance(pdf_path, (bytes, bytearray, memoryview)):
+        doc = fitz.open(stream=pdf_path, filetype="pdf")  # Open an in-memory PDF
+    else:
+        doc = fitz.open(pdf_path)  # Open the PDF file
+    with doc:
+        for page_number, page in enumerate(doc):
+            if max_pages is not None and page_number >= max_pages:
+                return
+            page_text = page.get_text("text")  # Get text from the page
+            # Search the whole page once instead of matching every stripped line
+            match = references_pattern.search(page_text)
+            chunk = page_text[:match.start()] if match else page_text
+            if chunk and not chunk.endswith("\n"):
+                chunk += "\n"
+            if remaining is not None:
+                chunk = chunk[:remaining]
+                remaining -= len(chunk)
+            if chunk:
+                yield chunk
+            if match or remaining == 0:
+                return  # Stop reading if 'References' is found or the budget is spent
 
-def extract_text_from_pdf(pdf_path):
+def extract_text_from_pdf(pdf_path, max_pages=None, max_chars=None):
     
     """Extract text from a PDF file up to a section labeled 'References'."""
     
-    doc = fitz.open(pdf_path)  # Open the PDF file
-    text = ""
-    # Regex to identify the 'References' header, ignoring leading/trailing whitespace
-    references_pattern = re.compile(r'^\s*references\s*$', re.IGNORECASE)
-
-    # Process each page in the PDF
-    for page in doc:
-        page_text = page.get_text("text")  # Get text from the page
-        page_lines = page_text.splitlines()  # Split text into lines
-        
-        for line in page_lines:
-            if references_pattern.search(line.strip()):
-                break  # Stop reading if 'References' is found
-            text += line + "\n"
-        else:
-            # Continue to the next page if 'References' not found in current page
-            continue
-        # Exit loop if 'References' found
-        break
-
-    return text
\ No newline at end of file
+    return "".join(iter_pdf_text(pdf_path, max_pages=max_pages, max_chars=max_chars))
@@ -0,0 +1,180 @@
+import os
+import re
+import json
+import logging
+
+from pyzotero import zotero
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of items the Zotero write API accepts per request
+ZOTERO_BATCH_SIZE = 50
+
+arxiv_id_pattern = re.compile(r"arxiv\.org/(?:abs|pdf)/([^\s?#]+?)(?:v\d+)?(?:\.pdf)?$", re.IGNORECASE)
+
+
+def get_arxiv_id(url):
+    """Versionless arXiv id of an abs/pdf url, or None"""
+    match = arxiv_id_pattern.search(str(url or "").strip())
+    return match.group(1) if match else None
+
+
+def get_identifiers(url=None, doi=None):
+    """Normalized identifiers used to detect a paper already in the library"""
+    identifiers = set()
+    arxiv_id = get_arxiv_id(url)
+    if arxiv_id:
+        identifiers.add(f"arxiv:{arxiv_id.lower()}")
+        # arXiv registers a DataCite DOI for every paper
+        identifiers.add(f"doi:10.48550/arxiv.{arxiv_id.lower()}")
+    elif url:
+        identifiers.add("url:" + re.sub(r"^https?://(www\.)?", "", str(url).strip().lower()).rstrip("/"))
+    if doi:
+        identifiers.add("doi:" + re.sub(r"^(https?://(dx\.)?doi\.org/|doi:)", "", str(doi).strip().lower()))
+    return identifiers
+
+
+def build_item(paper):
+    """Zotero item payload of a survey table row"""
+    item = {
+        'itemType': 'journalArticle',
+        'title': str(paper['title']),
+        'date': str(paper['year']),
+        'url': str(paper['url']),
+    }
+    if paper.get('author'):
+        item['creators'] = [{'creatorType': 'author', 'name': name} for name in str(paper['author']).split(', ')]
+    if paper.get('abstract'):
+        item['abstractNote'] = str(paper['abstract'])
+    arxiv_id = get_arxiv_id(paper['url'])
+    doi = paper.get('doi') or (f"10.48550/arXiv.{arxiv_id}" if arxiv_id else None)
+    if doi:
+        item['DOI'] = str(doi)
+    if arxiv_id:
+        item['extra'] = f"arXiv: {arxiv_id}"
+    return item
+
+
+class ZoteroSync:
+    """Bulk uploader of survey papers to a Zotero library.
+
+    A local index of the library's URLs and DOIs is kept on disk and refreshed
+    incrementally (only items changed since the last seen library version), so
+    papers already in the library are skipped without searching for them. New items
+    are created in batches of 50, the API maximum, and the PDFs downloaded by
+    `retrieve_papers` are attached from the PDF cache.
+    """
+
+    def __init__(self, library_id, library_type, api_key, index_dir="./results/zotero", pdf_cache=None, endpoint=None):
+        self.zot = zotero.Zotero(library_id, library_type, api_key)
+        if endpoint:
+            self.zot.endpoint = endpoint
+        self.index_path = os.path.join(index_dir, f"{library_type}_{library_id}.json")
+        self.pdf_cache = pdf_cache
+        self.index = {"version": 0, "items": {}}
+
+    def load_index(self):
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as file:
+                self.index = json.load(file)
+
+    def save_index(self):
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.index, file)
+        os.replace(tmp_path, self.index_path)
+
+    def sync_index(self):
+        """Fetch items changed or deleted since the last sync into the local key index"""
+        self.load_index()
+        since = self.index["version"]
+        changed = self.zot.everything(self.zot.top(since=since))
+        version = int(self.zot.request.headers.get("last-modified-version", since))
+        if since:
+            for key in self.zot.deleted(since=since).get("items", []):
+                self.index["items"].pop(key, None)
+        for item in changed:
+            data = item.get("data", item)
+            self.index["items"][item["key"]] = sorted(get_identifiers(data.get("url"), data.get("DOI")))
+        self.index["version"] = version
+        self.save_index()
+
+    def known_identifiers(self):
+        return {identifier for identifiers in self.index["items"].values() for identifier in identifiers}
+
+    def upload(self, papers, attach_pdfs=True):
+        """Create the papers missing from the library and return a per-paper report"""
+        self.sync_index()
+        known = self.known_identifiers()
+        report = [{'title': paper['title'], 'status': None, 'key': None} for paper in papers]
+
+        pending = []
+        for entry, paper in zip(report, papers):
+            identifiers = get_identifiers(paper['url'], paper.get('doi'))
+            if identifiers & known:
+                entry['status'] = 'duplicate'
+                continue
+            # Also skip repeats within the uploaded papers themselves
+            known |= identifiers
+            pending.append((entry, paper, identifiers))
+
+        for start in range(0, len(pending), ZOTERO_BATCH_SIZE):
+            batch = pending[start:start + ZOTERO_BATCH_SIZE]
+            try:
+                response = self.zot.create_items([build_item(paper) for _, paper, _ in batch])
+            except Exception as e:
+                logger.warning(f"Zotero batch upload failed: {e!r}")
+                for entry, _, _ in batch:
+                    entry.update(status='failed', error=str(e))
+                continue
+            for index, (entry, _, identifiers) in enumerate(batch):
+                key = response.get('success', {}).get(str(index))
+                if key:
+                    entry.update(status='created', key=key)
+                    self.index["items"][key] = sorted(identifiers)
+                else:
+                    failure = response.get('failed', {}).get(str(index), {})
+                    entry.update(status='failed', error=failure.get('message', 'unknown error'))
+        self.save_index()
+
+        if attach_pdfs and self.pdf_cache is not None:
+            self.attach_pdfs([(entry, paper) for entry, paper, _ in pending if entry['status'] == 'created'])
+        return report
+
+    def attach_pdfs(self, created):
+        """Attach cached PDFs to newly created items, creating the attachment items in batches"""
+        attachments = []
+        for entry, paper in created:
+            pdf_path = self.pdf_cache.get(paper['url'])
+            if pdf_path is None:
+                continue
+            attachments.append((entry, {
+                'itemType': 'attachment',
+                'linkMode': 'imported_file',
+                'parentItem': entry['key'],
+                'title': f"{paper['title']}.pdf",
+                'contentType': 'application/pdf',
+                'filename': os.path.basename(pdf_path),
+            }))
+
+        for start in range(0, len(attachments), ZOTERO_BATCH_SIZE):
+            batch = attachments[start:start + ZOTERO_BATCH_SIZE]
+            try:
+                response = self.zot.create_items([payload for _, payload in batch])
+                uploads = []
+                for index, (entry, payload) in enumerate(batch):
+                    key = response.get('success', {}).get(str(index))
+                    entry['attachment'] = 'failed'
+                    if key:
+                        uploads.append((entry, dict(payload, key=key)))
+                if uploads:
+                    # Items already carry keys, so Zupload only runs the file upload steps
+                    result = zotero.Zupload(self.zot, [payload for _, payload in uploads], basedir=self.pdf_cache.root).upload()
+                    done = {payload['key'] for payload in result['success'] + result['unchanged']}
+                    for entry, payload in uploads:
+                        entry['attachment'] = 'uploaded' if payload['key'] in done else 'failed'
+            except Exception as e:
+                logger.warning(f"Zotero attachment upload failed: {e!r}")
+                for entry, _ in batch:
+                    entry['attachment'] = 'failed'
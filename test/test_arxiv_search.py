@@ -0,0 +1,64 @@
+import pytest
+import sys
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+current_path = Path(__file__).resolve()
+parent_path = current_path.parent.parent
+sys.path.append(str(parent_path))
+
+from src.arxiv_search import build_query, iter_arxiv_results
+from src.ratelimit import AdaptiveLimiter
+
+# Test the year range is pushed into the arXiv query
+def test_build_query():
+    query = build_query(["graph neural networks"], authors=["Alice"], year_range=[2022, 2020, 2021])
+
+    assert query == "graph neural networks AND au:Alice AND submittedDate:[202001010000 TO 202212312359]"
+    assert build_query(["llm"]) == "llm"
+
+# Test results are filtered and pages are consumed lazily until enough papers qualify
+@pytest.mark.asyncio
+async def test_iter_arxiv_results():
+    consumed = []
+
+    def results(search):
+        for index, year in enumerate([2019, 2021, 2018, 2022, 2021, 2020]):
+            consumed.append(index)
+            yield Mock(title=f"paper {index}", published=Mock(year=year))
+
+    client = Mock()
+    client.results.side_effect = results
+    with patch('src.arxiv_search.arxiv') as mock_arxiv:
+        papers = [paper.title async for paper in iter_arxiv_results("llm", 2, year_range=[2021, 2022], client=client)]
+        mock_arxiv.Search.assert_called_once()
+        assert mock_arxiv.Search.call_args.kwargs["max_results"] == 40
+
+    assert papers == ["paper 1", "paper 3"]
+    assert consumed == [0, 1, 2, 3]
+
+# Test a failed page is retried from the offset reached so far
+@pytest.mark.asyncio
+async def test_iter_arxiv_results_resumes_after_error(monkeypatch):
+    monkeypatch.setattr("src.ratelimit.random.uniform", lambda low, high: 0)
+    offsets = []
+
+    class ServiceUnavailable(Exception):
+        status = 503
+
+    def results(search, offset=0):
+        offsets.append(offset)
+        for index in range(offset, 6):
+            if index == 2 and len(offsets) == 1:
+                raise ServiceUnavailable("Page request resulted in HTTP 503")
+            yield Mock(title=f"paper {index}", published=Mock(year=2021))
+
+    client = Mock()
+    client.results.side_effect = results
+    limiter = AdaptiveLimiter("arxiv", max_concurrency=1)
+    with patch('src.arxiv_search.arxiv'):
+        papers = [paper.title async for paper in iter_arxiv_results("llm", 4, page_size=2, client=client, limiter=limiter)]
+
+    assert papers == ["paper 0", "paper 1", "paper 2", "paper 3"]
+    assert offsets == [0, 2]
+    assert limiter.in_flight == 0
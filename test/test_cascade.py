@@ -0,0 +1,116 @@
+import sys
+from pathlib import Path
+from unittest.mock import Mock, AsyncMock
+
+import pytest
+from semantic_kernel.kernel import Kernel
+
+current_path = Path(__file__).resolve()
+parent_path = current_path.parent.parent
+sys.path.append(str(parent_path))
+
+from src.agents_sk import ResearchTools
+from src.cascade import RoutingTable, validate_cell, validate_keywords, KEYWORDS_TASK, DEFAULT_TASK
+from src.telemetry import tracer, Metrics
+from evaluate.learn_routes import learn_routes
+
+
+@pytest.fixture
+def cascade_tools(monkeypatch):
+    monkeypatch.setattr("src.ratelimit._limiters", {})
+    table = RoutingTable(
+        routes={DEFAULT_TASK: ["Gemma", "GPT-3.5 Turbo"], KEYWORDS_TASK: ["Mistral", "GPT-3.5 Turbo"]},
+        latency={"Gemma": 1.0, "Mistral": 1.5, "GPT-3.5 Turbo": 3.0},
+    )
+    research_tools = ResearchTools(Mock(spec=Kernel), model="GPT-3.5 Turbo", delay_seconds=0, cascade=table)
+    # The services setup_cascade would register
+    research_tools.service_ids = {"GPT-3.5 Turbo": "local-gpt", "Gemma": "gemma", "Mistral": "mistral"}
+    return research_tools
+
+
+def invoked_services(kernel):
+    return [next(iter(call.kwargs['arguments'].execution_settings)) for call in kernel.invoke.call_args_list]
+
+
+# Test the validators reject refusals, empty and rambling answers
+def test_validators():
+    assert validate_cell("Graph attention network trained on Cora")
+    assert not validate_cell("")
+    assert not validate_cell("N/A")
+    assert not validate_cell("The paper does not mention the dataset.")
+    assert not validate_cell("I'm sorry, I cannot extract that.")
+    assert not validate_cell("word " * 1000)
+    assert validate_keywords('{"keywords": ["graph neural networks"], "year_range": []')
+    assert not validate_keywords("Sure! Here are the keywords")
+
+
+# Test routes keep qualifying models, fastest first, and end with the selected model
+def test_routing_table_learn_and_route(tmp_path):
+    quality = {
+        "GPT-3.5 Turbo": {"authors": 1.0, "year_range": 1.0},
+        "Mistral": {"authors": 0.95, "year_range": 0.6},
+        "Gemma": {"authors": 0.9, "year_range": 0.9},
+    }
+    latency = {"GPT-3.5 Turbo": 3.0, "Mistral": 1.0, "Gemma": 2.0}
+    table = RoutingTable.learn(quality, latency, min_quality=0.8, max_steps=2)
+    assert table.routes["authors"] == ["Mistral", "Gemma", "GPT-3.5 Turbo"]
+    assert table.routes["year_range"] == ["Gemma", "GPT-3.5 Turbo"]
+    assert table.routes[KEYWORDS_TASK] == ["Gemma", "GPT-3.5 Turbo"]
+
+    assert table.route("authors", "GPT-3.5 Turbo") == ["Mistral", "GPT-3.5 Turbo"]
+    # Only models faster than the selected one precede it
+    assert table.route("authors", "Mistral") == ["Mistral"]
+    assert table.route("Method", "GPT-3.5 Turbo") == ["Gemma", "GPT-3.5 Turbo"]
+    table.max_steps = 3
+    assert table.route("authors", "GPT-3.5 Turbo") == ["Mistral", "Gemma", "GPT-3.5 Turbo"]
+
+    table.save(tmp_path / "routing.json")
+    assert RoutingTable.load(tmp_path / "routing.json").to_dict() == table.to_dict()
+
+
+# Test routes learned from the published evaluation outputs
+def test_learn_routes_outputs():
+    latencies = {"baseline": [3.0, 4.0], "mistral": [1.0], "gemma": [0.5], "llama3": [2.0]}
+    table = learn_routes(["baseline", "llama3", "mistral", "gemma"], latencies=latencies, min_quality=0.9)
+    assert table.routes["authors"][-1] == "GPT-3.5 Turbo"
+    assert table.latency["GPT-3.5 Turbo"] == 3.5
+    assert "Gemma" not in table.routes["year_range"]
+
+
+# Test a column answer failing validation escalates to the selected model
+@pytest.mark.asyncio
+async def test_cascade_escalates_invalid_cells(cascade_tools, monkeypatch):
+    cascade_tools.table_columns = ["Method", "Dataset"]
+    answers = {("Method", "gemma"): "Graph attention", ("Dataset", "gemma"): "Not mentioned in the text",
+               ("Dataset", "local-gpt"): "Cora"}
+
+    async def invoke(plugin_name, function_name, arguments):
+        service_id = next(iter(arguments.execution_settings))
+        return Mock(value=[answers[(function_name, service_id)]])
+
+    cascade_tools.kernel.invoke = AsyncMock(side_effect=invoke)
+    monkeypatch.setattr(tracer, "metrics", Metrics())
+    result = await cascade_tools.get_survey_table("paper text")
+
+    assert result == {"Method": "Graph attention", "Dataset": "Cora"}
+    assert sorted(invoked_services(cascade_tools.kernel)) == ["gemma", "gemma", "local-gpt"]
+    assert tracer.metrics.counters[("cascade_answers_total", (("model", "gemma"), ("step", "0")))] == 1
+    assert tracer.metrics.counters[("cascade_answers_total", (("model", "gpt-3.5-turbo"), ("step", "1")))] == 1
+
+
+# Test a failed fast model escalates, and the keywords prompt follows its own route
+@pytest.mark.asyncio
+async def test_cascade_keywords_escalates_on_error(cascade_tools):
+    async def invoke(plugin_name, function_name, arguments):
+        if next(iter(arguments.execution_settings)) == "mistral":
+            raise RuntimeError("model not loaded")
+        return Mock(value=['{"keywords": ["transformers"]'])
+
+    cascade_tools.kernel.invoke = AsyncMock(side_effect=invoke)
+    assert await cascade_tools.get_keywords("transformers") == '{"keywords": ["transformers"]'
+    assert invoked_services(cascade_tools.kernel)[0] == "mistral"
+    assert invoked_services(cascade_tools.kernel)[-1] == "local-gpt"
+
+    # A selected model faster than every model of the route is asked alone
+    cascade_tools.model = "Gemma"
+    assert cascade_tools.get_routes(DEFAULT_TASK) == ["Gemma"]
@@ -0,0 +1,39 @@
+import sys
+from pathlib import Path
+
+current_path = Path(__file__).resolve()
+parent_path = current_path.parent.parent
+sys.path.append(str(parent_path))
+
+from src.chunking import chunk_text, route_chunks, split_sections, estimate_tokens
+
+paper_text = (
+    "Abstract\nWe study graph neural networks.\n"
+    "1 Introduction\n" + "Graphs are everywhere.\n" * 40 +
+    "2 Method\n" + "Our model uses message passing.\n" * 40 +
+    "3 Experiments\n" + "We evaluate on the Cora dataset and report accuracy results.\n" * 40 +
+    "4 Conclusion\nMessage passing works.\n"
+)
+
+# Test sections are detected at numbered and well-known headings
+def test_split_sections():
+    titles = [title for title, _ in split_sections(paper_text)]
+    assert titles == ["Abstract", "1 Introduction", "2 Method", "3 Experiments", "4 Conclusion"]
+
+# Test chunks respect the token budget and keep the whole text
+def test_chunk_text_budget():
+    chunks = chunk_text(paper_text, max_tokens=300)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk.text) <= 300 for chunk in chunks)
+    assert "".join(chunk.text for chunk in chunks) == paper_text
+    assert chunk_text("short paper", max_tokens=300)[0].text == "short paper"
+
+# Test columns are routed to the chunks of relevant sections
+def test_route_chunks():
+    chunks = chunk_text(paper_text, max_tokens=300)
+    routed = route_chunks("experimental findings", chunks, max_chunks=1)
+
+    assert len(routed) == 1
+    assert "3 Experiments" in routed[0].sections
+    assert route_chunks("zzz", chunks, max_chunks=2) == chunks[:2]
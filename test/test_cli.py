@@ -0,0 +1,77 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+import pyarrow.dataset as ds
+
+current_path = Path(__file__).resolve()
+parent_path = current_path.parent.parent
+sys.path.append(str(parent_path))
+
+from src.cli import load_queries, run_batch, Checkpoint, JSONLWriter, ParquetWriter
+
+defaults = {'columns': ["Method"], 'num_papers': 2, 'model': "LLaMA-3"}
+
+
+class FakeTools:
+    """Stands in for ResearchTools: one row per requested paper, failing on chosen queries"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.queries = []
+
+    async def get_keywords(self, query):
+        self.queries.append(query)
+        if query in self.failing:
+            raise RuntimeError("LLM unavailable")
+        return f"* **Keywords:** ['{query}']"
+
+    async def retrieve_papers(self, num_papers, keywords=None, **params):
+        return [{'title': f"{keywords[0]} {i}", 'year': 2023, 'Method': "m"} for i in range(num_papers)]
+
+
+def write_queries(path):
+    path.write_text('graph networks\n# comment\n{"id": "vit", "query": "vision transformers", "num_papers": 1}\ngraph networks\n')
+    return path
+
+
+# Test plain-text and JSON query lines share the defaults and repeated queries run once
+def test_load_queries(tmp_path):
+    queries = load_queries(write_queries(tmp_path / "queries.txt"), defaults)
+    assert [spec['query'] for spec in queries] == ["graph networks", "vision transformers"]
+    assert queries[1]['id'] == "vit" and queries[1]['num_papers'] == 1 and queries[1]['columns'] == ["Method"]
+    assert queries[0]['id'] == load_queries(tmp_path / "queries.txt", defaults)[0]['id']
+
+
+# Test a re-run resumes from the checkpoint, retrying only failed queries and dropping unfinished rows
+@pytest.mark.asyncio
+async def test_run_batch_resume(tmp_path):
+    queries = load_queries(write_queries(tmp_path / "queries.txt"), defaults)
+    writer, checkpoint = JSONLWriter(tmp_path / "out.jsonl"), Checkpoint(tmp_path / "out.jsonl.checkpoint")
+
+    tools = FakeTools(failing={"vision transformers"})
+    assert await run_batch(queries, lambda model, columns: tools, writer, checkpoint, concurrency=2) == (1, 1)
+    # Simulate a crash after the rows of a query were written but before its checkpoint
+    writer.write("vit", [{'query_id': "vit", 'title': "partial"}])
+    with open(tmp_path / "out.jsonl", "a") as file:
+        file.write('{"query_id": "vit", "tit')
+
+    tools = FakeTools()
+    assert await run_batch(queries, lambda model, columns: tools, writer, checkpoint, concurrency=2) == (1, 0)
+    assert tools.queries == ["vision transformers"]
+    rows = [json.loads(line) for line in (tmp_path / "out.jsonl").read_text().splitlines()]
+    assert sorted(row['title'] for row in rows) == ["graph networks 0", "graph networks 1", "vision transformers 0"]
+    assert set(checkpoint.load().values()) == {"done"}
+
+
+# Test Parquet output keeps one part per finished query
+@pytest.mark.asyncio
+async def test_run_batch_parquet(tmp_path):
+    queries = load_queries(write_queries(tmp_path / "queries.txt"), defaults)
+    writer = ParquetWriter(tmp_path / "out.parquet")
+    tools = FakeTools()
+    await run_batch(queries, lambda model, columns: tools, writer, Checkpoint(tmp_path / "checkpoint"))
+    table = ds.dataset(str(tmp_path / "out.parquet"), format="parquet").to_table()
+    assert table.num_rows == 3
+    assert set(table.column("query_id").to_pylist()) == {spec['id'] for spec in queries}
@@ -0,0 +1,55 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+current_path = Path(__file__).resolve()
+parent_path = current_path.parent.parent
+sys.path.append(str(parent_path))
+
+from evaluate.evaluate import load_json, root_dir, evaluate_accuracy, score, bootstrap_sums
+
+gold = [
+    {'keywords': ["Graph Neural Networks"], 'year_range': ["2023"], 'authors': ["Alice Smith"], 'institutions': [], 'conferences': []},
+    {'keywords': ["quantum computing"], 'year_range': ["2020", "2019"], 'authors': [], 'institutions': ["MIT"], 'conferences': ["QIP"]},
+]
+predicted = [
+    {'keywords': ["graph networks"], 'year_range': [2023], 'authors': ["alice smith", "Bob"], 'institutions': [], 'conferences': []},
+    {'keywords': ["physics"], 'year_range': ["2020"], 'authors': [], 'institutions': ["MIT"]},
+]
+
+
+# Test accuracy matches the published keywords extraction results
+def test_evaluate_accuracy_outputs():
+    baseline = load_json(root_dir, "baseline")
+    assert evaluate_accuracy(baseline, load_json(root_dir, "mistral")) == \
+        {'keywords': 1.0, 'year_range': 0.65, 'authors': 1.0, 'institutions': 0.95, 'conferences': 0.9}
+    assert evaluate_accuracy(baseline, load_json(root_dir, "gemma"))['year_range'] == 0.4
+
+
+# Test per-field accuracy and micro precision/recall/F1 over normalized items
+def test_score():
+    table = score(gold, {'model': predicted}, n_boot=0).loc['model']
+
+    # Keyword words "graph", "networks" match out of 2 predicted and 5 gold words
+    assert table.loc['keywords'].tolist() == pytest.approx([0.5, 2 / 3, 2 / 5, 0.5])
+    assert table.loc['year_range'].tolist() == pytest.approx([0.5, 1.0, 2 / 3, 0.8])
+    assert table.loc['authors'].tolist() == pytest.approx([0.5, 0.5, 1.0, 2 / 3])
+    assert table.loc['conferences', 'recall'] == 0 and table.loc['conferences', 'accuracy'] == 0.5
+    with pytest.raises(ValueError):
+        score(gold, {'model': predicted[:1]})
+
+
+# Test bootstrap intervals are reproducible and bracket the point estimates
+def test_score_bootstrap():
+    baseline = load_json(root_dir, "baseline")
+    predictions = {model: load_json(root_dir, model) for model in ["mistral", "llama3"]}
+    table = score(baseline, predictions, n_boot=200, seed=1)
+
+    assert table.equals(score(baseline, predictions, n_boot=200, seed=1))
+    assert (table['accuracy_low'] <= table['accuracy']).all() and (table['accuracy'] <= table['accuracy_high']).all()
+    assert (table['f1_low'] <= table['f1_high']).all()
+    # Batches split the resamples without changing their total count per resample
+    stats = np.ones((7, 3))
+    assert np.array_equal(bootstrap_sums(stats, 10, max_cells=14), np.full((10, 3), 7.0))
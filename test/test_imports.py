@@ -0,0 +1,27 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+current_path = Path(__file__).resolve()
+parent_path = current_path.parent.parent
+sys.path.append(str(parent_path / "benchmark"))
+
+from bench_import import CASES, measure, compare
+
+
+# Test model backends, Zotero, PyMuPDF and Arrow are only imported when first used
+@pytest.mark.parametrize("case", list(CASES))
+def test_startup_defers_backends(case):
+    result = measure(case, repeat=1)
+    assert result["loaded"] == []
+    assert result["median_s"] > 0
+
+
+# Test a slower import or an eagerly loaded backend counts as a regression
+def test_compare_regressions():
+    baseline = [{"case": "agents_sk", "median_s": 1.0, "min_s": 1.0, "loaded": []}]
+    assert compare([{"case": "agents_sk", "median_s": 1.2, "min_s": 1.1, "loaded": []}], baseline, 0.3) == []
+    assert len(compare([{"case": "agents_sk", "median_s": 1.5, "min_s": 1.4, "loaded": []}], baseline, 0.3)) == 1
+    assert compare([{"case": "interface", "median_s": 0.5, "min_s": 0.5, "loaded": ["openai"]}], None, 0.3) == \
+        ["interface: imports openai at startup"]
@@ -0,0 +1,87 @@
+import sys
+import asyncio
+import concurrent.futures
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+current_path = Path(__file__).resolve()
+parent_path = current_path.parent.parent
+sys.path.append(str(parent_path))
+
+from src.kernel_pool import KernelPool, create_research_tools
+
+# Test configurations are built once and reused, with LRU eviction
+def test_kernel_pool_reuses_configurations():
+    factory = Mock(side_effect=lambda model, table_columns, api_key: Mock(model=model))
+    pool = KernelPool(factory, max_size=2)
+
+    first = pool.get("GPT-4", ["method"], "key-1")
+    assert pool.get("GPT-4", ["method"], "key-1") is first
+    assert pool.get("GPT-4", ["method"], "key-2") is not first
+    assert factory.call_count == 2
+    assert all("key-1" not in str(key) for key in pool._entries)
+
+    pool.get("Gemma", ["method"])
+    assert pool.get("GPT-4", ["method"], "key-1") is not first
+    assert factory.call_count == 4
+
+# Test coroutines share one long-lived event loop across calls
+def test_kernel_pool_run_reuses_loop():
+    pool = KernelPool()
+
+    async def current_loop():
+        return asyncio.get_running_loop()
+
+    try:
+        assert pool.run(current_loop()) is pool.run(current_loop())
+    finally:
+        pool.close()
+
+# Test async iterators are consumed on the pool's loop from synchronous code
+def test_kernel_pool_iterate():
+    pool = KernelPool()
+
+    async def numbers():
+        for number in range(3):
+            await asyncio.sleep(0)
+            yield number, asyncio.get_running_loop()
+
+    try:
+        items = list(pool.iterate(numbers()))
+        assert [number for number, _ in items] == [0, 1, 2]
+        assert all(loop is pool._loop for _, loop in items)
+    finally:
+        pool.close()
+
+# Test stopping early or timing out closes the async iterator on the pool's loop
+def test_kernel_pool_iterate_closes_early():
+    pool = KernelPool()
+    closed = []
+
+    async def numbers(delay):
+        try:
+            for number in range(3):
+                await asyncio.sleep(delay)
+                yield number
+        finally:
+            closed.append(number)
+
+    try:
+        for number in pool.iterate(numbers(0)):
+            break
+        assert closed == [0]
+
+        with pytest.raises(concurrent.futures.TimeoutError):
+            list(pool.iterate(numbers(1), timeout=0.05))
+        assert closed == [0, 0]
+    finally:
+        pool.close()
+
+# Test the default factory registers the plugin and prompt functions
+def test_create_research_tools():
+    research_tools = create_research_tools("LLaMA-3", ["key method"])
+
+    assert research_tools.table_columns == ["key method"]
+    assert {"research_tools", "KeywordsChatBot", "keymethodChatBot"} <= set(research_tools.kernel.plugins)
@@ -0,0 +1,32 @@
+import pytest
+import sys
+import fitz
+from pathlib import Path
+
+current_path = Path(__file__).resolve()
+parent_path = current_path.parent.parent
+sys.path.append(str(parent_path))
+
+from src.parsing import PDFParser
+
+def make_pdf(path, text):
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), text)
+    doc.save(str(path))
+    doc.close()
+
+# Test parsing paths and in-memory PDFs in worker processes, with pool recycling
+@pytest.mark.asyncio
+async def test_pdf_parser(tmp_path):
+    for index in range(3):
+        make_pdf(tmp_path / f"paper_{index}.pdf", f"Paper {index}\nReferences\n[1] Cited")
+
+    with PDFParser(max_workers=2, max_tasks_per_worker=1) as parser:
+        from_bytes = await parser.parse((tmp_path / "paper_0.pdf").read_bytes())
+        first_pool = parser._executor
+        texts = await parser.parse_folder(tmp_path)
+        # Two documents per pool (2 workers x 1 task), so the third one went to a fresh pool
+        assert parser._executor is not first_pool
+
+    assert from_bytes == "Paper 0\n"
+    assert list(texts.values()) == ["Paper 0\n", "Paper 1\n", "Paper 2\n"]
@@ -0,0 +1,83 @@
+import pytest
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+current_path = Path(__file__).resolve()
+parent_path = current_path.parent.parent
+sys.path.append(str(parent_path))
+
+from src.pipeline import Pipeline, Stage, DROP
+
+# Test results come back in input order even when items finish out of order
+@pytest.mark.asyncio
+async def test_pipeline_run_keeps_order():
+    async def slow_for_even(item):
+        await asyncio.sleep(0.02 if item % 2 == 0 else 0)
+        return item * 10
+
+    pipeline = Pipeline([
+        Stage("double", lambda item: item * 2, workers=2, blocking=True),
+        Stage("scale", slow_for_even, workers=3),
+    ])
+    result = await pipeline.run(range(6))
+
+    assert result == [0, 20, 40, 60, 80, 100]
+
+# Test stages overlap, so the total time is close to the slowest stage
+@pytest.mark.asyncio
+async def test_pipeline_overlaps_stages():
+    def download(item):
+        time.sleep(0.05)
+        return item
+
+    async def extract(item):
+        await asyncio.sleep(0.05)
+        return item
+
+    pipeline = Pipeline([
+        Stage("download", download, workers=1, blocking=True),
+        Stage("extract", extract, workers=1),
+    ])
+    start = time.perf_counter()
+    result = await pipeline.run(range(6))
+    elapsed = time.perf_counter() - start
+
+    assert result == list(range(6))
+    # Serial execution would take 6 * 0.1s
+    assert elapsed < 0.5
+
+# Test dropped items and stage failures
+@pytest.mark.asyncio
+async def test_pipeline_drop_and_failure():
+    async def keep_odd(item):
+        return item if item % 2 else DROP
+
+    assert await Pipeline([Stage("filter", keep_odd)]).run(range(5)) == [1, 3]
+
+    def failing_source():
+        yield 1
+        raise ValueError("boom")
+
+    # A failing input ends the stream
+    with pytest.raises(ValueError):
+        await Pipeline([Stage("filter", keep_odd, workers=2)]).run(failing_source())
+
+# Test an item failing in a stage is dropped while the other items go through
+@pytest.mark.asyncio
+async def test_pipeline_item_failure():
+    async def parse(item):
+        if item == 2:
+            raise ValueError("bad pdf")
+        await asyncio.sleep(0.01)
+        return item
+
+    errors = []
+    pipeline = Pipeline([
+        Stage("parse", parse, workers=2),
+        Stage("extract", lambda item: item * 10, blocking=True),
+    ], on_error=lambda stage, index, item, error: errors.append((stage, index, item, str(error))))
+
+    assert await pipeline.run(range(5)) == [0, 10, 30, 40]
+    assert errors == [("parse", 2, 2, "bad pdf")]
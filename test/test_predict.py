@@ -0,0 +1,55 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+current_path = Path(__file__).resolve()
+parent_path = current_path.parent.parent
+sys.path.append(str(parent_path))
+
+from evaluate.predict import PredictionLog, run_predictions, write_outputs
+
+queries = ["graph networks by Alice", "vision transformers"]
+
+
+class FakeTools:
+    """Stands in for ResearchTools: a JSON keywords answer, failing on chosen queries"""
+
+    def __init__(self, model, calls, failing=()):
+        self.model = model
+        self.calls = calls
+        self.failing = set(failing)
+
+    async def get_keywords(self, query):
+        self.calls.append((self.model, query))
+        if query in self.failing:
+            raise RuntimeError("model unavailable")
+        return json.dumps({"keywords": [query], "authors": [self.model]})
+
+
+# Test a re-run only predicts the pairs missing from the checkpoint and writes complete models
+@pytest.mark.asyncio
+async def test_run_predictions_resume(tmp_path):
+    log = PredictionLog(tmp_path / "predictions.jsonl")
+    models = ["baseline", "llama3", "gemma"]
+    concurrency = {"ollama": 2, "openai": 4}
+
+    calls = []
+    tools = {model: FakeTools(model, calls, failing={"vision transformers"} if model == "gemma" else ()) for model in models}
+    predictions, failed = await run_predictions(queries, models, tools.get, log, concurrency)
+    assert failed == 1 and len(predictions) == 5 and len(calls) == 6
+    assert write_outputs(queries, models, predictions, tmp_path) == ["baseline", "llama3"]
+    # Simulate a crash in the middle of a checkpoint line
+    with open(tmp_path / "predictions.jsonl", "a") as file:
+        file.write('{"model": "gemma", "que')
+
+    calls = []
+    tools = {model: FakeTools(model, calls) for model in models}
+    predictions, failed = await run_predictions(queries, models, tools.get, log, concurrency)
+    assert failed == 0 and calls == [("gemma", "vision transformers")]
+    assert write_outputs(queries, models, predictions, tmp_path) == models
+
+    outputs = json.loads((tmp_path / "outputs_gemma.json").read_text())
+    assert [params['keywords'] for params in outputs["gemma"]] == [[query] for query in queries]
+    assert outputs["gemma"][0]['authors'] == ["gemma"] and outputs["gemma"][0]['year_range'] == []
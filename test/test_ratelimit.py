@@ -0,0 +1,119 @@
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+import pytest
+
+current_path = Path(__file__).resolve()
+parent_path = current_path.parent.parent
+sys.path.append(str(parent_path))
+
+from src.ratelimit import AdaptiveLimiter, backend_limits, call_with_retries, classify
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr("src.ratelimit.random.uniform", lambda low, high: 0)
+
+
+# Test errors are classified by status, through wrapped causes
+def test_classify():
+    assert classify(StatusError(429)) == (True, True)
+    assert classify(StatusError(400)) == (False, False)
+    assert classify(asyncio.TimeoutError()) == (True, True)
+    assert classify(ValueError("bad prompt")) == (False, False)
+    try:
+        try:
+            raise StatusError(503)
+        except StatusError as e:
+            raise RuntimeError("service failed") from e
+    except RuntimeError as wrapped:
+        assert classify(wrapped) == (True, True)
+
+
+# Test transient errors are retried until success and permanent ones raise at once
+@pytest.mark.asyncio
+async def test_call_with_retries():
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise StatusError(503)
+        return "ok"
+
+    limiter = AdaptiveLimiter("test", max_concurrency=4, cooldown=0)
+    assert await call_with_retries(flaky, limiter) == "ok"
+    assert len(attempts) == 3 and limiter.in_flight == 0
+    assert limiter.limit < 4
+
+    async def invalid():
+        attempts.append(1)
+        raise StatusError(400)
+
+    with pytest.raises(StatusError):
+        await call_with_retries(invalid, limiter)
+    assert len(attempts) == 4
+
+
+# Test each attempt is bounded by the timeout and all of them by the deadline
+@pytest.mark.asyncio
+async def test_call_with_retries_deadline():
+    async def slow():
+        await asyncio.sleep(1)
+
+    start = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        await call_with_retries(slow, retries=10, timeout=0.05, deadline=0.2)
+    assert time.monotonic() - start < 0.5
+
+
+
+# Test every backend has a default deadline shorter than its retries at the full attempt timeout
+def test_backend_deadlines():
+    for backend, limits in backend_limits.items():
+        assert limits["timeout"] <= limits["deadline"] < 5 * limits["timeout"], backend
+
+# Test AIMD: the limit bounds concurrency, halves on overload and grows back additively
+@pytest.mark.asyncio
+async def test_adaptive_limiter():
+    limiter = AdaptiveLimiter("test", max_concurrency=4, cooldown=0)
+    in_flight, max_in_flight = 0, 0
+
+    async def call():
+        nonlocal in_flight, max_in_flight
+        await limiter.acquire()
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        limiter.release(0.01)
+
+    await asyncio.gather(*[call() for _ in range(10)])
+    assert max_in_flight == 4
+
+    await limiter.acquire()
+    limiter.release(overloaded=True)
+    assert limiter.limit == 2
+    for _ in range(4):
+        await limiter.acquire()
+        limiter.release(0.01)
+    assert 3 < limiter.limit < 4
+
+
+# Test the token bucket spaces out calls beyond the burst
+@pytest.mark.asyncio
+async def test_token_bucket():
+    limiter = AdaptiveLimiter("test", rate=20, burst=2, max_concurrency=10)
+    start = time.monotonic()
+    for _ in range(5):
+        await limiter.acquire()
+        limiter.release()
+    assert time.monotonic() - start >= 0.14
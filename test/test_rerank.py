@@ -0,0 +1,54 @@
+import sys
+from pathlib import Path
+from unittest.mock import Mock
+
+import numpy as np
+
+current_path = Path(__file__).resolve()
+parent_path = current_path.parent.parent
+sys.path.append(str(parent_path))
+
+from src.rerank import HashingEmbedder, VectorCache, Reranker
+
+texts = [
+    "Vision transformers for image classification",
+    "Graph neural networks for molecule property prediction",
+    "Graph neural networks for molecule property prediction (extended journal version)",
+    "Message passing graph networks on citation graphs",
+]
+
+
+# Test hashed embeddings are normalized and stable across instances
+def test_hashing_embedder():
+    vectors = HashingEmbedder(dim=256).embed(texts)
+    assert vectors.shape == (4, 256)
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1)
+    assert np.array_equal(vectors, HashingEmbedder(dim=256).embed(texts))
+    assert vectors[1] @ vectors[2] > vectors[1] @ vectors[0]
+
+
+# Test reranking orders by query similarity and drops near-duplicates
+def test_rerank_dedup(tmp_path):
+    reranker = Reranker(cache=VectorCache(tmp_path, dim=512), dedup_threshold=0.8)
+    kept = reranker.rerank("graph neural networks molecules", ["a", "b", "c", "d"], texts, k=3)
+    assert kept[0] == 1
+    assert 2 not in kept
+    assert sorted(kept) == [0, 1, 3]
+
+
+# Test vectors are cached on disk and only missing ones are embedded
+def test_vector_cache(tmp_path):
+    embedder = HashingEmbedder(dim=64)
+    embedder.embed = Mock(side_effect=HashingEmbedder(dim=64).embed)
+    reranker = Reranker(embedder, VectorCache(tmp_path, embedder.name, 64), batch_size=2)
+    first = reranker.embed_papers(["a", "b", "c"], texts[:3])
+    assert embedder.embed.call_count == 2
+
+    cache = VectorCache(tmp_path, embedder.name, 64)
+    vectors, found = cache.get(["c", "x", "a"])
+    assert found.tolist() == [True, False, True]
+    assert np.allclose(vectors[[0, 2]], first[[2, 0]])
+
+    reranker.cache = cache
+    reranker.embed_papers([str(i) for i in range(100)], [f"paper {i}" for i in range(100)])
+    assert cache.get(["99", "b"])[1].all()
@@ -1,11 +1,13 @@
 import pytest
 import sys
-from unittest.mock import Mock, patch, AsyncMock, create_autospec
+import asyncio
+from unittest.mock import Mock, patch, AsyncMock, create_autospec, ANY
 from semantic_kernel.kernel import Kernel
 from semantic_kernel.connectors.ai.open_ai.services.open_ai_chat_completion import OpenAIChatCompletion
 from semantic_kernel.connectors.ai.ollama.services.ollama_chat_completion import OllamaChatCompletion
 from pathlib import Path
 from openai import AsyncOpenAI
+import io
 import os
 import pandas as pd
 
@@ -16,17 +18,39 @@ sys.path.append(str(parent_path))
 from src.agents_sk import ResearchTools
 from src.prompt import PromptStore
 from src.utils import extract_text_from_pdf
+from src.cache import PDFCache, ResponseCache
+from src.store import PaperStore
+from src.search_index import BM25Index
+from src.rerank import Reranker, VectorCache
+from src.telemetry import tracer
+from src.ratelimit import backend_limits, get_limiter
 
 @pytest.fixture
-def research_tools():
+def research_tools(monkeypatch):
+    # Fresh process-wide limiters, without the arXiv politeness delay, for every test
+    monkeypatch.setattr("src.ratelimit._limiters", {})
     kernel = Mock(spec=Kernel)
-    return ResearchTools(kernel, num_keywords=5, model="GPT-3.5 Turbo")
+    return ResearchTools(kernel, num_keywords=5, model="GPT-3.5 Turbo", delay_seconds=0)
+
+@pytest.fixture(autouse=True)
+def downloads(monkeypatch):
+    # PDF downloads answer with a stub file; each call records its URL and timeout
+    calls = []
+
+    def urlopen(url, timeout=None):
+        calls.append((url, timeout))
+        return io.BytesIO(b"%PDF-1.4 test")
+
+    monkeypatch.setattr("src.cache.urlopen", urlopen)
+    return calls
 
 # Test initialization of ResearchTools
 def test_init(research_tools):
     assert research_tools.num_keywords == 5
     assert research_tools.model == "GPT-3.5 Turbo"
     assert isinstance(research_tools.kernel, Mock)
+    # LLM calls are bounded by the backend's default deadline across all retries
+    assert research_tools.llm_deadline == backend_limits["openai"]["deadline"]
 
 
 
@@ -34,7 +58,7 @@ def test_init(research_tools):
 # Test setup of OpenAI LLM
 def test_setup_llm_openai(research_tools):
     mock_async_openai = create_autospec(AsyncOpenAI)
-    with patch('src.agents_sk.AsyncOpenAI', return_value=mock_async_openai):
+    with patch('openai.AsyncOpenAI', return_value=mock_async_openai):
         with patch.object(research_tools.kernel, 'add_service') as mock_add_service:
             with patch.object(research_tools.kernel, 'get_prompt_execution_settings_from_service_id', return_value=Mock()) as mock_get_settings:
                 research_tools.setup_llm(api_key="test_api_key")
@@ -62,6 +86,17 @@ def test_setup_info_extractor(research_tools):
             
             assert research_tools.table_columns == ["column1", "column2"]
             assert mock_add_function.call_count == 3  # 1 for keywords extraction + 2 for columns
+
+# Test the keywords prompt asks each backend for JSON that stops at the closing brace
+def test_keywords_settings(research_tools):
+    settings = research_tools.get_keywords_settings()
+    assert settings.response_format == {"type": "json_object"}
+    assert settings.stop == ["}"] and settings.max_tokens == 128
+
+    research_tools.model = "LLaMA-3"
+    settings = research_tools.get_keywords_settings()
+    assert settings.format == "json"
+    assert settings.options["stop"] == ["}"] and settings.options["num_predict"] == 128
             
             
             
@@ -77,11 +112,115 @@ async def test_async_get_survey_table(research_tools):
     assert result == {"column1": "test_value", "column2": "test_value"}
     assert research_tools.kernel.invoke.call_count == 2
 
+# Test concurrent get_survey_table keeps column order and contains per-column failures
+@pytest.mark.asyncio
+async def test_async_get_survey_table_concurrent(research_tools):
+    research_tools.concurrent = True
+    research_tools.table_columns = ["column1", "column2", "column3"]
+    in_flight, max_in_flight = 0, 0
+
+    async def invoke(plugin_name, function_name, paper_text):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01 if function_name == "column1" else 0)
+        in_flight -= 1
+        if function_name == "column2":
+            raise TimeoutError("LLM timed out")
+        return Mock(value=[f"{function_name}_value"])
+
+    research_tools.kernel.invoke = invoke
+    research_tools.concurrency_limits["openai"] = 2
+    research_tools.retries = 0
+
+    result = await research_tools.get_survey_table("test_paper_text")
+
+    assert list(result) == ["column1", "column2", "column3"]
+    assert result == {"column1": "column1_value", "column2": "N/A", "column3": "column3_value"}
+    assert max_in_flight == 2
+
+# Test column_timeout bounds each LLM call, not the time a column waits for a free slot
+@pytest.mark.asyncio
+async def test_column_timeout_excludes_queueing(research_tools):
+    research_tools.concurrent = True
+    research_tools.column_timeout = 0.1
+    research_tools.concurrency_limits["openai"] = 1
+    research_tools.table_columns = ["column1", "column2", "column3"]
+
+    async def invoke(plugin_name, function_name, paper_text):
+        await asyncio.sleep(0.07 if function_name != "column3" else 0.5)
+        return Mock(value=[f"{function_name}_value"])
+
+    research_tools.kernel.invoke = invoke
+    research_tools.retries = 0
+
+    result = await research_tools.get_survey_table("test_paper_text")
+
+    # column2 queued behind column1 and took longer than the timeout in all, yet finished; column3 timed out
+    assert result == {"column1": "column1_value", "column2": "column2_value", "column3": "N/A"}
+
+# Test long papers are extracted as map over routed chunks then reduce
+@pytest.mark.asyncio
+async def test_async_get_survey_table_map_reduce(research_tools):
+    research_tools.chunk_tokens = 50
+    research_tools.max_chunks = 2
+    research_tools.table_columns = ["experimental findings"]
+    research_tools.kernel.invoke = AsyncMock(return_value=Mock(value=["test_value"]))
+    paper_text = "1 Introduction\n" + "Intro text.\n" * 30 + "2 Experiments\n" + "Results are good.\n" * 30
+
+    result = await research_tools.get_survey_table(paper_text)
+
+    assert result == {"experimental findings": "test_value"}
+    calls = research_tools.kernel.invoke.call_args_list
+    assert [call.kwargs["function_name"] for call in calls] == ["experimentalfindings"] * 2 + ["experimentalfindingsReduce"]
+    assert all("Results are good." in call.kwargs["paper_text"] for call in calls[:2])
+
+# Test fused extraction answers all columns with one call and falls back per column
+@pytest.mark.asyncio
+async def test_async_get_survey_table_fused(research_tools):
+    research_tools.fused = True
+    research_tools.table_columns = ["key method", "dataset"]
+
+    async def invoke(plugin_name, function_name, paper_text, fields=None):
+        if function_name == "FusedExtraction":
+            return Mock(value=['```json\n{"Key Method": "message passing"}\n```'])
+        return Mock(value=[f"{function_name}_value"])
+
+    research_tools.kernel.invoke = AsyncMock(side_effect=invoke)
+    result = await research_tools.get_survey_table("test_paper_text")
+
+    assert result == {"key method": "message passing", "dataset": "dataset_value"}
+    assert research_tools.kernel.invoke.call_count == 2
+
+    research_tools.kernel.invoke = AsyncMock(return_value=Mock(value=["not json"]))
+    result = await research_tools.get_survey_table("test_paper_text")
+
+    assert result == {"key method": "not json", "dataset": "not json"}
+    assert research_tools.kernel.invoke.call_count == 3
+
+# Test the fused prompt only asks for the missing columns, and fused cells are hashed apart from per-column ones
+@pytest.mark.asyncio
+async def test_fused_missing_columns_and_prompt_hash(research_tools):
+    research_tools.setup_info_extractor(["Method", "Dataset", "Metric"])
+    per_column_hash = research_tools.get_prompt_hash("Method")
+    research_tools.fused = True
+    research_tools.setup_info_extractor(["Method", "Dataset", "Metric"])
+    assert research_tools.get_prompt_hash("Method") != per_column_hash
+
+    research_tools.kernel.invoke = AsyncMock(return_value=Mock(value=['{"Dataset": "Cora", "Metric": "accuracy"}']))
+    result = await research_tools.get_survey_table("test_paper_text", columns=["Dataset", "Metric"])
+
+    assert result == {"Dataset": "Cora", "Metric": "accuracy"}
+    research_tools.kernel.invoke.assert_called_once_with(
+        plugin_name="SurveyChatBot", function_name="FusedExtraction", fields='["Dataset", "Metric"]', paper_text="test_paper_text",
+    )
+
 # Test get_keywords method
-def test_get_keywords(research_tools):
-    research_tools.kernel.invoke = Mock(return_value="test_keywords")
+@pytest.mark.asyncio
+async def test_get_keywords(research_tools):
+    research_tools.kernel.invoke = AsyncMock(return_value=Mock(value=["test_keywords"]))
     
-    result = research_tools.get_keywords("test_query")
+    result = await research_tools.get_keywords("test_query")
     
     assert result == "test_keywords"
     research_tools.kernel.invoke.assert_called_once_with(
@@ -93,32 +232,97 @@ def test_get_keywords(research_tools):
 
 
 
+def make_mock_paper(entry_id="http://arxiv.org/abs/2301.00001v1"):
+    class Author:
+        def __init__(self, name):
+            self.name = name
+
+    return Mock(
+        entry_id=entry_id,
+        title="Test Paper",
+        published=Mock(year=2023),
+        authors=[Author("Author 1"), Author("Author 2")],
+        pdf_url="http://test.com/paper.pdf",
+        summary="Test summary",
+    )
+
+# Test repeated prompts are answered from the response cache
+@pytest.mark.asyncio
+async def test_response_cache_skips_repeated_invocations(research_tools, tmp_path):
+    research_tools.response_cache = ResponseCache(tmp_path / "responses.sqlite")
+    research_tools.settings = None
+    research_tools.table_columns = ["key method"]
+    research_tools.prompts[("keymethodChatBot", "keymethod")] = "Extract key method {{$paper_text}}"
+    research_tools.kernel.invoke = AsyncMock(return_value=Mock(value=["transformers"]))
+
+    first = await research_tools.get_survey_table("paper one")
+    second = await research_tools.get_survey_table("paper one")
+    await research_tools.get_survey_table("paper two")
+
+    assert first == second == {"key method": "transformers"}
+    assert research_tools.kernel.invoke.call_count == 2
+    assert research_tools.response_cache.stats()["hits"] == 1
+
+# Test the response cache key follows the settings a call runs with
+@pytest.mark.asyncio
+async def test_response_cache_keyed_on_call_settings(research_tools, tmp_path):
+    research_tools.response_cache = ResponseCache(tmp_path / "responses.sqlite")
+    research_tools.prompts[("KeywordsChatBot", "KeywordsExtraction")] = "Keywords of {{$query}}"
+    research_tools.kernel.invoke = AsyncMock(return_value=Mock(value=['{"keywords": ["transformers"]']))
+
+    await research_tools.get_keywords("transformers")
+    await research_tools.get_keywords("transformers")
+    assert research_tools.kernel.invoke.call_count == 1
+
+    research_tools.keyword_max_tokens = 256
+    await research_tools.get_keywords("transformers")
+    assert research_tools.kernel.invoke.call_count == 2
+
+# Test response cache TTL and max-size eviction
+def test_response_cache_eviction(tmp_path):
+    cache = ResponseCache(tmp_path / "responses.sqlite", ttl=60, max_entries=2)
+    keys = [ResponseCache.key("llama3", f"prompt {i}") for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put(key, f"value {i}")
+
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[2]) == "value 2"
+
+    cache.ttl = -1
+    assert cache.get(keys[2]) is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "hit_rate": 1 / 3}
+
+# Test eviction runs once the cache is over max_entries, and then frees room for several puts
+def test_response_cache_batched_eviction(tmp_path):
+    cache = ResponseCache(tmp_path / "responses.sqlite", max_entries=10, evict_fraction=0.5)
+    keys = [ResponseCache.key("llama3", f"prompt {i}") for i in range(16)]
+    count = lambda: cache._connect().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+    for key in keys[:10]:
+        cache.put(key, "value")
+    assert count() == 10
+    cache.put(keys[10], "value")
+    assert count() == 5
+    for key in keys[11:16]:
+        cache.put(key, "value")
+    assert count() == 10
+    assert cache.get(keys[15]) == "value"
+
 # Test asynchronous retrieve_papers method
 @pytest.mark.asyncio
-async def test_async_retrieve_papers(research_tools):
-    with patch('src.agents_sk.arxiv') as mock_arxiv, \
-         patch('src.agents_sk.extract_text_from_pdf') as mock_extract_text, \
-         patch('pandas.DataFrame.to_csv') as mock_to_csv, \
-         patch('os.makedirs') as mock_makedirs, \
-         patch('os.path.exists', return_value=True):
+async def test_async_retrieve_papers(research_tools, tmp_path, monkeypatch, downloads):
+    monkeypatch.chdir(tmp_path)
+    research_tools.pdf_cache = PDFCache(tmp_path / "cache")
+    research_tools.store = PaperStore(tmp_path / "store")
+    research_tools.table_columns = ["column1"]
+    with patch('src.arxiv_search.arxiv') as mock_arxiv, \
+         patch('src.agents_sk.extract_text_from_pdf') as mock_extract_text:
         
         mock_search = Mock()
         mock_arxiv.Search.return_value = mock_search
         mock_client = Mock()
         mock_arxiv.Client.return_value = mock_client
-        
-        class Author:
-            def __init__(self, name):
-                self.name = name
-
-        mock_paper = Mock(
-            title="Test Paper",
-            published=Mock(year=2023),
-            authors=[Author("Author 1"), Author("Author 2")],
-            pdf_url="http://test.com/paper.pdf",
-            summary="Test summary",
-            download_pdf=Mock()
-        )
+
+        mock_paper = make_mock_paper()
         mock_client.results.return_value = [mock_paper]
         mock_extract_text.return_value = "Extracted text"
         
@@ -135,17 +339,221 @@ async def test_async_retrieve_papers(research_tools):
         assert result[0]['keywords'] == "AI"
         assert result[0]['column1'] == "value1"
         
-        mock_paper.download_pdf.assert_called_once()
+        # The download is bounded by the arXiv backend's per-attempt timeout
+        assert downloads == [("http://test.com/paper.pdf", backend_limits["arxiv"]["timeout"])]
+        mock_extract_text.assert_called_once_with(str(tmp_path / "cache" / "2301.00001v1.pdf"))
+        research_tools.get_survey_table.assert_called_once_with(paper_text="Extracted text", columns=["column1"], on_cell=ANY)
+
+        stored = research_tools.store.query()
+        assert [paper['arxiv_id'] for paper in stored] == ["2301.00001v1"]
+        assert research_tools.store.get_texts(["2301.00001v1"]) == {"2301.00001v1": "Extracted text"}
+
+        # A second search over the same paper is served from the store without download or extraction
+        result = await research_tools.retrieve_papers(num_papers=1, keywords=["AI"])
+        assert result[0]['column1'] == "value1"
+        assert len(downloads) == 1
         mock_extract_text.assert_called_once()
-        research_tools.get_survey_table.assert_called_once_with(paper_text="Extracted text")
-        mock_to_csv.assert_called_once()
-        mock_makedirs.assert_called_once()
+        research_tools.get_survey_table.assert_called_once()
+
+# Test keyword searches are answered from the local index and store before arXiv
+@pytest.mark.asyncio
+async def test_retrieve_papers_local_first(research_tools, tmp_path):
+    research_tools.store = PaperStore(tmp_path / "store")
+    research_tools.index = BM25Index(tmp_path / "index")
+    research_tools.store.upsert_papers([{
+        'arxiv_id': "2301.00002v1", 'title': "Graph Networks", 'year': 2023, 'author': "Author 1",
+        'url': "http://arxiv.org/pdf/2301.00002v1", 'abstract': "Message passing", 'keywords': "graph",
+    }])
+    research_tools.store.write_texts({"2301.00002v1": "Stored text"})
+    research_tools.index.add_documents({"2301.00002v1": "Graph Networks\nMessage passing on graphs"})
+    research_tools.table_columns = ["column1"]
+    research_tools.get_survey_table = AsyncMock(return_value={"column1": "value1"})
+
+    with patch('src.arxiv_search.arxiv.Client') as mock_client:
+        result = await research_tools.retrieve_papers(num_papers=1, keywords=["graph", "message passing"], year_range=["2022", "2024"])
+        mock_client.assert_not_called()
+
+    assert [paper['title'] for paper in result] == ["Graph Networks"]
+    assert result[0]['author'] == "Author 1"
+    research_tools.get_survey_table.assert_called_once_with(paper_text="Stored text", columns=["column1"], on_cell=ANY)
+    assert research_tools.store.query()[0]['arxiv_id'] == "2301.00002v1"
+
+# Test adding a column only extracts the new column and merges stored cells
+@pytest.mark.asyncio
+async def test_incremental_extraction(research_tools, tmp_path):
+    research_tools.store = PaperStore(tmp_path / "store")
+    research_tools.index = BM25Index(tmp_path / "index")
+    research_tools.table_columns = ["Method", "Dataset", "Metric"]
+    research_tools.store.write_texts({"2301.00001v1": "Stored text"})
+    research_tools.store.write_cells([
+        {'arxiv_id': "2301.00001v1", 'column': column, 'model': research_tools.model_id,
+         'prompt_hash': research_tools.get_prompt_hash(column), 'value': f"stored {column}"}
+        for column in ["Method", "Dataset"]
+    ])
+    research_tools.kernel.invoke = AsyncMock(return_value=Mock(value=["new metric"]))
+
+    with patch('src.arxiv_search.arxiv') as mock_arxiv:
+        mock_arxiv.Client.return_value.results.return_value = [make_mock_paper()]
+        result = await research_tools.retrieve_papers(num_papers=1)
+
+    assert research_tools.kernel.invoke.call_count == 1
+    assert {column: result[0][column] for column in research_tools.table_columns} == {
+        "Method": "stored Method", "Dataset": "stored Dataset", "Metric": "new metric"}
+    assert list(result[0])[-3:] == research_tools.table_columns
+    stored = research_tools.store.get_cells(["2301.00001v1"], research_tools.model_id)["2301.00001v1"]
+    assert stored[("Metric", research_tools.get_prompt_hash("Metric"))] == "new metric"
+
+# Test a page of results is looked up in the store with one query for cells and one for texts
+@pytest.mark.asyncio
+async def test_stored_lookup_batched(research_tools, tmp_path):
+    research_tools.store = PaperStore(tmp_path / "store")
+    research_tools.index = BM25Index(tmp_path / "index")
+    research_tools.table_columns = ["Method"]
+    papers = [make_mock_paper(f"http://arxiv.org/abs/2301.0000{i}v1") for i in range(3)]
+    research_tools.store.write_cells([
+        {'arxiv_id': f"2301.0000{i}v1", 'column': "Method", 'model': research_tools.model_id,
+         'prompt_hash': research_tools.get_prompt_hash("Method"), 'value': f"stored {i}"} for i in range(2)
+    ])
+    research_tools.store.write_texts({"2301.00002v1": "Stored text"})
+    research_tools.kernel.invoke = AsyncMock(return_value=Mock(value=["new"]))
+
+    with patch('src.arxiv_search.arxiv') as mock_arxiv, \
+         patch.object(research_tools.store, 'get_cells', wraps=research_tools.store.get_cells) as get_cells, \
+         patch.object(research_tools.store, 'get_texts', wraps=research_tools.store.get_texts) as get_texts:
+        mock_arxiv.Client.return_value.results.return_value = papers
+        result = await research_tools.retrieve_papers(num_papers=3)
+
+    assert [row['Method'] for row in result] == ["stored 0", "stored 1", "new"]
+    get_cells.assert_called_once()
+    # Only the paper with a column left to extract needs its text
+    get_texts.assert_called_once_with(["2301.00002v1"])
+
+# Test stream_papers reports stage progress and cells before each finished row
+@pytest.mark.asyncio
+async def test_stream_papers(research_tools, tmp_path):
+    research_tools.pdf_cache = PDFCache(tmp_path / "cache")
+    research_tools.store = PaperStore(tmp_path / "store")
+    research_tools.index = BM25Index(tmp_path / "index")
+    research_tools.table_columns = ["Method", "Dataset"]
+    research_tools.kernel.invoke = AsyncMock(return_value=Mock(value=["value"]))
+    papers = [make_mock_paper(f"http://arxiv.org/abs/2301.0000{i}v1") for i in range(2)]
+
+    with patch('src.arxiv_search.arxiv') as mock_arxiv, \
+         patch('src.agents_sk.extract_text_from_pdf', return_value="Extracted text"):
+        mock_arxiv.Client.return_value.results.return_value = papers
+        events = [event async for event in research_tools.stream_papers(num_papers=2)]
+
+    progress = [(event['stage'], event['done']) for event in events if event['type'] == 'progress']
+    assert sorted(progress) == sorted((stage, done) for stage in ["lookup", "download", "parse", "extract"] for done in [1, 2])
+    for index in range(2):
+        kinds = [(event['type'], event.get('column')) for event in events if event.get('index') == index]
+        assert sorted(kinds[:2]) == [('cell', "Dataset"), ('cell', "Method")]
+        assert kinds[2] == ('row', None)
+    assert len(research_tools.store.query()) == 2
+
+    # Every stage, LLM call and the persist step are traced under the search
+    assert events[0]['type'] == 'search'
+    spans = {row['span']: row['count'] for row in tracer.summary(events[0]['trace_id'])}
+    assert spans == {"search": 1, "arxiv_page": 1, "paper": 2, "lookup": 2, "download": 2, "parse": 2,
+                     "extract": 2, "llm": 4, "persist": 1}
+
+# Test one unreadable PDF drops its paper with an error event while the others finish
+@pytest.mark.asyncio
+async def test_stream_papers_item_failure(research_tools, tmp_path):
+    research_tools.pdf_cache = PDFCache(tmp_path / "cache")
+    research_tools.store = PaperStore(tmp_path / "store")
+    research_tools.index = BM25Index(tmp_path / "index")
+    research_tools.table_columns = ["Method"]
+    research_tools.kernel.invoke = AsyncMock(return_value=Mock(value=["value"]))
+    papers = [make_mock_paper(f"http://arxiv.org/abs/2301.0000{i}v1") for i in range(3)]
+
+    def extract_text(path):
+        if "2301.00001v1" in path:
+            raise RuntimeError("broken PDF")
+        return "Extracted text"
+
+    with patch('src.arxiv_search.arxiv') as mock_arxiv, \
+         patch('src.agents_sk.extract_text_from_pdf', side_effect=extract_text):
+        mock_arxiv.Client.return_value.results.return_value = papers
+        events = [event async for event in research_tools.stream_papers(num_papers=3)]
+
+    assert sorted(event['index'] for event in events if event['type'] == 'row') == [0, 2]
+    errors = [event for event in events if event['type'] == 'error']
+    assert [(event['index'], event['stage']) for event in errors] == [(1, "parse")]
+    assert len(research_tools.store.query()) == 2
+
+# Test reranking drops near-duplicate candidates before any download
+@pytest.mark.asyncio
+async def test_retrieve_papers_rerank(research_tools, tmp_path, downloads):
+    research_tools.pdf_cache = PDFCache(tmp_path / "cache")
+    research_tools.store = PaperStore(tmp_path / "store")
+    research_tools.index = BM25Index(tmp_path / "index")
+    research_tools.reranker = Reranker(cache=VectorCache(tmp_path / "vectors"))
+    research_tools.get_survey_table = AsyncMock(return_value={})
+    papers = [make_mock_paper(f"http://arxiv.org/abs/2301.0000{i}v1") for i in range(3)]
+    abstract = "We propose message passing graph neural networks that learn molecule representations and set a new state of the art on property prediction benchmarks."
+    for paper, title, summary in zip(papers, ["Vision transformers", "Graph neural networks", "Graph neural networks for molecules"],
+                                     ["We apply transformers to image patches for classification.", abstract, abstract]):
+        paper.title, paper.summary = title, summary
+
+    with patch('src.arxiv_search.arxiv') as mock_arxiv, \
+         patch('src.agents_sk.extract_text_from_pdf', return_value="Extracted text"):
+        mock_arxiv.Client.return_value.results.return_value = papers
+        result = await research_tools.retrieve_papers(num_papers=2, keywords=["graph neural networks"])
+
+    assert [paper['title'] for paper in result] == ["Graph neural networks", "Vision transformers"]
+    assert len(downloads) == 2
+
+# Test the PDF cache evicts least recently used files beyond its size budget
+def test_pdf_cache_lru_eviction(tmp_path):
+    cache = PDFCache(tmp_path, max_bytes=2 * len(b"%PDF-1.4 test"))
+    first, second, third = (make_mock_paper(f"http://arxiv.org/abs/2301.0000{i}v1") for i in range(3))
+
+    cache.fetch(first)
+    cache.fetch(second)
+    os.utime(cache.path(first.entry_id), (0, 0))
+    os.utime(cache.path(second.entry_id), (1, 1))
+    assert cache.get(first.entry_id) is not None  # refreshes first, second is now the LRU entry
+    cache.fetch(third)
+
+    assert cache.get(second.entry_id) is None
+    assert cache.get(first.entry_id) is not None
+    assert cache.get(third.entry_id) is not None
+    assert not list(tmp_path.glob("*.part"))
+
+# Test a timed out download is retried under the arXiv limiter, and a cached PDF skips both
+@pytest.mark.asyncio
+async def test_download_paper_retries(research_tools, tmp_path, monkeypatch, downloads):
+    research_tools.pdf_cache = PDFCache(tmp_path / "cache")
+    monkeypatch.setattr("src.ratelimit.backoff_delay", lambda *args, **kwargs: 0)
+    failures = [TimeoutError("read timed out")]
+
+    def urlopen(url, timeout=None):
+        downloads.append((url, timeout))
+        if failures:
+            raise failures.pop()
+        return io.BytesIO(b"%PDF-1.4 test")
+
+    monkeypatch.setattr("src.cache.urlopen", urlopen)
+    job = {'paper': make_mock_paper(), 'table_info': None, 'paper_text': None}
+    job = await research_tools.download_paper(job)
+    assert job['file_path'] == research_tools.pdf_cache.path(job['paper'].entry_id)
+    assert len(downloads) == 2
+    # Both attempts went through the process-wide arXiv limiter and released it
+    assert get_limiter("arxiv").in_flight == 0
+
+    job = await research_tools.download_paper({'paper': job['paper'], 'table_info': None, 'paper_text': None})
+    assert job['file_path'] is not None
+    assert len(downloads) == 2
 
 # Test save_to_zotero method
-def test_save_to_zotero(research_tools):
-    with patch('src.agents_sk.zotero.Zotero') as mock_zotero:
+def test_save_to_zotero(research_tools, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with patch('src.zotero_sync.zotero.Zotero') as mock_zotero:
         mock_zotero_instance = mock_zotero.return_value
-        mock_zotero_instance.create_items.return_value = {'successful': True}
+        mock_zotero_instance.everything.return_value = []
+        mock_zotero_instance.request.headers = {'last-modified-version': '1'}
+        mock_zotero_instance.create_items.return_value = {'success': {'0': 'ABCD1234'}}
         
         result = research_tools.save_to_zotero(
             papers=[{'title': 'Test Paper', 'year': '2023', 'url': 'http://test.com'}],
@@ -155,4 +563,4 @@ def test_save_to_zotero(research_tools):
         )
         assert result == True
         mock_zotero.assert_called_once_with('test_user', 'user', 'test_api_key')
-        mock_zotero_instance.create_items.assert_called_once()
\ No newline at end of file
+        mock_zotero_instance.create_items.assert_called_once()
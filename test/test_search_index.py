@@ -0,0 +1,44 @@
+import sys
+from pathlib import Path
+
+current_path = Path(__file__).resolve()
+parent_path = current_path.parent.parent
+sys.path.append(str(parent_path))
+
+from src.search_index import BM25Index, tokenize
+
+documents = {
+    "gnn": "Graph neural networks for molecule property prediction. We train graph networks on molecules.",
+    "vit": "Vision transformers for image classification on ImageNet.",
+    "gat": "Graph attention networks weigh neighbours with attention.",
+}
+
+
+# Test tokenization drops stopwords and folds plurals
+def test_tokenize():
+    assert tokenize("The Graph Networks of 2023 and GPUs") == ["graph", "network", "2023", "gpu"]
+
+
+# Test BM25 ranking, all-terms matching and persistence across instances
+def test_search(tmp_path):
+    index = BM25Index(tmp_path)
+    index.add_documents(documents)
+
+    assert [doc_id for doc_id, _ in index.search("graph network")] == ["gnn", "gat"]
+    assert [doc_id for doc_id, _ in index.search("graph attention")] == ["gat"]
+    assert [doc_id for doc_id, _ in index.search("graph attention", require_all=False)] == ["gat", "gnn"]
+    assert index.search("diffusion") == []
+    assert BM25Index(tmp_path).doc_ids() == set(documents)
+
+
+# Test re-added documents supersede older copies, also after segments are merged
+def test_update_and_merge(tmp_path):
+    index = BM25Index(tmp_path, merge_factor=2)
+    for doc_id, text in documents.items():
+        index.add_documents({doc_id: text})
+    index.add_documents({"vit": "Graph transformers for molecules."})
+
+    assert len(index._load_manifest()["segments"]) <= 2
+    assert index.doc_ids() == set(documents)
+    assert [doc_id for doc_id, _ in index.search("image classification")] == []
+    assert sorted(doc_id for doc_id, _ in index.search("molecule")) == ["gnn", "vit"]
@@ -0,0 +1,80 @@
+import os
+import sys
+from pathlib import Path
+
+current_path = Path(__file__).resolve()
+parent_path = current_path.parent.parent
+sys.path.append(str(parent_path))
+
+from src.store import PaperStore
+
+
+def make_paper(arxiv_id, year, author):
+    return {'arxiv_id': arxiv_id, 'title': f"Paper {arxiv_id}", 'year': year, 'author': author,
+            'url': f"http://arxiv.org/pdf/{arxiv_id}", 'abstract': "Abstract", 'keywords': "AI"}
+
+
+# Test papers are upserted by id and filtered by year and author in SQLite
+def test_upsert_and_query(tmp_path):
+    store = PaperStore(tmp_path)
+    store.upsert_papers([make_paper("2001.00001", 2020, "Ada Lovelace, Alan Turing"),
+                         make_paper("2201.00001", 2022, "Grace Hopper")])
+    store.upsert_papers([make_paper("2201.00001", 2022, "Grace Hopper, Alan Turing")])
+
+    assert len(store.query()) == 2
+    assert [paper['arxiv_id'] for paper in store.query(year_range=[2023, 2021])] == ["2201.00001"]
+    assert [paper['arxiv_id'] for paper in store.query(authors=["alan turing"])] == ["2201.00001", "2001.00001"]
+    assert store.query(authors=["Grace Hopper"], year_range=[2019, 2020]) == []
+    store.close()
+
+
+# Test later cell values win, and compaction merges similar segments into one
+def test_cells_latest_wins_and_compact(tmp_path):
+    store = PaperStore(tmp_path, merge_width=2)
+    store.write_cells([{'arxiv_id': "a", 'column': "Method", 'model': "llama3", 'prompt_hash': "h", 'value': "old"},
+                       {'arxiv_id': "b", 'column': "Method", 'model': "llama3", 'prompt_hash': "h", 'value': "other"}])
+    store.write_cells([{'arxiv_id': "a", 'column': "Method", 'model': "llama3", 'prompt_hash': "h", 'value': "new"},
+                       {'arxiv_id': "a", 'column': "Method", 'model': "gpt-4", 'prompt_hash': "h", 'value': "gpt"}])
+    store.write_texts({"a": "text a"})
+    store.write_texts({"a": "text a v2"})
+
+    assert store.get_cells(["a"], model="llama3") == {"a": {("Method", "h"): "new"}}
+    store.compact()
+    assert len(os.listdir(tmp_path / "cells")) == 1
+    assert store.get_cells(["a", "b"], model="llama3") == {"a": {("Method", "h"): "new"}, "b": {("Method", "h"): "other"}}
+    assert store.get_texts(["a"]) == {"a": "text a v2"}
+
+
+# Test reads see the latest rows across many segments, and compaction bounds the segment count
+def test_reads_across_many_segments(tmp_path):
+    store = PaperStore(tmp_path, max_segments=8)
+    for version in range(30):
+        store.write_cells([{'arxiv_id': f"p{paper}", 'column': "Method", 'model': "llama3", 'prompt_hash': "h",
+                            'value': f"v{version}"} for paper in range(version % 5, 5)])
+        store.write_texts({f"p{version % 5}": f"text {version}"})
+        store.compact_if_needed()
+        assert store.segment_count("cells") <= 8 and store.segment_count("texts") <= 8
+
+    ids = [f"p{paper}" for paper in range(5)]
+    # Paper p was last written by version 25 + p
+    assert store.get_cells(ids, model="llama3") == {f"p{paper}": {("Method", "h"): f"v{25 + paper}"} for paper in range(5)}
+    assert store.get_texts(ids) == {f"p{paper}": f"text {25 + paper}" for paper in range(5)}
+    assert not store.compact_if_needed()
+
+
+# Test compaction merges tiers of small segments and never rewrites a large one
+def test_compact_size_tiered(tmp_path):
+    store = PaperStore(tmp_path, merge_width=3)
+    store.write_texts({f"p{paper}": "long text " * 2000 for paper in range(20)})
+    [large] = os.listdir(tmp_path / "texts")
+    store.max_merge_bytes = os.path.getsize(tmp_path / "texts" / large)
+    for version in range(2):
+        store.write_texts({"p0": f"text {version}"})
+    store.compact()
+    # Two small segments are fewer than merge_width, and the large one is final
+    assert store.segment_count("texts") == 3
+
+    store.write_texts({"p1": "text 2"})
+    store.compact()
+    assert store.segment_count("texts") == 2 and large in os.listdir(tmp_path / "texts")
+    assert store.get_texts(["p0", "p1", "p2"]) == {"p0": "text 1", "p1": "text 2", "p2": "long text " * 2000}
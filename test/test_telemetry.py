@@ -0,0 +1,78 @@
+import sys
+import json
+import asyncio
+from pathlib import Path
+
+import pytest
+
+current_path = Path(__file__).resolve()
+parent_path = current_path.parent.parent
+sys.path.append(str(parent_path))
+
+from src.telemetry import Tracer, Metrics
+
+
+# Test spans nest through tasks and threads and are exported to JSONL on flush
+@pytest.mark.asyncio
+async def test_spans(tmp_path):
+    tracer = Tracer(jsonl_path=str(tmp_path / "spans.jsonl"))
+
+    def parse():
+        with tracer.span("parse") as span:
+            span.set(bytes=100)
+
+    async def paper():
+        with tracer.span("paper"):
+            await asyncio.to_thread(parse)
+
+    with tracer.span("search") as search:
+        await asyncio.gather(paper(), paper())
+    with pytest.raises(ValueError):
+        with tracer.span("persist"):
+            raise ValueError("disk full")
+
+    # Spans are buffered until flush appends them in one write
+    assert not (tmp_path / "spans.jsonl").exists()
+    tracer.flush()
+    spans = [json.loads(line) for line in (tmp_path / "spans.jsonl").read_text().splitlines()]
+    by_id = {span["span_id"]: span for span in spans}
+    parses = [span for span in spans if span["name"] == "parse"]
+    assert len(parses) == 2 and parses[0]["attributes"] == {"bytes": 100}
+    assert all(by_id[by_id[span["parent_id"]]["parent_id"]]["name"] == "search" for span in parses)
+    assert {span["trace_id"] for span in spans if span["name"] != "persist"} == {search.trace_id}
+    assert "ValueError" in spans[-1]["attributes"]["error"]
+    assert [row["span"] for row in tracer.summary(search.trace_id)] == ["paper", "parse", "search"]
+
+
+# Test counters and histograms in the Prometheus text format
+def test_prometheus(tmp_path):
+    metrics = Metrics()
+    metrics.inc("cache_requests_total", cache="pdf", hit=True)
+    metrics.inc("cache_requests_total", cache="pdf", hit=True)
+    metrics.observe("span_duration_seconds", 0.2, span="parse")
+    metrics.observe("span_duration_seconds", 3, span="parse")
+    text = metrics.to_prometheus()
+
+    assert 'scioptimizer_cache_requests_total{cache="pdf",hit="True"} 2' in text
+    assert 'scioptimizer_span_duration_seconds_bucket{span="parse",le="0.25"} 1' in text
+    assert 'scioptimizer_span_duration_seconds_bucket{span="parse",le="+Inf"} 2' in text
+    assert 'scioptimizer_span_duration_seconds_count{span="parse"} 2' in text
+
+    tracer = Tracer(prometheus_path=str(tmp_path / "metrics.prom"))
+    tracer.metrics = metrics
+    tracer.flush()
+    assert (tmp_path / "metrics.prom").read_text() == text
+
+
+# Test a full span buffer is written without waiting for flush, and configure writes the rest to the old file
+def test_spans_buffer(tmp_path):
+    tracer = Tracer(jsonl_path=str(tmp_path / "first.jsonl"), max_pending=3)
+    for index in range(4):
+        tracer.start("llm", index=index).end()
+    assert len((tmp_path / "first.jsonl").read_text().splitlines()) == 3
+
+    tracer.configure(jsonl_path=str(tmp_path / "second.jsonl"))
+    tracer.start("llm", index=4).end()
+    tracer.flush()
+    assert [json.loads(line)["attributes"]["index"] for line in (tmp_path / "first.jsonl").read_text().splitlines()] == [0, 1, 2, 3]
+    assert [json.loads(line)["attributes"]["index"] for line in (tmp_path / "second.jsonl").read_text().splitlines()] == [4]
@@ -0,0 +1,53 @@
+import pytest
+import sys
+import fitz
+from pathlib import Path
+
+current_path = Path(__file__).resolve()
+parent_path = current_path.parent.parent
+sys.path.append(str(parent_path))
+
+from src.utils import extract_text_from_pdf, iter_pdf_text, parse_json_fields, extract_parameters
+
+@pytest.fixture
+def paper_pdf(tmp_path):
+    path = str(tmp_path / "paper.pdf")
+    doc = fitz.open()
+    for lines in [["Introduction", "Our method"], ["Experiments", "  References  ", "[1] Cited work"], ["Appendix"]]:
+        doc.new_page().insert_text((72, 72), "\n".join(lines))
+    doc.save(path)
+    doc.close()
+    return path
+
+# Test text extraction stops at the 'References' header
+def test_extract_text_from_pdf(paper_pdf):
+    text = extract_text_from_pdf(paper_pdf)
+
+    assert text == "Introduction\nOur method\nExperiments\n"
+    assert list(iter_pdf_text(paper_pdf)) == ["Introduction\nOur method\n", "Experiments\n"]
+
+# Test page and character budgets
+def test_extract_text_from_pdf_budget(paper_pdf):
+    assert extract_text_from_pdf(paper_pdf, max_pages=1) == "Introduction\nOur method\n"
+    assert extract_text_from_pdf(paper_pdf, max_chars=15) == "Introduction\nOu"
+
+# Test JSON answers are parsed despite prose, fences, casing and list values
+def test_parse_json_fields():
+    output = 'Sure! ```json\n{"Key Method": "GNN", "datasets": ["Cora", "PubMed"], "extra": 1}\n```'
+
+    assert parse_json_fields(output, ["key method", "datasets", "metric"]) == {"key method": "GNN", "datasets": "Cora, PubMed"}
+    assert parse_json_fields("{broken", ["key method"]) == {}
+    assert parse_json_fields("[1, 2]", ["key method"]) == {}
+
+# Test search parameters are read from JSON cut off at the stop sequence and from the free-text format
+def test_extract_parameters():
+    output = '```json\n{"keywords": ["graph neural networks"], "year_range": [2023, "2022"], "authors": ["O\'Neil", "A. \\"B\\" C"], "institutions": [], "conferences": ["CVPR", "ICC'
+
+    assert extract_parameters(output) == {
+        'keywords': ['graph neural networks'], 'year_range': ['2023', '2022'], 'authors': ["O'Neil", 'A. "B" C'],
+        'institutions': [], 'conferences': ['CVPR'],
+    }
+    assert extract_parameters("* *Keywords ['graph neural networks']\n* **Year Range:** [2022]\n* **Authors:** []") == {
+        'keywords': ['graph neural networks'], 'year_range': ['2022'], 'authors': [], 'institutions': [], 'conferences': [],
+    }
+    assert extract_parameters("no parameters here") == {key: [] for key in ['keywords', 'year_range', 'authors', 'institutions', 'conferences']}
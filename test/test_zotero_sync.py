@@ -0,0 +1,70 @@
+import pytest
+import sys
+from pathlib import Path
+
+current_path = Path(__file__).resolve()
+parent_path = current_path.parent.parent
+sys.path.append(str(parent_path))
+
+from src.zotero_sync import ZoteroSync, get_identifiers
+from src.cache import PDFCache
+from zotero_stub import ZoteroStub
+
+def make_paper(index, url=None):
+    return {
+        'title': f"Paper {index}",
+        'year': 2023,
+        'author': "Author 1, Author 2",
+        'url': url or f"http://arxiv.org/pdf/2301.{index:05d}v1",
+        'abstract': "Test summary",
+    }
+
+@pytest.fixture
+def stub():
+    with ZoteroStub() as stub:
+        yield stub
+
+# Test identifiers ignore arXiv versions and DOI url prefixes
+def test_get_identifiers():
+    assert get_identifiers("http://arxiv.org/pdf/2301.00001v2") == get_identifiers("https://arxiv.org/abs/2301.00001")
+    assert "doi:10.1000/xyz" in get_identifiers(doi="https://doi.org/10.1000/XYZ")
+
+# Test papers are created in batches of 50 and deduplicated against the library and each other
+def test_zotero_sync_batches_and_dedupes(stub, tmp_path):
+    stub.add_item({'title': "Existing", 'url': "https://arxiv.org/abs/2301.00000v3"})
+    stub.add_item({'title': "Existing DOI", 'DOI': "10.48550/arXiv.2301.00001"})
+    papers = [make_paper(index) for index in range(120)] + [make_paper(5)]
+    papers.append(make_paper(999, url=""))
+    papers[-1]['title'] = ""
+
+    sync = ZoteroSync("123", "user", "key", index_dir=tmp_path, endpoint=stub.endpoint)
+    report = sync.upload(papers)
+
+    statuses = [entry['status'] for entry in report]
+    assert statuses[:2] == ['duplicate', 'duplicate']
+    assert statuses[2:120] == ['created'] * 118
+    assert statuses[120:] == ['duplicate', 'failed']
+    assert stub.requests == [("GET", "/users/123/items/top")] + [("POST", "/users/123/items")] * 3
+    assert len(stub.items) == 120
+
+    # The next sync only fetches changes and picks up deletions
+    stub.delete_item(report[2]['key'])
+    stub.requests.clear()
+    report = sync.upload([make_paper(2), make_paper(3)])
+
+    assert [entry['status'] for entry in report] == ['created', 'duplicate']
+    assert stub.requests[:2] == [("GET", "/users/123/items/top"), ("GET", "/users/123/deleted")]
+
+# Test cached PDFs are attached to the created items
+def test_zotero_sync_attaches_pdfs(stub, tmp_path):
+    cache = PDFCache(tmp_path / "cache")
+    Path(cache.root).mkdir()
+    Path(cache.path("2301.00000v1")).write_bytes(b"%PDF-1.4 test")
+
+    sync = ZoteroSync("123", "user", "key", index_dir=tmp_path, pdf_cache=cache, endpoint=stub.endpoint)
+    report = sync.upload([make_paper(0), make_paper(1)])
+
+    assert [entry.get('attachment') for entry in report] == ['uploaded', None]
+    attachments = [item for item in stub.items.values() if item['data']['itemType'] == 'attachment']
+    assert len(attachments) == 1 and attachments[0]['data']['parentItem'] == report[0]['key']
+    assert list(stub.files) == [attachments[0]['key']]
@@ -0,0 +1,106 @@
+"""
+Local stand-in for the Zotero web API, covering the calls made by src/zotero_sync.py:
+listing top-level items and deletions since a library version, batch item creation
+and the three-step file upload.
+"""
+import re
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class ZoteroStub:
+    """Zotero API stub running on a local port in a background thread"""
+
+    def __init__(self):
+        self.items = {}
+        self.deleted = {}
+        self.files = {}
+        self.version = 0
+        self.requests = []
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.endpoint = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def add_item(self, data):
+        """Put an item in the library directly, as another Zotero client would"""
+        with self.lock:
+            self.version += 1
+            key = f"ITEM{len(self.items) + len(self.deleted):04d}"
+            self.items[key] = {"key": key, "version": self.version, "data": dict(data, key=key)}
+            return key
+
+    def delete_item(self, key):
+        with self.lock:
+            self.version += 1
+            self.items.pop(key)
+            self.deleted[key] = self.version
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def reply(self, status, body=None):
+                payload = json.dumps(body).encode("utf-8") if body is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.send_header("Last-Modified-Version", str(stub.version))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                since = int(query.get("since", ["0"])[0])
+                stub.requests.append(("GET", url.path))
+                with stub.lock:
+                    if url.path.endswith("/items/top"):
+                        return self.reply(200, [item for item in stub.items.values() if item["version"] > since])
+                    if url.path.endswith("/deleted"):
+                        return self.reply(200, {"items": [key for key, version in stub.deleted.items() if version > since]})
+                return self.reply(404, {})
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                stub.requests.append(("POST", url.path))
+                file_match = re.search(r"/items/(\w+)/file$", url.path)
+                if url.path.startswith("/upload/"):
+                    stub.files[url.path.rsplit("/", 1)[-1]] = len(body)
+                    return self.reply(201)
+                if file_match:
+                    form = parse_qs(body.decode("utf-8"))
+                    if "upload" in form:
+                        return self.reply(204)
+                    key = file_match.group(1)
+                    return self.reply(200, {"url": f"{stub.endpoint}/upload/{key}", "params": {"key": key}, "uploadKey": f"upload-{key}"})
+                if url.path.endswith("/items"):
+                    items = json.loads(body)
+                    if len(items) > 50:
+                        return self.reply(413, {})
+                    response = {"success": {}, "successful": {}, "unchanged": {}, "failed": {}}
+                    for index, data in enumerate(items):
+                        if not data.get("title"):
+                            response["failed"][str(index)] = {"code": 400, "message": "Missing title"}
+                            continue
+                        key = stub.add_item(data)
+                        response["success"][str(index)] = key
+                        response["successful"][str(index)] = stub.items[key]
+                    return self.reply(200, response)
+                return self.reply(404, {})
+
+        return Handler